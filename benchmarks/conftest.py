@@ -0,0 +1,44 @@
+"""
+Performance benchmarks for Starfish's hot paths, using `pytest-benchmark <https://pytest-benchmark.readthedocs.io>`_.
+
+All inputs are synthetic and generated from fixed seeds, so results are comparable between runs. To record a baseline
+and then check for regressions against it::
+
+    pytest benchmarks --benchmark-json=benchmarks/baseline.json
+    pytest benchmarks --benchmark-autosave
+    pytest benchmarks --benchmark-compare --benchmark-compare-fail=median:10%
+
+``--benchmark-json`` writes a single machine-readable file, while ``--benchmark-autosave`` and
+``--benchmark-compare`` keep a numbered history of runs in ``.benchmarks/``.
+"""
+import numpy as np
+import pytest
+from mathutils import Quaternion
+
+RESOLUTIONS = {
+    '1080p': (1080, 1920),
+    '4k': (2160, 3840),
+}
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+def random_quaternions(rng, n):
+    return [Quaternion(q).normalized() for q in rng.normal(size=(n, 4))]
+
+
+def synthetic_mask(rng, shape, colors, num_boxes=20, noise=True):
+    """Creates an RGB mask with randomly placed rectangles of the given colors. The first color is the background.
+    If ``noise`` is True, every channel is perturbed by up to 1, mimicking the color variation in Blender's output."""
+    h, w = shape
+    mask = np.empty((h, w, 3), dtype=np.uint8)
+    mask[:] = colors[0]
+    for i in range(num_boxes):
+        y, x = rng.integers(0, h - h // 8), rng.integers(0, w - w // 8)
+        mask[y:y + h // 8, x:x + w // 8] = colors[1 + i % (len(colors) - 1)]
+    if noise:
+        mask = (mask.astype(np.int16) + rng.integers(-1, 2, mask.shape)).clip(0, 255).astype(np.uint8)
+    return mask
@@ -0,0 +1,48 @@
+import pytest
+from conftest import RESOLUTIONS, synthetic_mask
+from starfish.annotation import (get_bounding_boxes_from_mask, get_centroids_from_mask, get_instances_from_mask,
+                                 normalize_mask_colors)
+
+COLORS = [(0, 0, 0), (255, 255, 255), (0, 0, 206), (206, 0, 0)]
+LABEL_MAP = {'panel': COLORS[1], 'body': COLORS[2], 'antenna': COLORS[3]}
+
+
+@pytest.mark.parametrize('resolution', RESOLUTIONS)
+def test_normalize_mask_colors(benchmark, rng, resolution):
+    mask = synthetic_mask(rng, RESOLUTIONS[resolution], COLORS)
+    result = benchmark(normalize_mask_colors, mask, COLORS)
+    assert result.shape == mask.shape
+
+
+@pytest.mark.parametrize('resolution', RESOLUTIONS)
+def test_get_bounding_boxes_from_mask(benchmark, rng, resolution):
+    mask = synthetic_mask(rng, RESOLUTIONS[resolution], COLORS, noise=False)
+    assert benchmark(get_bounding_boxes_from_mask, mask, LABEL_MAP).keys() == LABEL_MAP.keys()
+
+
+@pytest.mark.parametrize('resolution', RESOLUTIONS)
+def test_get_centroids_from_mask(benchmark, rng, resolution):
+    mask = synthetic_mask(rng, RESOLUTIONS[resolution], COLORS, noise=False)
+    assert benchmark(get_centroids_from_mask, mask, LABEL_MAP).keys() == LABEL_MAP.keys()
+
+
+@pytest.mark.parametrize('resolution', RESOLUTIONS)
+@pytest.mark.parametrize('rle', [False, True], ids=['no_rle', 'rle'])
+def test_get_instances_from_mask(benchmark, rng, resolution, rle):
+    mask = synthetic_mask(rng, RESOLUTIONS[resolution], COLORS, noise=False)
+    assert benchmark(get_instances_from_mask, mask, LABEL_MAP, rle=rle).keys() == LABEL_MAP.keys()
+
+
+@pytest.mark.parametrize('resolution', RESOLUTIONS)
+def test_mask_annotator(benchmark, rng, resolution):
+    """normalize + bounding boxes + centroids with reused buffers; compare with the three functions above."""
+    from starfish.annotation import MaskAnnotator
+    mask = synthetic_mask(rng, RESOLUTIONS[resolution], COLORS)
+    annotator = MaskAnnotator(LABEL_MAP, RESOLUTIONS[resolution], colors=COLORS)
+
+    def annotate():
+        clean = annotator.normalize(mask)
+        return annotator.bounding_boxes(clean), annotator.centroids(clean)
+
+    bboxes, centroids = benchmark(annotate)
+    assert bboxes.keys() == centroids.keys() == LABEL_MAP.keys()
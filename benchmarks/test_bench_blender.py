@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+from conftest import random_quaternions
+from starfish import Frame, Sequence
+from starfish.annotation import build_bvh, get_keypoint_visibility, project_keypoints_onto_image
+from starfish.testing import fake_blender, make_scene
+
+
+@pytest.fixture
+def scene():
+    with fake_blender() as bpy:
+        yield make_scene(bpy)
+
+
+def test_frame_setup(benchmark, rng, scene):
+    frame = Frame(pose=random_quaternions(rng, 1)[0], background=random_quaternions(rng, 1)[0], distance=20,
+                  offset=(0.3, 0.6))
+    benchmark(frame.setup, *scene)
+
+
+def test_bake(benchmark, rng, scene):
+    seq = Sequence.standard(pose=random_quaternions(rng, 100), distance=list(np.linspace(10, 50, num=100)))
+    benchmark(seq.bake, *scene)
+
+
+@pytest.mark.parametrize('num', [10, 100, 1000])
+def test_project_keypoints_onto_image(benchmark, rng, scene, num):
+    Frame(distance=20).setup(*scene)
+    keypoints = [tuple(p) for p in rng.random((num, 3)) * 2 - 1]
+    result = benchmark(project_keypoints_onto_image, keypoints, scene[0], scene[1], scene[2])
+    assert len(result) == num
+
+
+@pytest.mark.parametrize('method', ['depth', 'bvh'])
+def test_get_keypoint_visibility(benchmark, rng, scene, method):
+    Frame(distance=20).setup(*scene)
+    keypoints = rng.random((500, 3)) * 2 - 1
+    if method == 'depth':
+        kwargs = {'depth': np.full((1080, 1920), 20, dtype=np.float32)}
+    else:
+        kwargs = {'bvh': build_bvh(scene[1])}
+    result = benchmark(get_keypoint_visibility, keypoints, scene[0], scene[1], scene[2], **kwargs)
+    assert len(result) == 500
+
+
+def test_generate_keypoints_incremental(benchmark, scene):
+    from starfish.annotation import generate_keypoints
+    existing = generate_keypoints(scene[1], 100)
+    result = benchmark(generate_keypoints, scene[1], 200, existing=existing)
+    assert result[:100] == existing
+
+
+@pytest.mark.parametrize('session', [False, True], ids=['lookups', 'RenderSession'])
+def test_render_two_scenes(benchmark, rng, session):
+    from starfish.render import RenderSession
+    with fake_blender() as bpy:
+        make_scene(bpy)
+        for name in ('Real', 'Mask'):
+            bpy.data.scenes.new(name).node_tree.nodes.new('File Output', 'OUTPUT_FILE')
+        seq = Sequence.standard(pose=random_quaternions(rng, 100), distance=list(np.linspace(10, 50, num=100)))
+        render_session = RenderSession(['Real', 'Mask'], 'Cube', 'Camera', 'Sun', outputs={
+            'Real': {'File Output': 'real_{index}'}, 'Mask': {'File Output': 'mask_{index}'}})
+
+        def per_frame_lookups():
+            for i, frame in enumerate(seq):
+                for name in ('Real', 'Mask'):
+                    bpy.data.scenes[name].node_tree.nodes['File Output'].file_slots[0].path = f'{name.lower()}_{i}'
+                    scene = bpy.data.scenes[name]
+                    frame.setup(scene, bpy.data.objects['Cube'], bpy.data.objects['Camera'], bpy.data.objects['Sun'])
+                    bpy.ops.render.render(scene=name)
+
+        def session_run():
+            for _ in render_session.run(seq):
+                pass
+
+        benchmark(session_run if session else per_frame_lookups)
+
+
+@pytest.mark.parametrize('source', ['png', 'viewer'])
+def test_mask_readback(benchmark, tmp_path, source):
+    """Getting a 1080p mask into memory: writing and reading a PNG, versus copying the Viewer node's pixels."""
+    import cv2
+    from starfish.render import read_mask
+    with fake_blender() as bpy:
+        image = bpy.data.images.new('Viewer Node', 1920, 1080)
+        image.pixels.foreach_set(np.ones(1920 * 1080 * 4, dtype=np.float32))
+        out, buffer = np.empty((1080, 1920, 3), dtype=np.uint8), np.empty((1080, 1920, 4), dtype=np.float32)
+        path = str(tmp_path / 'mask.png')
+
+        def png_round_trip():
+            cv2.imwrite(path, read_mask(out=out, buffer=buffer))
+            return cv2.imread(path)
+
+        result = benchmark(png_round_trip if source == 'png' else lambda: read_mask(out=out, buffer=buffer))
+        assert result.shape == (1080, 1920, 3)
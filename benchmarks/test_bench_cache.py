@@ -0,0 +1,29 @@
+import os
+
+import pytest
+from conftest import random_quaternions
+from starfish import Sequence
+from starfish.cache import OutputCache, frame_hash
+
+
+def test_frame_hash(benchmark, rng):
+    seq = Sequence.standard(pose=random_quaternions(rng, 10000), distance=list(rng.random(10000) * 50))
+    hashes = benchmark(lambda: [frame_hash(frame, 'scene') for frame in seq])
+    assert len(set(hashes)) == 10000
+
+
+@pytest.mark.parametrize('link', [True, False], ids=['link', 'copy'])
+def test_restore(benchmark, rng, tmp_path, link):
+    seq = Sequence.standard(pose=random_quaternions(rng, 200))
+    cache = OutputCache(str(tmp_path / 'cache'), link=link)
+    image = str(tmp_path / 'image.png')
+    with open(image, 'wb') as f:
+        f.write(os.urandom(2 ** 20))
+    for frame in seq:
+        cache.store(frame, {'image.png': image})
+
+    def restore():
+        return sum(cache.restore(frame, {'image.png': str(tmp_path / 'out' / f'{i}.png')})
+                   for i, frame in enumerate(seq))
+
+    assert benchmark.pedantic(restore, rounds=3) == 200
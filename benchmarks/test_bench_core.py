@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from conftest import random_quaternions
+from mathutils import Euler
+from starfish import Sequence
+from starfish.rotations import QuaternionArray
+
+
+@pytest.mark.parametrize('n', [100, 1000])
+def test_standard(benchmark, rng, n):
+    kwargs = dict(
+        pose=random_quaternions(rng, n),
+        lighting=random_quaternions(rng, n),
+        background=random_quaternions(rng, n),
+        distance=np.linspace(10, 50, num=n),
+    )
+    seq = benchmark(Sequence.standard, **kwargs)
+    assert len(seq) == n
+
+
+def test_exhaustive(benchmark, rng):
+    kwargs = dict(
+        distance=list(np.linspace(10, 50, num=10)),
+        offset=[tuple(o) for o in rng.random((10, 2))],
+        pose=random_quaternions(rng, 10),
+        lighting=random_quaternions(rng, 10),
+    )
+    seq = benchmark(Sequence.exhaustive, **kwargs)
+    assert len(seq) == 10 ** 4
+
+
+def test_interpolated(benchmark, rng):
+    waypoints = Sequence.standard(
+        distance=list(np.linspace(10, 50, num=11)),
+        pose=random_quaternions(rng, 11),
+        lighting=[Euler((0, 0, 0))],
+    )
+    seq = benchmark(Sequence.interpolated, waypoints, [100] * 10)
+    assert len(seq) == 1001
+
+
+@pytest.mark.parametrize('threshold', [None, np.radians(1)], ids=['exact', 'near'])
+def test_describe(benchmark, rng, threshold):
+    n = 100000
+    seq = Sequence.standard(
+        pose=QuaternionArray(rng.normal(size=(n, 4))),
+        lighting=QuaternionArray(rng.normal(size=(n, 4))),
+        distance=list(rng.integers(10, 50, n).astype(float)),
+        offset=[tuple(o) for o in rng.random((n, 2))],
+    )
+    summary = benchmark.pedantic(seq.describe, kwargs={'threshold': threshold}, rounds=3)
+    assert summary['num_frames'] == n
+
+
+@pytest.mark.parametrize('method', ['linear', 'spline'])
+def test_interpolated_lazy(benchmark, rng, method):
+    n = 1000
+    waypoints = Sequence.standard(distance=list(rng.uniform(10, 50, n)), pose=random_quaternions(rng, n))
+    seq = Sequence.interpolated(waypoints, [10 ** 6] * (n - 1), method=method, lazy=True)
+    indices = rng.integers(0, len(seq), 1000)
+    frames = benchmark(lambda: [seq[i] for i in indices])
+    assert len(frames) == 1000
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+from conftest import random_quaternions
+from starfish import Sequence
+from starfish.coverage import RotationIndex, coverage, deduplicate
+
+
+@pytest.mark.parametrize('num', [100000, 1000000], ids=['100k', '1M'])
+def test_rotation_index_pairs(benchmark, rng, num):
+    q = rng.normal(size=(num, 4))
+    benchmark.pedantic(lambda: RotationIndex(q, np.radians(2)).pairs(), rounds=1)
+
+
+def test_deduplicate(benchmark, rng):
+    seq = Sequence.standard(pose=random_quaternions(rng, 100000), lighting=random_quaternions(rng, 100000),
+                            distance=list(rng.integers(10, 20, 100000)))
+    result = benchmark.pedantic(deduplicate, (seq, np.radians(20)), rounds=1)
+    assert len(result) <= len(seq)
+
+
+def test_coverage(benchmark, rng):
+    q = rng.normal(size=(100000, 4))
+    stats = benchmark.pedantic(coverage, (q, np.radians(5)), rounds=1)
+    assert 0 < stats['covered'] <= 1
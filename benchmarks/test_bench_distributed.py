@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+from conftest import random_quaternions
+from starfish import Sequence
+from starfish.distributed import Coordinator, Worker
+
+
+@pytest.mark.parametrize('chunk_size', [1, 10])
+def test_coordinator_overhead(benchmark, rng, chunk_size):
+    """The per-frame cost of leasing and reporting frames, which is added to every render on a worker."""
+    seq = Sequence.standard(pose=random_quaternions(rng, 200), distance=list(np.linspace(10, 50, num=200)))
+
+    def run():
+        with Coordinator(seq, chunk_size=chunk_size) as coordinator:
+            Worker(coordinator.address).run(lambda i, frame: None)
+            assert coordinator.done.all()
+
+    benchmark.pedantic(run, rounds=3)
+
+
+def test_cost_model_predict(benchmark, rng):
+    from starfish.scheduling import CostModel
+    seq = Sequence.standard(lighting=random_quaternions(rng, 100000), distance=list(rng.uniform(5, 60, 100000)))
+    model = CostModel().update(seq.frames[:1000], rng.random(1000))
+    result = benchmark.pedantic(model.predict, (seq,), rounds=3)
+    assert len(result) == 100000
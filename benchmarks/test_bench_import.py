@@ -0,0 +1,11 @@
+import subprocess
+import sys
+
+import pytest
+
+
+@pytest.mark.parametrize('statement', ['import starfish', 'import starfish.annotation'])
+def test_import_time(benchmark, statement):
+    """Measures the startup time of a fresh interpreter importing starfish, as paid by every render worker."""
+    benchmark.pedantic(subprocess.run, args=([sys.executable, '-c', statement],), kwargs=dict(check=True),
+                       rounds=10, iterations=1)
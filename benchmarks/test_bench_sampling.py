@@ -0,0 +1,40 @@
+import pytest
+from starfish import utils
+from starfish.sampling import (_sample_eliminate, frame_parameters, hopf_rotations, poisson_rotations, poisson_sphere,
+                               random_points, sobol, sobol_rotations)
+
+
+@pytest.mark.parametrize('generate', [utils.random_rotations, sobol_rotations, hopf_rotations])
+def test_rotations(benchmark, generate):
+    assert len(benchmark(generate, 10000)) == 10000
+
+
+def test_sobol(benchmark):
+    assert benchmark(sobol, 2 ** 16, 15).shape == (2 ** 16, 15)
+
+
+def test_random_points(benchmark):
+    assert benchmark(random_points, 2 ** 20, 15, skip=12345, seed=7).shape == (2 ** 20, 15)
+
+
+def test_frame_parameters(benchmark):
+    params = benchmark(frame_parameters, 10000, rotations=('pose', 'lighting', 'background'), distance=(10, 50),
+                       offset=[(0.3, 0.7)] * 2)
+    assert len(params['pose']) == 10000
+
+
+@pytest.mark.parametrize('num', [50, 200, 1000])
+def test_sample_eliminate(benchmark, rng, num):
+    # points uniformly distributed in a unit cube, oversampled by the default factor of 10
+    points = [tuple(p) for p in rng.random((num * 10, 3))]
+    result = benchmark.pedantic(_sample_eliminate, args=(points, num, 1, 1.0), rounds=3, iterations=1)
+    assert len(result) == num
+
+
+def test_poisson_sphere(benchmark):
+    theta, phi = benchmark.pedantic(poisson_sphere, args=(500,), rounds=1)
+    assert len(theta) == 500
+
+
+def test_poisson_rotations(benchmark):
+    assert len(benchmark.pedantic(poisson_rotations, args=(500,), rounds=1)) == 500
@@ -0,0 +1,56 @@
+import json
+
+import numpy as np
+import pytest
+from conftest import random_quaternions
+from mathutils import Vector
+from starfish import Frame, utils
+from starfish.rotations import QuaternionArray, Spherical
+
+
+@pytest.mark.parametrize('sizes', [(10, 10, 10), (50, 50, 20)], ids=['1k', '50k'])
+def test_cartesian(benchmark, rng, sizes):
+    arrays = [list(rng.random(size)) for size in sizes]
+    result = benchmark(utils.cartesian, *arrays)
+    assert len(result) == np.prod(sizes)
+
+
+@pytest.mark.parametrize('chunk_size', [10000, 1000000], ids=['10k', '1M'])
+def test_cartesian_product_chunks(benchmark, chunk_size):
+    product = utils.CartesianProduct(np.linspace(10, 50, 100), np.linspace(0, 1, 100), np.arange(100, dtype=np.int32))
+
+    def consume():
+        return sum(len(chunk) for chunk in product.chunks(chunk_size))
+
+    assert benchmark(consume) == 10 ** 6
+
+
+def test_jsonify(benchmark, rng):
+    frame = Frame(pose=random_quaternions(rng, 1)[0], distance=20)
+    frame.translation = Vector((1, 2, 3))
+    frame.bboxes = {f'class_{i}': {'ymin': 0, 'ymax': 10, 'xmin': 0, 'xmax': 10} for i in range(10)}
+    frame.keypoints = [tuple(p) for p in rng.random((200, 2))]
+    result = benchmark(utils.jsonify, frame)
+    assert len(json.loads(result)['keypoints']) == 200
+
+
+def test_spherical_round_trip(benchmark, rng):
+    sphericals = [Spherical(*angles) for angles in rng.random((1000, 3)) * 2 * np.pi]
+
+    def round_trip():
+        return [Spherical.from_other(s.to_quaternion()) for s in sphericals]
+
+    assert len(benchmark(round_trip)) == 1000
+
+
+@pytest.mark.parametrize('vectorized', [False, True], ids=['mathutils', 'QuaternionArray'])
+def test_slerp_to_euler(benchmark, rng, vectorized):
+    a, b = random_quaternions(rng, 10000), random_quaternions(rng, 10000)
+
+    def mathutils_loop():
+        return [x.slerp(y, 0.3).to_euler() for x, y in zip(a, b)]
+
+    def vectorized_array():
+        return QuaternionArray.from_quaternions(a).slerp(b, 0.3).to_euler()
+
+    assert len(benchmark(vectorized_array if vectorized else mathutils_loop)) == 10000
@@ -0,0 +1,21 @@
+import numpy as np
+from mathutils import Vector
+from starfish import Sequence
+from starfish.rotations import QuaternionArray
+from starfish.validation import find_degenerate
+
+VIEW = [Vector((0.5, 0.28125, -1.38889)), Vector((0.5, -0.28125, -1.38889)), Vector((-0.5, -0.28125, -1.38889)),
+        Vector((-0.5, 0.28125, -1.38889))]
+BOUNDS = [(x, y, z) for x in (-1, 1) for y in (-1, 1) for z in (-1, 1)]
+
+
+def test_find_degenerate(benchmark, rng):
+    n = 100000
+    seq = Sequence.standard(
+        distance=list(rng.uniform(1, 30, n)),
+        offset=[tuple(o) for o in rng.uniform(-0.25, 1.25, (n, 2))],
+        pose=QuaternionArray(rng.normal(size=(n, 4))),
+        lighting=QuaternionArray(rng.normal(size=(n, 4))),
+    )
+    flags = benchmark.pedantic(find_degenerate, (seq, BOUNDS, VIEW), rounds=3)
+    assert len(flags['out_of_frame']) == n and 0 < np.count_nonzero(flags['backlit']) < n
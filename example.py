@@ -10,8 +10,10 @@ import bpy
 import numpy as np
 from mathutils import Euler
 from starfish import Sequence
+from starfish.render import RenderSession, configure_mask_scene, read_mask
 from starfish.utils import random_rotations
-from starfish.annotation import normalize_mask_colors, get_centroids_from_mask, get_bounding_boxes_from_mask
+from starfish.writer import AsyncWriter
+from starfish.annotation import get_centroids_from_mask, get_bounding_boxes_from_mask
 
 # create a standard sequence of random configurations...
 seq1 = Sequence.standard(
@@ -32,38 +34,34 @@ seq3 = Sequence.interpolated(
     counts=[100]
 )
 
-for seq in [seq1, seq2, seq3]:
-    # render loop
-    for i, frame in enumerate(seq):
-        # non-starfish Blender stuff: e.g. setting file output paths
-        bpy.data.scenes['Real'].node_tree.nodes['File Output'].file_slots[0].path = f'real_{i}.png'
-        bpy.data.scenes['Mask'].node_tree.nodes['File Output'].file_slots[0].path = f'mask_{i}.png'
+# resolve the scenes, objects, and output nodes once, rather than looking them up by name on every frame
+session = RenderSession(['Real', 'Mask'], 'MyObject', 'MyCamera', 'TheSun', outputs={
+    'Real': {'File Output': 'real_{index}.png'},
+})
 
-        # set up and render
-        scene = bpy.data.scenes['Real']
-        frame.setup(scene, bpy.data.objects['MyObject'],
-                    bpy.data.objects['MyCamera'], bpy.data.objects['TheSun'])
-        bpy.ops.render.render(scene=scene)
+# render the mask scene with flat, exact colors at minimum cost, so that the masks don't need to be cleaned up
+label_map = {'object': (255, 255, 255)}
+configure_mask_scene(bpy.data.scenes['Mask'], {'MyObject': label_map['object']}, background=(0, 0, 0))
+# the mask is read from the Viewer node that configure_mask_scene connected, so it doesn't need to be saved to disk
+bpy.data.scenes['Mask'].node_tree.nodes['File Output'].mute = True
 
-        scene = bpy.data.scenes['Mask']
-        frame.setup(scene, bpy.data.objects['MyObject'],
-                    bpy.data.objects['MyCamera'], bpy.data.objects['TheSun'])
-        bpy.ops.render.render(scene=scene)
+# write metadata in the background so that rendering never waits on the disk
+with AsyncWriter() as writer:
+    for seq in [seq1, seq2, seq3]:
+        # render loop: each frame is set up once and rendered in both the real and the mask scene
+        for i, frame in session.run(seq):
+            # postprocessing: the mask scene was rendered last, so its Viewer node holds the mask, which is read
+            # straight from memory instead of being written to disk and read back
+            mask = read_mask()
+            bboxes = get_bounding_boxes_from_mask(mask, label_map)
+            centroids = get_centroids_from_mask(mask, label_map)
 
-        # postprocessing
-        label_map = {'object': (255, 255, 255), 'background': (0, 0, 0)}
-        clean_mask = normalize_mask_colors(f'mask_{i}.png', label_map.values())
-        del label_map['background']
-        bboxes = get_bounding_boxes_from_mask(clean_mask, label_map)
-        centroids = get_centroids_from_mask(clean_mask, label_map)
+            # add some extra metadata
+            frame.timestamp = int(time.time() * 1000)
+            frame.sequence_name = '1000 random poses'
+            frame.tags = ['front_view', 'left_view', 'right_view']
+            frame.bboxes = bboxes
+            frame.centroids = centroids
 
-        # add some extra metadata
-        frame.timestamp = int(time.time() * 1000)
-        frame.sequence_name = '1000 random poses'
-        frame.tags = ['front_view', 'left_view', 'right_view']
-        frame.bboxes = bboxes
-        frame.centroids = centroids
-
-        # save metadata to JSON
-        with open(f'meta_{i}.json', 'w') as f:
-            f.write(frame.dumps())
+            # save metadata to JSON
+            writer.write_metadata(f'meta_{i}.json', frame)
@@ -1,4 +1,16 @@
+import importlib
+
 from .core import Frame, Sequence
-from . import annotation
 
 __all__ = ['Frame', 'Sequence', 'annotation']
+
+
+def __getattr__(name):
+    # the annotation module is only needed for postprocessing, so it isn't imported until it's first accessed
+    if name == 'annotation':
+        return importlib.import_module('.annotation', __name__)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
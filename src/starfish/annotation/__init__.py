@@ -1,6 +1,34 @@
+import importlib
+
+# these must be imported eagerly: importing the generate_keypoints submodule directly (e.g. ``from
+# starfish.annotation.generate_keypoints import ...``) would otherwise shadow the function of the same name
 from .generate_keypoints import generate_keypoints
-from .keypoints import project_keypoints_onto_image
-from .mask import get_centroids_from_mask, get_bounding_boxes_from_mask, normalize_mask_colors
+from .keypoints import project_keypoints_onto_image, get_keypoint_visibility, build_bvh
+
+# maps each lazily loaded attribute to the submodule that defines it
+_lazy_attributes = {
+    'normalize_mask_colors': '.mask',
+    'get_bounding_boxes_from_mask': '.mask',
+    'get_centroids_from_mask': '.mask',
+    'MaskAnnotator': '.mask',
+    'get_instances_from_mask': '.instances',
+    'encode_rle': '.rle',
+    'decode_rle': '.rle',
+    'CocoWriter': '.coco',
+}
+
+__all__ = ['generate_keypoints', 'project_keypoints_onto_image', 'get_keypoint_visibility', 'build_bvh',
+           'normalize_mask_colors', 'get_bounding_boxes_from_mask', 'get_centroids_from_mask', 'MaskAnnotator',
+           'get_instances_from_mask', 'encode_rle', 'decode_rle', 'CocoWriter']
+
+
+def __getattr__(name):
+    if name in _lazy_attributes:
+        value = getattr(importlib.import_module(_lazy_attributes[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
 
-__all__ = ['generate_keypoints', 'project_keypoints_onto_image', 'normalize_mask_colors',
-           'get_bounding_boxes_from_mask', 'get_centroids_from_mask']
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
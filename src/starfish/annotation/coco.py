@@ -0,0 +1,262 @@
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from .instances import get_instances_from_mask
+from .keypoints import OUT_OF_FRAME, VISIBLE
+from .mask import _label_image, _read_mask
+from .rle import _encode_labels, decode_rle
+
+
+def _polygons(rle, bbox):
+    """Converts a run-length encoded mask into a list of COCO polygons (flat lists of x, y pixel coordinates)."""
+    import cv2
+    crop = decode_rle(rle)[bbox['ymin']:bbox['ymax'] + 1, bbox['xmin']:bbox['xmax'] + 1]
+    contours, _ = cv2.findContours(crop.astype(np.uint8), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    offset = np.array([bbox['xmin'], bbox['ymin']])
+    return [(contour.reshape(-1, 2) + offset).ravel().tolist() for contour in contours if len(contour) >= 3]
+
+
+class CocoWriter:
+    """Streams a dataset of annotated frames into a single `COCO-format <https://cocodataset.org/#format-data>`_
+    JSON file, or a JSON Lines file with one image per line.
+
+    Each call to `add_frame` combines a frame's metadata, the annotations derived from its mask, and its projected
+    keypoints, and writes them out immediately, so memory usage does not grow with the size of the dataset::
+
+        with CocoWriter('dataset.json', label_map) as coco:
+            for i, frame in enumerate(sequence):
+                frame.setup(...)
+                bpy.ops.render.render(...)
+                keypoints = project_keypoints_onto_image(...)
+                coco.add_frame(frame, f'real_{i}.png', mask=f'mask_{i}.png', keypoints=keypoints)
+
+    In the JSON format, images are written to the output file as they are added while annotations are staged in a
+    temporary file next to it, which is appended once the writer is closed. In the JSON Lines format, the first line
+    holds the 'info' and 'categories' and every following line holds one image along with its 'annotations'.
+
+    The metadata from `Frame.dumps <starfish.Frame.dumps>` is stored in each image under the key 'starfish'.
+    """
+
+    def __init__(self, path, label_map, format=None, segmentation='rle', instances=True, connectivity=8,
+                 keypoint_names=None, keypoint_category=None, info=None):
+        """
+        :param path: (str): the file to write to
+        :param label_map: dictionary mapping classes (str) to their corresponding color(s) in the masks, in the same
+            format as `get_bounding_boxes_from_mask <starfish.annotation.get_bounding_boxes_from_mask>`. Each class
+            becomes a COCO category, numbered from 1 in the order given.
+        :param format: (str): either 'json' or 'jsonl'. By default, this is inferred from the extension of ``path``.
+        :param segmentation: (str): how to encode segmentation masks: 'rle' for uncompressed run-length encoding,
+            'polygon' for polygons, or None to leave them out (default: 'rle')
+        :param instances: (bool): if True, each connected instance of a class gets its own annotation (see
+            `get_instances_from_mask <starfish.annotation.get_instances_from_mask>`). Otherwise, each class gets a
+            single annotation per image. (default: True)
+        :param connectivity: (int): passed to `get_instances_from_mask <starfish.annotation.get_instances_from_mask>`
+            (default: 8)
+        :param keypoint_names: (seq of str): the names of the keypoints passed to `add_frame`, in order. Required if
+            keypoints are used.
+        :param keypoint_category: (str): the class that keypoints belong to. Keypoints are attached to the largest
+            annotation of this class in each image. (default: the first class in ``label_map``)
+        :param info: (dict): the COCO 'info' section (default: empty)
+        """
+        if format is None:
+            format = 'jsonl' if path.endswith('.jsonl') else 'json'
+        if format not in ('json', 'jsonl'):
+            raise ValueError(f'Unknown format: {format}')
+        if segmentation not in ('rle', 'polygon', None):
+            raise ValueError(f'Unknown segmentation type: {segmentation}')
+        if keypoint_category is not None and keypoint_category not in label_map:
+            raise ValueError(f'Unknown keypoint category: {keypoint_category}')
+
+        self.path = path
+        self.label_map = label_map
+        self.format = format
+        self.segmentation = segmentation
+        self.instances = instances
+        self.connectivity = connectivity
+        self.keypoint_names = list(keypoint_names) if keypoint_names is not None else None
+        self.keypoint_category = keypoint_category if keypoint_category is not None else next(iter(label_map))
+
+        self.categories = []
+        for i, name in enumerate(label_map):
+            category = {'id': i + 1, 'name': name, 'supercategory': ''}
+            if self.keypoint_names is not None and name == self.keypoint_category:
+                category['keypoints'] = self.keypoint_names
+                category['skeleton'] = []
+            self.categories.append(category)
+
+        self._category_ids = {name: i + 1 for i, name in enumerate(label_map)}
+        self._next_image_id = 1
+        self._next_annotation_id = 1
+        self._num_images = 0
+        self._num_annotations = 0
+        self._closed = False
+
+        self._file = open(path, 'w')
+        if format == 'json':
+            self._annotations = tempfile.TemporaryFile('w+', dir=os.path.dirname(os.path.abspath(path)))
+            self._file.write('{"info": ' + json.dumps(info or {}) + ', "categories": ' + json.dumps(self.categories)
+                             + ', "images": [')
+        else:
+            self._annotations = None
+            self._file.write(json.dumps({'info': info or {}, 'categories': self.categories}) + '\n')
+
+    def add_frame(self, frame, file_name, mask=None, keypoints=None, keypoint_visibility=None, width=None,
+                  height=None):
+        """Adds one image and its annotations to the dataset.
+
+        :param frame: (starfish.Frame): the frame that was rendered
+        :param file_name: (str): the path of the rendered image, as it should appear in the dataset
+        :param mask: path to mask image (str) or numpy array of mask image (RGB). If None, only keypoints are used.
+            Keypoints are added to the largest annotation of ``keypoint_category``, or, if the mask has none (or there
+            is no mask), to an annotation of their own whose bbox encloses the keypoints that are in the frame.
+        :param keypoints: a list of (y, x) keypoint coordinates, as returned by `project_keypoints_onto_image
+            <starfish.annotation.project_keypoints_onto_image>`
+        :param keypoint_visibility: a sequence of booleans, one per keypoint, that are True if the keypoint is visible,
+            or the COCO visibility flags returned by `get_keypoint_visibility
+            <starfish.annotation.get_keypoint_visibility>`. By default, keypoints are visible if they lie inside the
+            image.
+        :param width: (int): the width of the image in pixels. May be omitted if ``mask`` is given.
+        :param height: (int): the height of the image in pixels. May be omitted if ``mask`` is given.
+
+        :returns: the id of the new image
+        """
+        if self._closed:
+            raise RuntimeError('Cannot add frames to a closed CocoWriter')
+        if isinstance(mask, str):
+            mask = _read_mask(mask)
+        if mask is not None:
+            height, width = mask.shape[:2]
+        if width is None or height is None:
+            raise ValueError('width and height must be provided if there is no mask')
+        if keypoints is not None and (self.keypoint_names is None or len(keypoints) != len(self.keypoint_names)):
+            raise ValueError('The number of keypoints must match the number of keypoint_names')
+
+        image_id = self._next_image_id
+        self._next_image_id += 1
+        image = {
+            'id': image_id,
+            'file_name': file_name,
+            'width': width,
+            'height': height,
+            'starfish': json.loads(frame.dumps()),
+        }
+
+        annotations = self._mask_annotations(mask, image_id) if mask is not None else []
+        if keypoints is not None:
+            self._add_keypoints(annotations, image_id, keypoints, keypoint_visibility, width, height)
+
+        if self.format == 'json':
+            self._file.write((', ' if self._num_images else '') + json.dumps(image))
+            for annotation in annotations:
+                self._annotations.write((', ' if self._num_annotations else '') + json.dumps(annotation))
+                self._num_annotations += 1
+        else:
+            self._file.write(json.dumps({'image': image, 'annotations': annotations}) + '\n')
+        self._num_images += 1
+        return image_id
+
+    def _mask_annotations(self, mask, image_id):
+        found = get_instances_from_mask(mask, self.label_map, connectivity=self.connectivity,
+                                        rle=self.segmentation is not None and self.instances)
+        if not self.instances:
+            # merge the instances of each class
+            merged = {}
+            for name, instances in found.items():
+                merged[name] = [{
+                    'bbox': {
+                        'ymin': min(i['bbox']['ymin'] for i in instances),
+                        'ymax': max(i['bbox']['ymax'] for i in instances),
+                        'xmin': min(i['bbox']['xmin'] for i in instances),
+                        'xmax': max(i['bbox']['xmax'] for i in instances),
+                    },
+                    'area': sum(i['area'] for i in instances),
+                }]
+            if self.segmentation is not None:
+                labels, class_names = _label_image(mask, self.label_map)
+                for name, rle in zip(class_names, _encode_labels(labels - 1, len(class_names))):
+                    if name in merged:
+                        merged[name][0]['rle'] = rle
+            found = merged
+
+        annotations = []
+        for name, instances in found.items():
+            for instance in instances:
+                bbox = instance['bbox']
+                annotation = {
+                    'id': self._next_annotation_id,
+                    'image_id': image_id,
+                    'category_id': self._category_ids[name],
+                    'bbox': [bbox['xmin'], bbox['ymin'], bbox['xmax'] - bbox['xmin'] + 1,
+                             bbox['ymax'] - bbox['ymin'] + 1],
+                    'area': instance['area'],
+                    'iscrowd': 0,
+                }
+                if self.segmentation == 'rle':
+                    annotation['segmentation'] = instance['rle']
+                elif self.segmentation == 'polygon':
+                    annotation['segmentation'] = _polygons(instance['rle'], bbox)
+                self._next_annotation_id += 1
+                annotations.append(annotation)
+        return annotations
+
+    def _add_keypoints(self, annotations, image_id, keypoints, visibility, width, height):
+        yx = np.array(keypoints, dtype=np.float64).reshape(-1, 2)
+        if visibility is None:
+            visibility = np.all((yx >= 0) & (yx <= 1), axis=1)
+        visibility = np.asarray(visibility)
+        if visibility.dtype == bool:
+            visibility = np.where(visibility, VISIBLE, OUT_OF_FRAME)
+        coco_keypoints = np.zeros((len(yx), 3))
+        coco_keypoints[:, 0] = yx[:, 1] * width
+        coco_keypoints[:, 1] = yx[:, 0] * height
+        coco_keypoints[:, 2] = visibility
+        coco_keypoints[visibility == OUT_OF_FRAME] = 0
+
+        category_id = self._category_ids[self.keypoint_category]
+        candidates = [a for a in annotations if a['category_id'] == category_id]
+        if candidates:
+            annotation = max(candidates, key=lambda a: a['area'])
+        else:
+            # there is no mask annotation to attach the keypoints to, so they get one of their own, boxed by the
+            # keypoints that are in the frame
+            in_frame = coco_keypoints[visibility != OUT_OF_FRAME, :2]
+            if len(in_frame):
+                (xmin, ymin), (xmax, ymax) = in_frame.min(axis=0), in_frame.max(axis=0)
+                bbox = [float(xmin), float(ymin), float(xmax - xmin), float(ymax - ymin)]
+            else:
+                bbox = [0.0, 0.0, 0.0, 0.0]
+            annotation = {
+                'id': self._next_annotation_id,
+                'image_id': image_id,
+                'category_id': category_id,
+                'bbox': bbox,
+                'area': 0,
+                'iscrowd': 0,
+            }
+            self._next_annotation_id += 1
+            annotations.append(annotation)
+        annotation['keypoints'] = [float(v) for v in coco_keypoints.ravel()]
+        annotation['num_keypoints'] = int(np.count_nonzero(visibility != OUT_OF_FRAME))
+
+    def close(self):
+        """Finishes writing the dataset. Calling this more than once has no effect."""
+        if self._closed:
+            return
+        self._closed = True
+        if self.format == 'json':
+            self._file.write('], "annotations": [')
+            self._annotations.seek(0)
+            shutil.copyfileobj(self._annotations, self._file)
+            self._annotations.close()
+            self._file.write(']}')
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
@@ -1,84 +1,15 @@
-import heapq
-import mathutils
+import collections
+import hashlib
+
 import numpy as np
 
-ALPHA = 8
-BETA = 0.65
-GAMMA = 1.5
-
-
-def _compute_rmax_rmin(curr_num, target_num, volume):
-    rmax = (volume / (4 * np.sqrt(2) * target_num)) ** (1 / 3)
-    rmin = rmax * (1 - (target_num / curr_num) ** GAMMA) * BETA
-    return rmax, rmin
-
-
-def _weight(d, rmax, rmin):
-    d_hat = min(d, 2 * rmax) if d > 2 * rmin else 2 * rmin
-    return (1 - (d_hat / (2 * rmax))) ** ALPHA
-
-
-def _sample_eliminate(points, target_num, stop_num, volume):
-    """Run sample elimination to get a Poisson disk distribution"""
-    kdtree = mathutils.kdtree.KDTree(len(points))
-    for i, point in enumerate(points):
-        kdtree.insert(point, i)
-    kdtree.balance()
-
-    rmax, rmin = _compute_rmax_rmin(len(points), target_num, volume)
-    heap = [
-        [
-            -sum(_weight(d, rmax, rmin) for _, _, d in kdtree.find_range(point, 2 * rmax)),
-            i
-        ]
-        for i, point in enumerate(points)
-    ]
-    # create a dict that maps from index to pointers into the heap
-    heap_dict = {e[1]: e for e in heap}
-    heapq.heapify(heap)
-
-    result_indices = []
-    curr_target = target_num
-    while len(heap_dict) > stop_num:
-        if len(heap_dict) == curr_target:
-            # move down target size by factors of 2, as in the paper
-            curr_target //= 2
-            # update rmax, rmin, and heap values
-            rmax, rmin = _compute_rmax_rmin(len(heap_dict), curr_target, volume)
-            heap = [
-                [
-                    -sum(_weight(d, rmax, rmin) for _, ni, d in kdtree.find_range(points[i], 2 * rmax)
-                         if ni in heap_dict.keys()),
-                    i
-                ]
-                for i in heap_dict.keys()
-            ]
-            heap_dict = {e[1]: e for e in heap}
-            heapq.heapify(heap)
-
-        _, index = heapq.heappop(heap)
-        if index == -1:
-            continue
-
-        if len(heap_dict) <= target_num:
-            # we've reached the original target, so we need to start keeping track of the ordering
-            result_indices.append(index)
-
-        del heap_dict[index]
-
-        # update points adjacent to the one that was just removed
-        for _, ni, d in kdtree.find_range(points[index], 2 * rmax):
-            if ni in heap_dict.keys():
-                # mark old value as dirty
-                heap_dict[ni][1] = -1
-                # insert new value
-                heap_dict[ni] = [heap_dict[ni][0] + _weight(d, rmax, rmin), ni]
-                heapq.heappush(heap, heap_dict[ni])
-
-    # reverse indices and then add the rest in no particular order
-    result_indices = result_indices[::-1] + list(heap_dict.keys())
-
-    return [points[i] for i in result_indices]
+from starfish.profiling import profiled
+from starfish.sampling import _build_kdtree, _kdtree_pairs, _sample_eliminate
+
+# the most recently used random candidates and their kd-trees, so that generating keypoints for the same object again
+# does not redistribute particles in Blender
+_CACHE_SIZE = 8
+_cache = collections.OrderedDict()
 
 
 def _distribute_particles_random(obj, num, seed):
@@ -113,7 +44,36 @@ def _distribute_particles_random(obj, num, seed):
         bpy.context.collection.objects.unlink(obj)
 
 
-def generate_keypoints(obj, num, stop=1, oversample=10, seed=0):
+def _cached(key, compute, use_cache):
+    if not use_cache:
+        return compute()
+    if key in _cache:
+        _cache.move_to_end(key)
+        return _cache[key]
+    value = _cache[key] = compute()
+    if len(_cache) > _CACHE_SIZE:
+        _cache.popitem(last=False)
+    return value
+
+
+def _mesh_key(mesh):
+    """Identifies the contents of a mesh, so that random points cached for it aren't reused after it is edited."""
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('co', co)
+    return mesh.name, len(mesh.vertices), len(mesh.polygons), hashlib.sha1(co.tobytes()).hexdigest()
+
+
+def _candidates(obj, num, seed, use_cache):
+    """Returns a tuple of the form (particles, kdtree) of num random points on the object's surface"""
+    def compute():
+        particles = _distribute_particles_random(obj, num, seed)
+        return particles, _build_kdtree(particles)
+    key = (obj.name, _mesh_key(obj.data), num, seed) if use_cache else None
+    return _cached(key, compute, use_cache)
+
+
+@profiled('generate_keypoints')
+def generate_keypoints(obj, num, stop=1, oversample=10, seed=0, existing=None, cache=True):
     """Generates evenly spaced 3D keypoints on the surface of an object.
 
     This function implements the Sample Elimination algorithm from
@@ -131,19 +91,39 @@ def generate_keypoints(obj, num, stop=1, oversample=10, seed=0):
     points in reverse order of elimination so that the first ``n`` points are also evenly spaced out for any ``1 <= n
     <= num``. The point at which Sample Elimination stops can be controlled with the ``stop`` parameter.
 
+    An existing set of keypoints can be extended with ``existing``: the existing keypoints are kept as they are, and
+    new keypoints are placed in the gaps between them. For example, to go from 200 keypoints to 400::
+
+        keypoints = generate_keypoints(obj, 200)
+        keypoints = generate_keypoints(obj, 400, existing=keypoints)
+
+    This reuses the random points that the existing keypoints were chosen from (as long as ``seed`` and ``oversample``
+    are the same and they were generated in the same session), and only distributes enough new random points for the
+    new keypoints.
+
+    The random points are cached by the object's name and the contents of its mesh, so they are distributed again if
+    the mesh's vertices are edited between calls.
+
     :param obj: (BlendDataObject): Blender object to operate on
     :param num: (int): number of points to generate
     :param stop: (int): an integer between 1 and ``num`` (inclusive) at which sample elimination will stop, default 1
     :param oversample: (float): amount of oversampling to do (see above), default 10
     :param seed: (int): seed for the initial random point generation
+    :param existing: (seq): a list of keypoints in object space to extend, e.g. the output of a previous call to this
+        function. Must be no longer than ``num``. (default: None)
+    :param cache: (bool): if False, do not reuse or cache random points (default: True)
 
     :return: A list of length ``num`` containing 3-tuples representing the coordinates of the keypoints in object space.
-        The first ``n`` elements of the list will also be evenly spaced out for any ``stop <= n <= num``.
+        The first ``n`` elements of the list will also be evenly spaced out for any ``stop <= n <= num``. If
+        ``existing`` is provided, then the list starts with those keypoints, and ``stop`` is at least their number.
     """
     if stop < 1 or stop > num:
         raise ValueError('stop must be between 1 and num, inclusive')
     if oversample < 1:
         raise ValueError('oversample must be greater than or equal to 1')
+    existing = [tuple(p) for p in existing] if existing is not None else []
+    if len(existing) > num:
+        raise ValueError('existing must not have more than num keypoints')
 
     import bmesh
     mesh = bmesh.new()
@@ -151,5 +131,21 @@ def generate_keypoints(obj, num, stop=1, oversample=10, seed=0):
     volume = mesh.calc_volume()
     mesh.free()
 
-    particles = _distribute_particles_random(obj, int(num * oversample), seed)
-    return _sample_eliminate(particles, num, stop, volume)
+    if not existing:
+        particles, kdtree = _candidates(obj, int(num * oversample), seed, cache)
+        find_pairs = _kdtree_pairs(particles, kdtree, len(particles))
+        return _sample_eliminate(particles, num, stop, volume, find_pairs=find_pairs)
+    if len(existing) == num:
+        return existing
+
+    # the random points that the existing keypoints were chosen from, plus more for the new keypoints
+    blocks = [_candidates(obj, int(len(existing) * oversample), seed, cache),
+              _candidates(obj, int((num - len(existing)) * oversample), seed + 1, cache)]
+    particles = blocks[0][0] + blocks[1][0]
+    key = ('kdtree', obj.name, _mesh_key(obj.data), len(blocks[0][0]), len(blocks[1][0]), seed) if cache else None
+    kdtree = _cached(key, lambda: _build_kdtree(particles), cache)
+    # the existing keypoints are fixed in place after the random points, and aren't in the kd-tree
+    points = particles + existing
+    fixed = range(len(particles), len(points))
+    return _sample_eliminate(points, num, max(stop, len(existing)), volume,
+                             find_pairs=_kdtree_pairs(points, kdtree, len(particles)), fixed=fixed)
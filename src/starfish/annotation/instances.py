@@ -0,0 +1,142 @@
+import numpy as np
+
+from starfish.profiling import profiled
+from .mask import _label_image, _read_mask
+from .rle import _encode_labels
+
+
+def _row_runs(labels):
+    """Splits every row of a label image into runs of equal labels.
+
+    :returns: a tuple of the form (rows, starts, ends, values) of arrays describing every run in raster order. The
+        runs of each row cover it completely, and ``ends`` is exclusive.
+    """
+    h, w = labels.shape
+    change = np.empty((h, w), dtype=bool)
+    change[:, 0] = True
+    np.not_equal(labels[:, 1:], labels[:, :-1], out=change[:, 1:])
+    flat_starts = np.flatnonzero(change)
+    rows, starts = np.divmod(flat_starts, w)
+    ends = np.append(flat_starts[1:], h * w) - rows * w
+    return rows, starts, ends, labels.ravel()[flat_starts]
+
+
+def _adjacent_runs(rows, starts, ends, values, width, connectivity):
+    """Finds every pair of runs in consecutive rows that touch each other and have the same nonzero label.
+
+    :returns: a tuple of index arrays (a, b) where run a[i] is in the row above run b[i]
+    """
+    reach = 1 if connectivity == 8 else 0
+    keys = rows * width + starts
+    b = np.flatnonzero((rows > 0) & (values != 0))
+    above = (rows[b] - 1) * width
+    first = np.searchsorted(keys, above + np.maximum(starts[b] - reach, 0), side='right') - 1
+    last = np.searchsorted(keys, above + np.minimum(ends[b] - 1 + reach, width - 1), side='right') - 1
+
+    # expand each run in b into a pair for every run in the range [first, last] of the row above it
+    num = last - first + 1
+    offsets = np.arange(num.sum()) - np.repeat(np.cumsum(num) - num, num)
+    a = np.repeat(first, num) + offsets
+    b = np.repeat(b, num)
+    same = values[a] == values[b]
+    return a[same], b[same]
+
+
+def _connected_components(num, a, b):
+    """Labels the connected components of a graph with ``num`` nodes and the edges (a[i], b[i]).
+
+    Uses vectorized hooking and pointer jumping, so the amount of Python-level work is independent of the size of the
+    graph.
+
+    :returns: an array mapping each node to the smallest node index in its component
+    """
+    parent = np.arange(num)
+    while True:
+        pa, pb = parent[a], parent[b]
+        unmerged = pa != pb
+        if not np.any(unmerged):
+            return parent
+        pa, pb = pa[unmerged], pb[unmerged]
+        # hook the larger root onto the smaller one
+        np.minimum.at(parent, np.maximum(pa, pb), np.minimum(pa, pb))
+        # then flatten every tree so that each node points directly at its root
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+
+
+@profiled('get_instances_from_mask')
+def get_instances_from_mask(mask, label_map, connectivity=8, rle=False):
+    """Gets the separate instances of each class from instance masks.
+
+    Unlike `get_bounding_boxes_from_mask`, which treats all of the pixels of a class as one object, this function
+    splits each class into connected components, so that e.g. two solar panels that don't touch in the image each get
+    their own bounding box. All classes are labeled together in a single pass over the image.
+
+    :param mask: path to mask image (str) or numpy array of mask image (RGB)
+    :param label_map: dictionary mapping classes (str) to their corresponding color(s). Each class can correspond to a
+        single color (e.g. ``{"cygnus": (0, 0, 206)}``) or multiple colors (e.g.
+        ``{"cygnus": [(0, 0, 206), (206, 0, 0)]}``)
+    :param connectivity: 8 if diagonally adjacent pixels are part of the same instance, or 4 if only horizontally and
+        vertically adjacent pixels are (default: 8)
+    :param rle: if True, also include a run-length encoding of each instance's mask, in the same format as
+        `encode_rle <starfish.annotation.rle.encode_rle>` (default: False)
+
+    :returns: a dictionary mapping classes (str) to a list of their instances, in the order that they first appear in
+        the image (top to bottom, left to right). Each instance is a dictionary with the keys 'bbox' (a dictionary
+        with the keys 'xmin', 'xmax', 'ymin', 'ymax'), 'centroid' (y, x), 'area' (number of pixels), and, if requested,
+        'rle'. If a class does not appear in the image, then it will not appear in the keys of the returned dictionary.
+    """
+    if connectivity not in (4, 8):
+        raise ValueError('connectivity must be either 4 or 8')
+    if isinstance(mask, str):
+        mask = _read_mask(mask)
+    labels, class_names = _label_image(mask, label_map)
+    h, w = labels.shape
+
+    rows, starts, ends, values = _row_runs(labels)
+    run_lengths = ends - starts
+    a, b = _adjacent_runs(rows, starts, ends, values, w, connectivity)
+    roots = _connected_components(len(values), a, b)
+
+    # number the components of foreground runs in order of first appearance
+    foreground = values != 0
+    component_roots, components = np.unique(roots[foreground], return_inverse=True)
+    num = len(component_roots)
+    rows, starts, ends, lengths = rows[foreground], starts[foreground], ends[foreground], run_lengths[foreground]
+
+    area = np.bincount(components, weights=lengths, minlength=num)
+    sum_y = np.bincount(components, weights=lengths * rows, minlength=num)
+    sum_x = np.bincount(components, weights=lengths * (starts + ends - 1) / 2, minlength=num)
+    ymin, xmin = np.full(num, h), np.full(num, w)
+    ymax, xmax = np.full(num, -1), np.full(num, -1)
+    np.minimum.at(ymin, components, rows)
+    np.maximum.at(ymax, components, rows)
+    np.minimum.at(xmin, components, starts)
+    np.maximum.at(xmax, components, ends - 1)
+
+    rles = None
+    if rle:
+        # rebuild the image with instance numbers instead of class labels, and encode all instances at once
+        run_instances = np.full(len(values), -1, dtype=np.int64)
+        run_instances[foreground] = components
+        rles = _encode_labels(np.repeat(run_instances, run_lengths).reshape(h, w), num)
+
+    instances = {}
+    for i, root in enumerate(component_roots):
+        instance = {
+            'bbox': {
+                'ymin': int(ymin[i]),
+                'ymax': int(ymax[i]),
+                'xmin': int(xmin[i]),
+                'xmax': int(xmax[i]),
+            },
+            'centroid': (int(sum_y[i] / area[i]), int(sum_x[i] / area[i])),
+            'area': int(area[i]),
+        }
+        if rles is not None:
+            instance['rle'] = rles[i]
+        instances.setdefault(class_names[values[root] - 1], []).append(instance)
+    return instances
@@ -1,6 +1,51 @@
-from mathutils import Vector
+import numpy as np
 
+from starfish.profiling import profiled
 
+OUT_OF_FRAME = 0
+"""Visibility flag for keypoints that are behind the camera or outside of the image."""
+OCCLUDED = 1
+"""Visibility flag for keypoints that are inside the image but hidden behind part of the object."""
+VISIBLE = 2
+"""Visibility flag for keypoints that can be seen in the image."""
+
+
+def _camera_space(keypoints, obj, camera):
+    """Transforms keypoints from object space into camera space, all at once.
+
+    :returns: an array of shape (n, 3)
+    """
+    matrix = np.array(camera.matrix_world.normalized().inverted() @ obj.matrix_world)
+    keypoints = np.asarray(keypoints, dtype=np.float64).reshape(-1, 3)
+    return keypoints @ matrix[:3, :3].T + matrix[:3, 3]
+
+
+def _camera_view(co, scene, camera):
+    """A vectorized version of ``bpy_extras.object_utils.world_to_camera_view`` that takes coordinates that are
+    already in camera space.
+
+    :returns: a tuple of the form (x, y, z) of arrays of normalized image coordinates, where (0, 0) is the bottom left
+        corner of the image, and z is the depth in front of the camera
+    """
+    z = -co[:, 2]
+    frame = camera.data.view_frame(scene=scene)
+    min_x, max_x = frame[2].x, frame[1].x
+    min_y, max_y = frame[1].y, frame[0].y
+    if camera.data.type != 'ORTHO':
+        # scale the camera frame to the depth of each point
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scale = -z / frame[0].z
+            x = (co[:, 0] - min_x * scale) / ((max_x - min_x) * scale)
+            y = (co[:, 1] - min_y * scale) / ((max_y - min_y) * scale)
+        behind = z == 0
+        x[behind], y[behind] = 0.5, 0.5
+    else:
+        x = (co[:, 0] - min_x) / (max_x - min_x)
+        y = (co[:, 1] - min_y) / (max_y - min_y)
+    return x, y, z
+
+
+@profiled('project_keypoints_onto_image')
 def project_keypoints_onto_image(keypoints, scene, obj, camera):
     """Converts 3D keypoints of an object into their corresponding 2D coordinates on the image.
 
@@ -26,9 +71,99 @@ def project_keypoints_onto_image(keypoints, scene, obj, camera):
     :return: a list of (y, x) coordinates in the same order as ``keypoints`` where (0, 0) is the top left corner of
         the image and (1, 1) is the bottom right
     """
-    from bpy_extras.object_utils import world_to_camera_view
-    results = []
-    for keypoint in keypoints:
-        camera_coord = world_to_camera_view(scene, camera, obj.matrix_world @ Vector(keypoint))
-        results.append((1 - camera_coord.y, camera_coord.x))
-    return results
+    if len(keypoints) == 0:
+        return []
+    x, y, _ = _camera_view(_camera_space(keypoints, obj, camera), scene, camera)
+    return list(zip((1 - y).tolist(), x.tolist()))
+
+
+def build_bvh(obj):
+    """Builds a BVH tree of an object's mesh in object space, for use with `get_keypoint_visibility`.
+
+    Since it is in object space, the same tree stays valid no matter how the object is moved or rotated, so it only
+    needs to be built once per object rather than once per frame.
+
+    :param obj: (BlendDataObject): the object to use
+
+    :returns: a `mathutils.bvhtree.BVHTree`
+    """
+    from mathutils.bvhtree import BVHTree
+    vertices = [tuple(v.co) for v in obj.data.vertices]
+    return BVHTree.FromPolygons(vertices, [tuple(p.vertices) for p in obj.data.polygons])
+
+
+def _read_depth(path):
+    import os
+    # OpenCV only reads EXR files if this is set before it is imported
+    os.environ.setdefault('OPENCV_IO_ENABLE_OPENEXR', '1')
+    import cv2
+    depth = cv2.imread(path, cv2.IMREAD_ANYDEPTH | cv2.IMREAD_ANYCOLOR)
+    if depth is None:
+        raise IOError(f'Could not read depth map from {path}')
+    return depth
+
+
+@profiled('get_keypoint_visibility')
+def get_keypoint_visibility(keypoints, scene, obj, camera, depth=None, bvh=None, radial_depth=False, tolerance=0.01):
+    """Determines which keypoints of an object can actually be seen in the image.
+
+    All keypoints are processed in one batch. Keypoints that are behind the camera or project outside of the image
+    are `OUT_OF_FRAME`. The remaining keypoints are tested for occlusion in one of two ways:
+
+    * If a rendered depth map (e.g. the Z pass of the render) is provided, each keypoint's depth is compared against
+      the depth stored at the pixel it projects onto. This also accounts for occlusion by other objects.
+    * Otherwise, a ray is cast from the camera to each keypoint using a BVH tree of the object's mesh. This only
+      accounts for the object occluding itself. The tree is built in object space, so pass the same tree (see
+      `build_bvh`) for every frame to avoid rebuilding it.
+
+    Like `project_keypoints_onto_image`, this should be called after `Frame.setup <starfish.Frame.setup>`.
+
+    :param keypoints: a list of 3D coordinates corresponding to the locations of the keypoints in the object space
+    :param scene: (BlendDataObject): the scene to use for aspect ratio calculations (see
+        `project_keypoints_onto_image`)
+    :param obj: (BlendDataObject): the object to use
+    :param camera: (BlendDataObject): the camera to use
+    :param depth: the rendered depth map as a numpy array of shape (h, w) or (h, w, c) (in which case the first channel
+        is used), or the path to one (e.g. an OpenEXR file) (default: None)
+    :param bvh: (mathutils.bvhtree.BVHTree): a BVH tree of the object's mesh in object space, used if ``depth`` is not
+        provided. If neither is provided, one is built with `build_bvh`. (default: None)
+    :param radial_depth: (bool): True if the values in ``depth`` are distances from the camera, or False if they are
+        distances along the camera's viewing axis (default: False)
+    :param tolerance: (float): how far behind the surface a keypoint may be and still be visible, as a fraction of its
+        distance from the camera (default: 0.01)
+
+    :returns: a numpy array with one of `VISIBLE`, `OCCLUDED`, or `OUT_OF_FRAME` for each keypoint. These match the
+        visibility flags of the COCO keypoint format.
+    """
+    co = _camera_space(keypoints, obj, camera)
+    x, y, z = _camera_view(co, scene, camera)
+    flags = np.full(len(co), VISIBLE, dtype=np.int8)
+    in_frame = (z > 0) & (x >= 0) & (x <= 1) & (y >= 0) & (y <= 1)
+    flags[~in_frame] = OUT_OF_FRAME
+    indices = np.flatnonzero(in_frame)
+
+    if depth is not None:
+        if isinstance(depth, str):
+            depth = _read_depth(depth)
+        depth = np.asarray(depth)
+        if depth.ndim == 3:
+            depth = depth[..., 0]
+        h, w = depth.shape
+        rows = np.clip(((1 - y[indices]) * h).astype(np.int64), 0, h - 1)
+        cols = np.clip((x[indices] * w).astype(np.int64), 0, w - 1)
+        keypoint_depth = np.linalg.norm(co[indices], axis=1) if radial_depth else z[indices]
+        occluded = keypoint_depth > depth[rows, cols] * (1 + tolerance)
+    else:
+        from mathutils import Vector
+        if bvh is None:
+            bvh = build_bvh(obj)
+        # cast rays in object space, from the camera towards each keypoint
+        origin = obj.matrix_world.inverted() @ camera.matrix_world.translation
+        occluded = np.zeros(len(indices), dtype=bool)
+        for i, keypoint in enumerate(np.asarray(keypoints, dtype=np.float64).reshape(-1, 3)[indices]):
+            direction = Vector(keypoint) - origin
+            distance = direction.length
+            hit = bvh.ray_cast(origin, direction.normalized(), distance * (1 - tolerance))
+            occluded[i] = hit[0] is not None
+    flags[indices[occluded]] = OCCLUDED
+    return flags
@@ -1,7 +1,56 @@
 import numpy as np
-import cv2
 
+from starfish.profiling import profiled
 
+
+def _read_mask(path):
+    # OpenCV is slow to import, so it is only imported when a mask actually needs to be read from disk
+    import cv2
+    return cv2.cvtColor(cv2.imread(path), cv2.COLOR_BGR2RGB)
+
+
+def _pack_colors(rgb):
+    """Packs the last axis of an array of RGB colors into single uint32 values."""
+    rgb = np.asarray(rgb)
+    return (rgb[..., 0].astype(np.uint32) << 16) | (rgb[..., 1].astype(np.uint32) << 8) | rgb[..., 2].astype(np.uint32)
+
+
+def _label_codes(label_map):
+    """Packs every color in a label map.
+
+    :returns: a tuple of the form (codes, classes) of arrays sorted by code, where ``classes[i]`` is 1 + the index in
+        the label map of the class that the packed color ``codes[i]`` belongs to
+    """
+    codes, classes = [], []
+    for i, colors in enumerate(label_map.values()):
+        colors = np.array(list(colors))
+        # if a single color is provided, turn it into a list of length 1
+        if len(colors.shape) == 1:
+            colors = colors[None, ...]
+        codes.extend(_pack_colors(colors).tolist())
+        classes.extend([i + 1] * len(colors))
+    if len(set(codes)) != len(codes):
+        raise ValueError('The same color was provided more than once in label_map')
+
+    order = np.argsort(codes)
+    return np.array(codes, dtype=np.uint32)[order], np.array(classes, dtype=np.int32)[order]
+
+
+def _label_image(mask, label_map):
+    """Converts an RGB mask into an image of class indices in a single pass over the pixels.
+
+    :returns: a tuple of the form (labels, class_names) where labels is an int32 array of shape (h, w) that is 0 for
+        pixels that don't belong to any class and ``i + 1`` for pixels that belong to ``class_names[i]``
+    """
+    class_names = list(label_map.keys())
+    codes, classes = _label_codes(label_map)
+    packed = _pack_colors(mask[..., :3])
+    indices = np.searchsorted(codes, packed).clip(max=len(codes) - 1)
+    labels = np.where(codes[indices] == packed, classes[indices], 0).astype(np.int32)
+    return labels, class_names
+
+
+@profiled('get_bounding_boxes_from_mask')
 def get_bounding_boxes_from_mask(mask, label_map):
     """Gets bounding boxes from instance masks.
 
@@ -15,7 +64,7 @@ def get_bounding_boxes_from_mask(mask, label_map):
         then it will not appear in the keys of the returned dictionary.
     """
     if isinstance(mask, str):
-        mask = cv2.cvtColor(cv2.imread(mask), cv2.COLOR_BGR2RGB)
+        mask = _read_mask(mask)
     bboxes = {}
     for class_name, colors in label_map.items():
         colors = np.array(list(colors))
@@ -34,6 +83,7 @@ def get_bounding_boxes_from_mask(mask, label_map):
     return bboxes
 
 
+@profiled('get_centroids_from_mask')
 def get_centroids_from_mask(mask, label_map):
     """Gets centroids from instance masks.
 
@@ -47,7 +97,7 @@ def get_centroids_from_mask(mask, label_map):
         then it will not appear in the keys of the returned dictionary.
     """
     if isinstance(mask, str):
-        mask = cv2.cvtColor(cv2.imread(mask), cv2.COLOR_BGR2RGB)
+        mask = _read_mask(mask)
     centroids = {}
     for class_name, colors in label_map.items():
         colors = np.array(list(colors))
@@ -61,7 +111,8 @@ def get_centroids_from_mask(mask, label_map):
     return centroids
 
 
-def normalize_mask_colors(mask, colors, color_variation_cutoff=6):
+@profiled('normalize_mask_colors')
+def normalize_mask_colors(mask, colors, color_variation_cutoff=6, writer=None):
     """
     Normalizes the colors of a mask image.
 
@@ -80,12 +131,14 @@ def normalize_mask_colors(mask, colors, color_variation_cutoff=6):
         cityblock distance of no more than this value. The default value is 6, or equivalently 2 in each
         RGB channel. I chose this value because, in my experience with Blender 2.8,
         the color variation is no more than 1 in each channel, a number I then doubled to be safe.
+    :param writer: (starfish.writer.AsyncWriter): if provided, overwriting the original mask on disk is handed off to
+        this writer instead of blocking until the write is finished (default: None)
     :returns: the normalized mask as a numpy array
     """
     mask_path = None
     if isinstance(mask, str):
         mask_path = mask
-        mask = cv2.cvtColor(cv2.imread(mask), cv2.COLOR_BGR2RGB)
+        mask = _read_mask(mask)
 
     colors = np.array(list(map(list, colors)))
 
@@ -106,5 +159,157 @@ def normalize_mask_colors(mask, colors, color_variation_cutoff=6):
 
     result = result.astype(np.uint8)
     if mask_path:
-        cv2.imwrite(mask_path, cv2.cvtColor(result, cv2.COLOR_RGB2BGR))
+        if writer is not None:
+            writer.write_image(mask_path, result)
+        else:
+            import cv2
+            cv2.imwrite(mask_path, cv2.cvtColor(result, cv2.COLOR_RGB2BGR))
     return result
+
+
+class MaskAnnotator:
+    """Computes the same annotations as `get_bounding_boxes_from_mask`, `get_centroids_from_mask`, and
+    `normalize_mask_colors`, but for many masks of the same resolution in a row, e.g. one per frame of a long render.
+
+    All of the full-resolution temporary arrays that those functions allocate on every call are allocated once, when
+    the annotator is created, and reused for every mask, so memory use stays flat however many masks are annotated::
+
+        annotator = MaskAnnotator(label_map, (1080, 1920), colors=[(0, 0, 0), (255, 255, 255)])
+        for frame in sequence:
+            ...
+            mask = annotator.normalize(read_mask(out=mask_buffer))
+            frame.bboxes = annotator.bounding_boxes(mask)
+            frame.centroids = annotator.centroids(mask)
+
+    Attributes:
+
+    * label_map: The label map, as given.
+    * shape: The (height, width) of the masks.
+    * colors: A uint8 array of shape (n, 3) of the colors that `normalize` snaps pixels to, or None.
+    """
+
+    def __init__(self, label_map, shape, colors=None, color_variation_cutoff=6):
+        """
+        :param label_map: dictionary mapping classes (str) to their corresponding color(s), the same as for
+            `get_bounding_boxes_from_mask`
+        :param shape: (seq of int, len 2): the (height, width) of the masks
+        :param colors: a list of what the label colors are supposed to be, each in [R, G, B] format, the same as for
+            `normalize_mask_colors`. Only needed to use `normalize`. (default: None)
+        :param color_variation_cutoff: the same as for `normalize_mask_colors` (default: 6)
+        """
+        self.label_map = label_map
+        self.shape = tuple(shape)
+        self.class_names = list(label_map.keys())
+        self._codes, self._classes = _label_codes(label_map)
+        self.colors = None if colors is None else np.array(list(map(list, colors)), dtype=np.uint8)
+        self.color_variation_cutoff = color_variation_cutoff
+
+        h, w = self.shape
+        self._packed = np.empty((h, w), dtype=np.uint32)
+        self._channel = np.empty((h, w), dtype=np.uint32)
+        self._labels = np.empty((h, w), dtype=np.int32)
+        self._class_mask = np.empty((h, w), dtype=bool)
+        self._rows = np.empty(h, dtype=np.int64)
+        self._columns = np.empty(w, dtype=np.int64)
+        self._row_indices = np.arange(h)
+        self._column_indices = np.arange(w)
+        if self.colors is not None:
+            self._difference = np.empty((h, w, 3), dtype=np.int16)
+            self._distance = np.empty((h, w), dtype=np.int16)
+            self._counts = np.empty((h, w), dtype=np.uint8)
+            self._indices = np.empty((h, w), dtype=np.intp)
+            self._result = np.empty((h, w, 3), dtype=np.uint8)
+
+    def _check(self, mask):
+        if isinstance(mask, str):
+            mask = _read_mask(mask)
+        if mask.shape[:2] != self.shape:
+            raise ValueError(f'Expected a mask of shape {self.shape}, got {mask.shape[:2]}')
+        return mask
+
+    def labels(self, mask):
+        """Converts an RGB mask into an image of class indices.
+
+        :param mask: path to mask image (str) or numpy array of mask image (RGB)
+
+        :returns: an int32 array of shape (h, w) that is 0 for pixels that don't belong to any class and ``i + 1`` for
+            pixels that belong to the i-th class of the label map. The array is reused, so it is overwritten by the
+            next call.
+        """
+        mask = self._check(mask)
+        packed, channel = self._packed, self._channel
+        packed[...] = mask[..., 0]
+        for c in (1, 2):
+            np.left_shift(packed, 8, out=packed)
+            channel[...] = mask[..., c]
+            np.bitwise_or(packed, channel, out=packed)
+        self._labels.fill(0)
+        for code, cls in zip(self._codes, self._classes):
+            np.equal(packed, code, out=self._class_mask)
+            np.copyto(self._labels, cls, where=self._class_mask)
+        return self._labels
+
+    def _extents(self, mask):
+        """Yields (class_name, rows, columns) for every class that appears in the mask, where rows and columns are the
+        number of pixels of the class in each row and column."""
+        labels = self.labels(mask)
+        for i, class_name in enumerate(self.class_names):
+            np.equal(labels, i + 1, out=self._class_mask)
+            np.sum(self._class_mask, axis=1, out=self._rows)
+            if not self._rows.any():
+                continue
+            np.sum(self._class_mask, axis=0, out=self._columns)
+            yield class_name, self._rows, self._columns
+
+    @profiled('MaskAnnotator.bounding_boxes')
+    def bounding_boxes(self, mask):
+        """Same as `get_bounding_boxes_from_mask`."""
+        bboxes = {}
+        for class_name, rows, columns in self._extents(mask):
+            ys, xs = rows.nonzero()[0], columns.nonzero()[0]
+            bboxes[class_name] = {'ymin': int(ys[0]), 'ymax': int(ys[-1]), 'xmin': int(xs[0]), 'xmax': int(xs[-1])}
+        return bboxes
+
+    @profiled('MaskAnnotator.centroids')
+    def centroids(self, mask):
+        """Same as `get_centroids_from_mask`."""
+        centroids = {}
+        for class_name, rows, columns in self._extents(mask):
+            total = rows.sum()
+            centroids[class_name] = (int(self._row_indices @ rows / total), int(self._column_indices @ columns / total))
+        return centroids
+
+    @profiled('MaskAnnotator.normalize')
+    def normalize(self, mask, out=None):
+        """Same as `normalize_mask_colors` with the annotator's colors, except that nothing is written to disk.
+
+        :param mask: path to mask image (str) or numpy array of mask image (RGB)
+        :param out: (np.ndarray): a uint8 array of shape (h, w, 3) to write the normalized mask into. This may be the
+            mask itself. If None, an array owned by the annotator is used, which is overwritten by the next call.
+            (default: None)
+
+        :returns: the normalized mask
+        """
+        if self.colors is None:
+            raise ValueError('The annotator was created without colors to normalize to')
+        mask = self._check(mask)
+        counts = self._counts
+        counts.fill(0)
+        for i, color in enumerate(self.colors):
+            # cityblock distance from each pixel to this color
+            np.subtract(mask[..., :3], color, out=self._difference, dtype=np.int16, casting='unsafe')
+            np.abs(self._difference, out=self._difference)
+            np.sum(self._difference, axis=2, out=self._distance)
+            np.less(self._distance, self.color_variation_cutoff, out=self._class_mask)
+            np.add(counts, self._class_mask, out=counts)
+            np.copyto(self._indices, i, where=self._class_mask)
+
+        # check to make sure that every pixel belongs to exactly one label
+        if counts.max() > 1:
+            raise ValueError('At least one pixel in the mask belongs to more than one class')
+        if counts.min() < 1:
+            raise ValueError('At least one pixel in the mask does not belong to a class')
+
+        out = self._result if out is None else out
+        # indices are always in range, and mode='clip' keeps numpy from buffering the output
+        return np.take(self.colors, self._indices, axis=0, out=out, mode='clip')
@@ -0,0 +1,70 @@
+import numpy as np
+
+
+def encode_rle(mask):
+    """Run-length encodes a binary mask in the uncompressed
+    `COCO format <https://cocodataset.org/#format-data>`_.
+
+    :param mask: numpy array of shape (h, w) that is nonzero wherever the mask is set
+
+    :returns: a dictionary with the keys 'size', which is ``[h, w]``, and 'counts', which is a list of alternating
+        run lengths of unset and set pixels in column-major order, starting with unset pixels.
+    """
+    h, w = mask.shape
+    flat = np.asarray(mask, dtype=bool).T.ravel()
+    boundaries = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+    counts = np.diff(np.concatenate(([0], boundaries, [flat.size])))
+    if flat.size and flat[0]:
+        counts = np.concatenate(([0], counts))
+    return {'size': [h, w], 'counts': counts.tolist()}
+
+
+def decode_rle(rle):
+    """Decodes a run-length encoding produced by `encode_rle` back into a binary mask.
+
+    :returns: a boolean numpy array of shape ``rle['size']``
+    """
+    h, w = rle['size']
+    counts = np.asarray(rle['counts'], dtype=np.int64)
+    values = np.arange(len(counts)) % 2 == 1
+    return np.repeat(values, counts).reshape(w, h).T
+
+
+def rle_area(rle):
+    """Returns the number of set pixels in a run-length encoded mask."""
+    return int(sum(rle['counts'][1::2]))
+
+
+def _encode_labels(labels, num):
+    """Run-length encodes every label ``0 <= i < num`` of an integer label image in a single pass.
+
+    :returns: a list of length ``num`` of run-length encodings in the same format as `encode_rle`
+    """
+    h, w = labels.shape
+    flat = labels.T.ravel()
+    starts = np.concatenate(([0], np.flatnonzero(flat[1:] != flat[:-1]) + 1))
+    lengths = np.diff(np.concatenate((starts, [flat.size])))
+    values = flat[starts]
+
+    keep = (values >= 0) & (values < num)
+    starts, lengths, values = starts[keep], lengths[keep], values[keep]
+    # group runs by label while keeping them in column-major order within each label
+    order = np.argsort(values, kind='stable')
+    starts, lengths, values = starts[order], lengths[order], values[order]
+
+    ends = starts + lengths
+    first = np.ones(len(values), dtype=bool)
+    first[1:] = values[1:] != values[:-1]
+    previous_ends = np.where(first, 0, np.roll(ends, 1))
+    pairs = np.column_stack((starts - previous_ends, lengths))
+
+    rles = [{'size': [h, w], 'counts': [h * w]} for _ in range(num)]
+    group_starts = np.flatnonzero(first)
+    group_ends = np.append(group_starts[1:], len(values))
+    for label, i, j in zip(values[group_starts], group_starts, group_ends):
+        counts = pairs[i:j].ravel().tolist()
+        tail = flat.size - int(ends[j - 1])
+        if tail > 0:
+            counts.append(tail)
+        rles[label]['counts'] = counts
+    return rles
@@ -0,0 +1,276 @@
+"""
+This module skips re-rendering frames that have already been rendered, e.g. when a dataset is regenerated after only a
+few of its frames have changed.
+
+Every frame gets a content hash (`frame_hash`) that covers its 6 parameters, any extra metadata attributes, and a
+fingerprint of everything else that affects the picture (the .blend file, the render settings, etc., see
+`scene_fingerprint`). An `OutputCache` stores the files that were rendered for each hash in a directory, and restores
+them by hard-linking or copying them when a frame with the same hash comes up again. The least recently used entries
+are deleted once the cache grows past a size limit::
+
+    cache = OutputCache('/data/cache', max_bytes=50 * 2 ** 30, fingerprint=scene_fingerprint(bpy.data.filepath))
+    for i, frame in enumerate(sequence):
+        files = {'real.png': f'out/real_{i}.png', 'mask.png': f'out/mask_{i}.png', 'meta.json': f'out/meta_{i}.json'}
+        if cache.restore(frame, files):
+            continue
+        ...  # render and annotate the frame, writing the files
+        cache.store(frame, files)
+"""
+
+import collections
+import hashlib
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+
+from .profiling import count, profiled
+from .utils import _recursive_jsonify
+
+_ROTATIONS = ('pose', 'lighting', 'background')
+
+
+def _canonical(value):
+    """Makes values that render the same picture serialize the same way (e.g. 100 and 100.0, or -0.0 and 0.0)."""
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value) + 0.0
+    return value
+
+
+def _digest(payload):
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+
+def frame_hash(frame, fingerprint='', metadata=True):
+    """Computes a stable content hash of a frame, which only changes if something that affects its outputs changes.
+
+    The hash covers the 6 frame parameters and, if ``metadata`` is True, any extra attributes that have been set on the
+    frame (e.g. ``sequence_name``), which must be JSON serializable. The `translation <starfish.Frame.translation>` is
+    left out, since it is computed from the other parameters. Rotations q and -q are the same rotation, so they hash the
+    same.
+
+    :param frame: (starfish.Frame): the frame to hash
+    :param fingerprint: (str): a fingerprint of everything besides the frame that affects the outputs, e.g. from
+        `scene_fingerprint` (default: '')
+    :param metadata: (bool): whether to include extra attributes in the hash (default: True)
+
+    :returns: a hexadecimal SHA-256 digest
+    """
+    params = _recursive_jsonify(vars(frame))
+    params.pop('translation', None)
+    if not metadata:
+        params = {name: params[name] for name in ('position', 'distance', 'pose', 'lighting', 'offset', 'background')}
+    params = _canonical(params)
+    for name in _ROTATIONS:
+        q = params[name]
+        if next((x for x in q if x != 0), 0) < 0:
+            params[name] = [-x + 0.0 for x in q]
+    return _digest({'frame': params, 'fingerprint': fingerprint})
+
+
+def scene_fingerprint(*paths, **settings):
+    """Computes a fingerprint of the files and settings that a render depends on, to pass to `frame_hash` or
+    `OutputCache`.
+
+    :param paths: (str): files whose contents affect the render, e.g. the .blend file (``bpy.data.filepath``) and any
+        textures or background images it loads
+    :param settings: any other JSON serializable values that affect the render, e.g. ``resolution=(1920, 1080)``
+
+    :returns: a hexadecimal SHA-256 digest
+    """
+    contents = []
+    for path in paths:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(2 ** 20), b''):
+                digest.update(block)
+        contents.append(digest.hexdigest())
+    return _digest({'files': contents, 'settings': _canonical(_recursive_jsonify(settings))})
+
+
+def _check_name(name):
+    if not name or name in ('.', '..') or os.path.basename(name) != name:
+        raise ValueError(f'Invalid file name {name!r}: must be a plain file name without directories')
+
+
+def _place(source, destination, link):
+    """Hard-links (or, if that isn't possible, copies) source to destination, replacing destination if it exists."""
+    directory = os.path.dirname(destination)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if os.path.lexists(destination):
+        os.remove(destination)
+    if link:
+        try:
+            os.link(source, destination)
+            return
+        except OSError:
+            # e.g. a different file system, or one that doesn't support hard links
+            pass
+    shutil.copy2(source, destination)
+
+
+class OutputCache:
+    """A content-addressed cache of the files rendered for each frame, with least recently used eviction.
+
+    Each entry is a directory named after the frame's `frame_hash`, containing one file per output. Entries are written
+    to a temporary directory first and then renamed into place, so several processes can share one cache directory.
+    The time each entry was last used is stored as the modification time of its directory, so the eviction order
+    carries over between runs.
+
+    Attributes:
+
+    * directory: The directory that the cache is stored in.
+    * max_bytes: The maximum total size of the cached files, or None for no limit.
+    * fingerprint: The fingerprint that is included in every frame's hash.
+    * size: The total size of the cached files, in bytes.
+    """
+
+    def __init__(self, directory, max_bytes=None, fingerprint='', link=True):
+        """
+        :param directory: (str): the directory to store the cache in. It is created if it doesn't exist.
+        :param max_bytes: (int): the maximum total size of the cached files. The least recently used entries are
+            deleted whenever the cache grows larger than this. If None, nothing is ever deleted. (default: None)
+        :param fingerprint: (str): a fingerprint of everything besides the frames that affects the outputs, e.g. from
+            `scene_fingerprint`. Outputs cached with a different fingerprint are never restored. (default: '')
+        :param link: (bool): if True, restore files by hard-linking them to the cache instead of copying them where
+            possible, which is faster and takes no extra space, but means that restored files must not be modified in
+            place (default: True)
+        """
+        if max_bytes is not None and max_bytes < 0:
+            raise ValueError('max_bytes must not be negative')
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.fingerprint = fingerprint
+        self.link = link
+        os.makedirs(directory, exist_ok=True)
+
+        # key -> total size of the entry's files, ordered from least to most recently used
+        self._entries = collections.OrderedDict()
+        found = []
+        for prefix in os.listdir(directory):
+            if prefix.startswith('.') or not os.path.isdir(os.path.join(directory, prefix)):
+                continue
+            for key in os.listdir(os.path.join(directory, prefix)):
+                if key.startswith('.'):
+                    # an entry that was never finished
+                    continue
+                path = self._path(key)
+                size = sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+                found.append((os.stat(path).st_mtime, key, size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+        self.size = sum(self._entries.values())
+
+    def _path(self, key, name=None):
+        path = os.path.join(self.directory, key[:2], key)
+        return path if name is None else os.path.join(path, name)
+
+    def key(self, frame):
+        """Returns the cache key of a frame (its `frame_hash` with this cache's fingerprint), or passes a key
+        through."""
+        return frame if isinstance(frame, str) else frame_hash(frame, self.fingerprint)
+
+    def files(self, frame):
+        """Returns the names of the files cached for a frame (or key), or None if it isn't cached."""
+        key = self.key(frame)
+        if key not in self._entries:
+            return None
+        return sorted(os.listdir(self._path(key)))
+
+    @profiled('OutputCache.restore')
+    def restore(self, frame, files):
+        """Restores the cached outputs of a frame, if they are all cached.
+
+        :param frame: (starfish.Frame or str): the frame, or its key
+        :param files: (dict): maps the name of each output (as it was stored) to the path to restore it to
+
+        :returns: True if every file was restored, or False if the frame (or any of the files) isn't cached, in which
+            case nothing is restored
+        """
+        key = self.key(frame)
+        cached = key in self._entries and all(os.path.isfile(self._path(key, name)) for name in files)
+        if not cached:
+            count('cache.misses')
+            return False
+        for name, destination in files.items():
+            _place(self._path(key, name), destination, self.link)
+        self._touch(key)
+        count('cache.hits')
+        return True
+
+    @profiled('OutputCache.store')
+    def store(self, frame, files):
+        """Copies the outputs of a frame into the cache, replacing any that are already cached for it, and then evicts
+        the least recently used entries if the cache is too large.
+
+        :param frame: (starfish.Frame or str): the frame, or its key
+        :param files: (dict): maps the name of each output to the path of the rendered file. Names must be plain file
+            names, e.g. 'mask.png'.
+
+        :returns: the frame's key
+        """
+        key = self.key(frame)
+        for name in files:
+            _check_name(name)
+        # write the entry next to its final location and rename it into place, so that it is never seen half-written
+        temporary = os.path.join(self.directory, key[:2], f'.{key}.{uuid.uuid4().hex}')
+        os.makedirs(temporary)
+        for name, source in files.items():
+            shutil.copy2(source, os.path.join(temporary, name))
+        if key in self._entries:
+            self._remove(key)
+        try:
+            os.replace(temporary, self._path(key))
+        except OSError:
+            # another process stored the same entry first
+            shutil.rmtree(temporary, ignore_errors=True)
+        size = sum(entry.stat().st_size for entry in os.scandir(self._path(key)) if entry.is_file())
+        self._entries[key] = size
+        self.size += size
+        self._touch(key)
+        self.evict()
+        return key
+
+    def evict(self, max_bytes=None):
+        """Deletes the least recently used entries until the cache is no larger than ``max_bytes``.
+
+        :param max_bytes: (int): the size to shrink the cache to (default: the cache's ``max_bytes``)
+
+        :returns: the number of entries that were deleted
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        if max_bytes is None:
+            return 0
+        evicted = 0
+        while self._entries and self.size > max_bytes:
+            self._remove(next(iter(self._entries)))
+            evicted += 1
+        count('cache.evictions', evicted)
+        return evicted
+
+    def clear(self):
+        """Deletes every entry."""
+        self.evict(0)
+
+    def _touch(self, key):
+        self._entries.move_to_end(key)
+        os.utime(self._path(key))
+
+    def _remove(self, key):
+        self.size -= self._entries.pop(key)
+        shutil.rmtree(self._path(key), ignore_errors=True)
+
+    def __contains__(self, frame):
+        return self.key(frame) in self._entries
+
+    def __len__(self):
+        return len(self._entries)
@@ -1,4 +1,4 @@
 from .frame import Frame
-from .sequence import Sequence
+from .sequence import InterpolatedSequence, Sequence
 
-__all__ = ['Frame', 'Sequence']
+__all__ = ['Frame', 'InterpolatedSequence', 'Sequence']
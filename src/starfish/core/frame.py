@@ -1,6 +1,7 @@
 import numpy as np
 from mathutils import Quaternion, Vector, Euler
 
+from starfish.profiling import profiled, stage
 from starfish.rotations import Spherical
 from starfish.utils import to_quat, jsonify
 
@@ -77,6 +78,7 @@ class Frame:
         """
         return jsonify(self)
 
+    @profiled('Frame.setup')
     def setup(self, scene, obj, camera, sun):
         """Sets up a camera, object, and sun into the picture-taking position. Also computes and stores the translation
         vector of the object.
@@ -105,7 +107,8 @@ class Frame:
         # from bpy_extras.object_utils.world_to_camera_view. After inspecting the source code,
         # the `view_frame` method seems to only need the `scene` argument to compute the output
         # aspect ratio, hence the warning in this method's docstring.
-        view_frame = camera.data.view_frame(scene=scene)[0]
+        with stage('Frame.setup.view_frame'):
+            view_frame = camera.data.view_frame(scene=scene)[0]
         x_offset = (x_frac - 0.5) * 2 * view_frame.x
         y_offset = (y_frac - 0.5) * 2 * view_frame.y
         x_angle = np.arctan2(x_offset, -view_frame.z)
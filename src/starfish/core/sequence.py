@@ -1,7 +1,10 @@
 import numpy as np
 from copy import deepcopy
+from mathutils import Quaternion
 
-from starfish.utils import cartesian
+from starfish.profiling import profiled
+from starfish.rotations import QuaternionArray, _continuous, _squad, _squad_controls
+from starfish.utils import CartesianProduct
 from .frame import Frame
 
 
@@ -16,16 +19,16 @@ def interp(a, b, n, endpoint=True):
 
     :returns: List of starfish.Frame objects
     """
+    factors = np.linspace(0, 1, n, endpoint)
     # each key is an argument to the Frame constructor
     lists = {
         "position": np.array([np.linspace(x, y, n, endpoint) for x, y in zip(a.position, b.position)]).T,
         "distance": np.linspace(a.distance, b.distance, n, endpoint),
-        "pose": [a.pose.slerp(b.pose, t) for t in np.linspace(0, 1, n, endpoint)],
-        "lighting": [a.lighting.slerp(b.lighting, t) for t in np.linspace(0, 1, n, endpoint)],
+        "pose": QuaternionArray(a.pose).slerp(b.pose, factors),
+        "lighting": QuaternionArray(a.lighting).slerp(b.lighting, factors),
         "offset": [t for t in zip(np.linspace(a.offset[0], b.offset[0], n, endpoint),
                                   np.linspace(a.offset[1], b.offset[1], n, endpoint))],
-        "background": [a.background.slerp(b.background, t) for t in
-                       np.linspace(0, 1, n, endpoint)]
+        "background": QuaternionArray(a.background).slerp(b.background, factors)
     }
 
     # creates Frames out of the dict of lists
@@ -65,7 +68,7 @@ class Sequence:
         The arguments to this constructor are the same as those to the `Frame` constructor, except instead of
         a single value, each argument may also be a list of values. For example, while ``position`` is normally an
         iterable of length 3 representing a 3D vector, it could instead be a list of 3D vectors (i.e. an array of
-        shape (n, 3)).
+        shape (n, 3)). Lists of rotations may also be given as a `QuaternionArray <starfish.rotations.QuaternionArray>`.
 
         This constructor then generates a list of frames where the parameters for each frame come from these lists,
         zipped together.
@@ -82,7 +85,7 @@ class Sequence:
 
         :returns: A `Sequence` object.
         """
-        if not all(isinstance(v, list) or isinstance(v, np.ndarray) for v in kwargs.values()):
+        if not all(isinstance(v, (list, np.ndarray, QuaternionArray)) for v in kwargs.values()):
             raise ValueError('Non-list argument provided')
         kwargs_multi = {k: v for k, v in kwargs.items() if len(v) > 1}
         if kwargs_multi:
@@ -101,7 +104,36 @@ class Sequence:
         return cls([Frame(**args) for args in kwargs_per_frame])
 
     @classmethod
-    def interpolated(cls, waypoints, counts):
+    def random(cls, n, seed=0, skip=0, rotations=('pose',), **ranges):
+        """Creates a sequence of frames with random parameters that can be reproduced exactly from ``seed``.
+
+        Each frame's parameters only depend on ``seed`` and the frame's index, so a long random sequence can be
+        generated in parts, e.g. by several processes or by each render worker for just the frames that it needs, and
+        the parts are identical to the same frames of one serial run::
+
+            sequence = Sequence.random(1000000, seed=42, rotations=('pose', 'lighting'), distance=(20, 60))
+            # the same as sequence[300000:310000]
+            part = Sequence.random(10000, seed=42, skip=300000, rotations=('pose', 'lighting'), distance=(20, 60))
+
+        See `frame_parameters <starfish.sampling.frame_parameters>` and `random_points
+        <starfish.sampling.random_points>` for the details.
+
+        :param n: (int): the number of frames to generate
+        :param seed: (int or numpy.random.SeedSequence): the root seed (default: 0)
+        :param skip: (int): the index of the first frame to generate (default: 0)
+        :param rotations: (seq of str): the rotation parameters to sample uniformly from SO(3) (default: ('pose',))
+        :param ranges: the (low, high) range to sample each numeric parameter from. For parameters with multiple
+            values (e.g. 'position' and 'offset'), provide a list of ranges, one for each value.
+
+        :returns: A `Sequence` object.
+        """
+        from starfish.sampling import frame_parameters
+        params = frame_parameters(n, rotations=rotations, method='random', skip=skip, seed=seed, **ranges)
+        return cls([Frame(**dict(zip(params.keys(), values))) for values in zip(*params.values())] if params else
+                   [Frame() for _ in range(n)])
+
+    @classmethod
+    def interpolated(cls, waypoints, counts, method='linear', lazy=False):
         """Creates a sequence interpolated from a list of waypoints.
 
         :param waypoints: (seq): A starfish.Sequence object (or just a list of starfish.Frame objects) representing the
@@ -110,25 +142,15 @@ class Sequence:
             counts[i] frames in between waypoints[i] (inclusive) and waypoints[i+1] (exclusive). The total number of
             frames in the sequence will be sum(counts) + 1. The length of counts should be 1 less than the length of
             waypoints. (If count is an integer, then there should only be 2 waypoints.)
+        :param method: (str): 'linear' to interpolate each pair of waypoints separately, or 'spline' to follow a smooth
+            curve through all of the waypoints (see `InterpolatedSequence`) (default: 'linear')
+        :param lazy: (bool): if True, return an `InterpolatedSequence`, which only computes frames when they are
+            accessed, instead of computing every frame up front (default: False)
 
         :returns: A `Sequence` object.
         """
-        try:
-            iter(counts)
-        except TypeError:
-            counts = [counts]
-
-        if len(counts) != len(waypoints) - 1:
-            raise ValueError('The length of counts should be 1 less than the length of waypoints.')
-
-        frames = []
-        # add frames for all but last waypoint
-        for a, b, n in zip(waypoints, waypoints[1:], counts):
-            frames += interp(a, b, n, endpoint=False)
-        # add endpoint
-        frames.append(waypoints[-1])
-
-        return cls(frames)
+        sequence = InterpolatedSequence(waypoints, counts, method)
+        return sequence if lazy else cls(list(sequence))
 
     @classmethod
     def exhaustive(cls, **kwargs):
@@ -145,18 +167,30 @@ class Sequence:
 
         :returns: A `Sequence` object.
         """
-        if not all(isinstance(v, list) or isinstance(v, np.ndarray) for v in kwargs.values()):
+        if not all(isinstance(v, (list, np.ndarray, QuaternionArray)) for v in kwargs.values()):
             raise ValueError('Non-list argument provided')
 
         if not kwargs:
             return cls([Frame()])
 
-        # get cartesian product of all parameter lists
-        combos = cartesian(*kwargs.values())
-        # create a frame from each one and return
-        frame_kwargs = [dict(zip(kwargs.keys(), combo)) for combo in combos]
-        return cls([Frame(**args) for args in frame_kwargs])
+        # create a frame from each combination of parameters in the cartesian product of all parameter lists
+        keys = list(kwargs.keys())
+        return cls([Frame(**dict(zip(keys, combo))) for combo in CartesianProduct(*kwargs.values())])
+
+    def describe(self, bins=10, threshold=None):
+        """Summarizes the distribution of the frames' parameters: histograms of distance, offset coverage, the spread
+        of each rotation, and the number of duplicate frames. See `starfish.statistics.describe` for the details.
+
+        :param bins: (int): the number of bins in each histogram (default: 10)
+        :param threshold: (float): if given, also count the frames that are within this geodesic distance (in radians)
+            of an earlier frame (default: None)
 
+        :returns: a dictionary that can be serialized to JSON
+        """
+        from starfish.statistics import describe
+        return describe(self, bins, threshold)
+
+    @profiled('Sequence.bake')
     def bake(self, scene, obj, camera, sun, num=None):
         """
         Creates keyframes representing this sequence, so that it can be played as a preview animation.  Keyframes will
@@ -208,4 +242,142 @@ class Sequence:
         del self.frames[key]
 
     def __add__(self, other):
-        return self.frames + other.frames
+        return list(self) + list(other)
+
+
+def _catmull_rom(values, segments, t):
+    """Evaluates the Catmull-Rom spline through the rows of ``values`` of shape (m, k) in each segment at factors t.
+    The first and last rows are repeated, so the curve starts and ends with half the speed of a straight line."""
+    last = len(values) - 1
+    p0, p1 = values[np.maximum(segments - 1, 0)], values[segments]
+    p2, p3 = values[segments + 1], values[np.minimum(segments + 2, last)]
+    t = t[:, None]
+    return 0.5 * (2 * p1 + (p2 - p0) * t + (2 * p0 - 5 * p1 + 4 * p2 - p3) * t ** 2
+                  + (3 * (p1 - p2) + p3 - p0) * t ** 3)
+
+
+class InterpolatedSequence(Sequence):
+    """A sequence interpolated from a list of waypoints, whose frames are only computed when they are accessed.
+
+    The frames are the same as those of `Sequence.interpolated`, but they aren't stored: indexing finds the segment of
+    a frame with a binary search over the cumulative counts and interpolates just that frame, and slicing or iterating
+    interpolates frames in vectorized batches. This makes it possible to work with trajectories through thousands of
+    waypoints with far more frames than fit in memory::
+
+        sequence = Sequence.interpolated(waypoints, [10000] * (len(waypoints) - 1), method='spline', lazy=True)
+        frame = sequence[123456789]
+        for frame in sequence[::1000]:
+            ...
+
+    With the 'linear' method, positions, distances, and offsets are interpolated linearly and rotations are
+    interpolated with slerp, separately for each pair of waypoints. With the 'spline' method, positions, distances,
+    and offsets follow a Catmull-Rom spline and rotations use SQUAD (spherical quadrangle interpolation), so the
+    parameters change smoothly through the waypoints rather than changing direction abruptly at each one.
+
+    The frames are computed on the fly, so they can't be assigned to or deleted.
+    """
+
+    # the number of frames interpolated at once while iterating
+    _BATCH_SIZE = 4096
+
+    def __init__(self, waypoints, counts, method='linear'):
+        """
+        :param waypoints: (seq): a `Sequence` or list of frames to interpolate between
+        :param counts: (int or seq): the number of frames between each pair of waypoints, as in `Sequence.interpolated`
+        :param method: (str): 'linear' or 'spline' (default: 'linear')
+        """
+        from starfish.statistics import frame_arrays
+
+        try:
+            iter(counts)
+        except TypeError:
+            counts = [counts]
+        if len(counts) != len(waypoints) - 1:
+            raise ValueError('The length of counts should be 1 less than the length of waypoints.')
+        if method not in ('linear', 'spline'):
+            raise ValueError(f'Unknown method: {method}')
+        counts = np.asarray(counts, dtype=np.int64)
+        if np.any(counts < 0):
+            raise ValueError('counts must not be negative')
+
+        self.waypoints = list(waypoints)
+        self.counts = counts
+        self.method = method
+        # the index of the first frame of each segment, followed by the index of the last waypoint
+        self._starts = np.concatenate(([0], np.cumsum(counts)))
+        self._arrays = frame_arrays(self.waypoints)
+        if method == 'spline':
+            for name in ('pose', 'lighting', 'background'):
+                # the spline needs each quaternion in the same hemisphere as the one before it, so remember which ones
+                # were flipped to flip them back in the output
+                q = _continuous(self._arrays[name])
+                self._arrays[name + '_continuous'] = q
+                self._arrays[name + '_controls'] = _squad_controls(q)
+                self._arrays[name + '_signs'] = np.sign(np.sum(q * self._arrays[name], axis=1))
+
+    @property
+    def frames(self):
+        return self
+
+    def _frames(self, indices):
+        """Interpolates the frames at an array of indices, which must be less than ``len(self) - 1``."""
+        segments = np.searchsorted(self._starts, indices, side='right') - 1
+        steps = indices - self._starts[segments]
+        counts = self.counts[segments]
+        a, b = self._arrays, segments + 1
+        values = {}
+        if self.method == 'linear':
+            # the same arithmetic as np.linspace, so the results are identical to `interp`
+            for name in ('position', 'distance', 'offset'):
+                start, stop = a[name][segments], a[name][b]
+                step = ((stop - start).T / counts).T
+                values[name] = (step.T * steps).T + start
+            factors = steps * (1.0 / counts)
+            for name in ('pose', 'lighting', 'background'):
+                values[name] = QuaternionArray(a[name][segments]).slerp(QuaternionArray(a[name][b]), factors).data
+        else:
+            factors = steps / counts
+            for name in ('position', 'offset'):
+                values[name] = _catmull_rom(a[name], segments, factors)
+            values['distance'] = _catmull_rom(a['distance'][:, None], segments, factors)[:, 0]
+            at_waypoint = steps == 0
+            for name in ('pose', 'lighting', 'background'):
+                q, controls = a[name + '_continuous'], a[name + '_controls']
+                rotations = _squad(q[segments], q[b], controls[segments], controls[b], factors).data
+                # each segment starts in the same hemisphere as its waypoint, which is returned exactly
+                rotations *= a[name + '_signs'][segments, None]
+                rotations[at_waypoint] = a[name][segments[at_waypoint]]
+                values[name] = rotations
+
+        return [Frame(position=position, distance=distance, pose=Quaternion(pose), lighting=Quaternion(lighting),
+                      offset=tuple(offset), background=Quaternion(background))
+                for position, distance, pose, lighting, offset, background in
+                zip(values['position'], values['distance'], values['pose'], values['lighting'], values['offset'],
+                    values['background'])]
+
+    def _get(self, indices):
+        last = len(self) - 1
+        indices = np.asarray(indices, dtype=np.int64)
+        interpolated = iter(self._frames(indices[indices != last]))
+        return [self.waypoints[-1] if i == last else next(interpolated) for i in indices.tolist()]
+
+    def __len__(self):
+        return int(self._starts[-1]) + 1
+
+    def __iter__(self):
+        for start in range(0, len(self) - 1, self._BATCH_SIZE):
+            yield from self._frames(np.arange(start, min(start + self._BATCH_SIZE, len(self) - 1)))
+        yield self.waypoints[-1]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self._get(np.arange(*i.indices(len(self))))
+        if not -len(self) <= i < len(self):
+            raise IndexError('sequence index out of range')
+        return self._get([i % len(self)])[0]
+
+    def __setitem__(self, i, v):
+        raise TypeError('InterpolatedSequence frames are computed on the fly and cannot be assigned')
+
+    def __delitem__(self, key):
+        raise TypeError('InterpolatedSequence frames are computed on the fly and cannot be deleted')
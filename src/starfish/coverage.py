@@ -0,0 +1,305 @@
+"""
+This module measures how well a set of rotations covers the space of all 3D rotations, SO(3), and removes
+near-duplicate frames from sequences.
+
+Rotations are compared by their geodesic distance: the angle of the smallest rotation that turns one into the other.
+Both are built on `RotationIndex`, a hash grid over unit quaternions that finds every pair of rotations within a fixed
+distance of each other in time roughly proportional to the number of rotations, so that sequences with millions of
+frames can be processed::
+
+    sequence = Sequence.standard(pose=random_rotations(1000000), distance=[50])
+    print(coverage(sequence, np.radians(5)))
+    sequence = deduplicate(sequence, np.radians(1))
+"""
+
+import itertools
+
+import numpy as np
+
+from .profiling import profiled
+from .rotations import QuaternionArray
+from .utils import to_quat
+
+
+def _as_quaternions(rotations):
+    """Converts rotations into an array of shape (n, 4) of unit quaternions in wxyz order with w >= 0.
+
+    Since q and -q represent the same rotation, only one of them is kept.
+    """
+    if isinstance(rotations, (np.ndarray, QuaternionArray)):
+        q = np.array(rotations, dtype=np.float64).reshape(-1, 4)
+    else:
+        q = np.array([tuple(to_quat(r)) for r in rotations], dtype=np.float64).reshape(-1, 4)
+    q /= np.linalg.norm(q, axis=1, keepdims=True)
+    q[q[:, 0] < 0] *= -1
+    return q
+
+
+def _frame_rotations(sequence, field):
+    """Gets the rotations stored in ``field`` of every frame in a sequence, or passes through a list of rotations."""
+    if len(sequence) and hasattr(sequence[0], field):
+        return _as_quaternions([getattr(frame, field) for frame in sequence])
+    return _as_quaternions(sequence)
+
+
+def geodesic_distance(a, b):
+    """Returns the angle (in radians) of the smallest rotation that turns rotation a into rotation b.
+
+    :param a: a rotation, a list of rotations, or an array of shape (n, 4) of quaternions in wxyz order
+    :param b: same as a
+
+    :returns: a numpy array of angles between 0 and pi
+    """
+    a = _as_quaternions(a if isinstance(a, (list, tuple, np.ndarray, QuaternionArray)) else [a])
+    b = _as_quaternions(b if isinstance(b, (list, tuple, np.ndarray, QuaternionArray)) else [b])
+    return 2 * np.arccos(np.clip(np.abs(np.einsum('ij,ij->i', a, b)), 0, 1))
+
+
+# the offsets to all of the cells neighboring a cell, and the half of them that are lexicographically non-negative
+_OFFSETS = np.array(list(itertools.product((-1, 0, 1), repeat=4)), dtype=np.int64)
+_HALF_OFFSETS = _OFFSETS[len(_OFFSETS) // 2:]
+
+
+def _expand_ranges(lo, hi):
+    """Given ranges [lo[i], hi[i]), returns the arrays (owners, values) listing every value in every range."""
+    num = hi - lo
+    owners = np.repeat(np.arange(len(lo)), num)
+    values = np.arange(num.sum()) - np.repeat(np.cumsum(num) - num, num) + np.repeat(lo, num)
+    return owners, values
+
+
+class RotationIndex:
+    """A spatial index for finding rotations that are within a fixed geodesic distance of each other.
+
+    Quaternions are bucketed into a uniform 4D grid whose cell size equals the maximum chord length between two
+    quaternions within the radius, so every match of a query lies in one of the 3^4 cells surrounding it. Cells are
+    stored as sorted integer keys, so lookups are vectorized binary searches rather than Python-level hashing.
+
+    Rotations can optionally be split into groups (e.g. frames with different distances), in which case only rotations
+    in the same group are ever matched.
+    """
+
+    def __init__(self, rotations, radius, groups=None):
+        """
+        :param rotations: a list of rotations, or an array of shape (n, 4) of quaternions in wxyz order
+        :param radius: (float): the maximum geodesic distance, in radians, between two matching rotations. Must be
+            between 0 and pi.
+        :param groups: (seq of int): a group number for each rotation (default: all in the same group)
+        """
+        if not 0 < radius <= np.pi:
+            raise ValueError('radius must be between 0 and pi')
+        self.radius = radius
+        self.quaternions = _as_quaternions(rotations)
+        # chord length between two unit quaternions that are `radius` apart
+        self._chord = 2 * np.sin(radius / 4)
+        self._min_dot = np.cos(radius / 2)
+        self._size = int(np.ceil(2 / self._chord)) + 3
+        if self._size ** 4 >= 2 ** 62:
+            raise ValueError('radius is too small')
+
+        self.groups = np.zeros(len(self.quaternions), dtype=np.int64) if groups is None else \
+            np.asarray(groups, dtype=np.int64)
+        if len(self.groups) != len(self.quaternions):
+            raise ValueError('groups must have the same length as rotations')
+
+        # give every occupied cell a dense id, and sort the rotations by (group, cell id)
+        cells = self._cells(self.quaternions)
+        self._cell_keys, cell_ids = np.unique(self._pack(cells), return_inverse=True)
+        self._cell_ids = cell_ids.ravel()
+        keys = self.groups * len(self._cell_keys) + self._cell_ids
+        self._order = np.argsort(keys, kind='stable')
+        self._keys = keys[self._order]
+
+    def _cells(self, q):
+        return np.floor((q + 1) / self._chord).astype(np.int64) + 1
+
+    def _pack(self, cells):
+        size = self._size
+        return ((cells[:, 0] * size + cells[:, 1]) * size + cells[:, 2]) * size + cells[:, 3]
+
+    def _candidates(self, q, groups, offsets=_OFFSETS):
+        """Finds (query, point) index pairs for every point in the cells at ``offsets`` from each query."""
+        # packing is linear, so each neighboring cell's key is a constant offset from the query's own key. Sorting the
+        # queries by key keeps all of the binary searches below in order, which makes them much faster.
+        keys = self._pack(self._cells(q))
+        order = np.argsort(keys, kind='stable')
+        keys, groups = keys[order], groups[order]
+        owners, points = [], []
+        for delta in self._pack(offsets) if len(self._cell_keys) else ():
+            neighbor_keys = keys + delta
+            ids = np.minimum(np.searchsorted(self._cell_keys, neighbor_keys), len(self._cell_keys) - 1)
+            occupied = np.flatnonzero(self._cell_keys[ids] == neighbor_keys)
+            if not len(occupied):
+                continue
+            group_keys = groups[occupied] * len(self._cell_keys) + ids[occupied]
+            lo = np.searchsorted(self._keys, group_keys, side='left')
+            hi = np.searchsorted(self._keys, group_keys, side='right')
+            o, v = _expand_ranges(lo, hi)
+            owners.append(order[occupied[o]])
+            points.append(self._order[v])
+        if not owners:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.concatenate(owners), np.concatenate(points)
+
+    def query(self, rotations, groups=None):
+        """Finds every indexed rotation within the radius of each query rotation.
+
+        :param rotations: a list of rotations, or an array of shape (n, 4) of quaternions in wxyz order
+        :param groups: (seq of int): a group number for each query rotation (default: all in group 0)
+
+        :returns: a tuple of index arrays (queries, matches), where rotation ``matches[k]`` of the index is within the
+            radius of query rotation ``queries[k]``
+        """
+        q = _as_quaternions(rotations)
+        groups = np.zeros(len(q), dtype=np.int64) if groups is None else np.asarray(groups, dtype=np.int64)
+        owners, points = self._candidates(q, groups)
+        within = np.einsum('ij,ij->i', q[owners], self.quaternions[points]) >= self._min_dot
+        o, p = self._mirrored(q, groups)
+        return np.concatenate((owners[within], o)), np.concatenate((points[within], p))
+
+    def _mirrored(self, q, groups):
+        """Finds the matches of the quaternions near w = 0 that are close to the negated quaternions of other
+        rotations. Each pair matches through either q or -q, never both, so these are never found twice."""
+        mirrored = np.flatnonzero(q[:, 0] <= self._chord)
+        owners, points = self._candidates(-q[mirrored], groups[mirrored])
+        owners = mirrored[owners]
+        dots = -np.einsum('ij,ij->i', q[owners], self.quaternions[points])
+        within = (dots >= self._min_dot) & (dots > 0)
+        return owners[within], points[within]
+
+    def pairs(self):
+        """Finds every pair of indexed rotations that are within the radius of each other.
+
+        :returns: a tuple of index arrays (a, b) with ``a[k] < b[k]``
+        """
+        q = self.quaternions
+        # every pair of neighboring cells is found from exactly one side, except for pairs within the same cell
+        a, b = self._candidates(q, self.groups, _HALF_OFFSETS)
+        within = np.einsum('ij,ij->i', q[a], q[b]) >= self._min_dot
+        within &= (a < b) | (self._cell_ids[a] != self._cell_ids[b])
+        a, b = a[within], b[within]
+        c, d = self._mirrored(q, self.groups)
+        earlier = c < d
+        a, b = np.concatenate((a, c[earlier])), np.concatenate((b, d[earlier]))
+        return np.minimum(a, b), np.maximum(a, b)
+
+    def __len__(self):
+        return len(self.quaternions)
+
+
+def _greedy_keep(num, a, b):
+    """Keeps each node unless it is connected to an earlier node that has been kept.
+
+    :param a: earlier node of each edge
+    :param b: later node of each edge
+    """
+    keep = [True] * num
+    order = np.argsort(b, kind='stable')
+    a, b = a[order].tolist(), b[order].tolist()
+    k = 0
+    while k < len(b):
+        node = b[k]
+        while k < len(b) and b[k] == node:
+            if keep[a[k]]:
+                keep[node] = False
+            k += 1
+    return np.array(keep, dtype=bool)
+
+
+def _near_duplicates(rotations, groups, threshold):
+    """Finds the frames to keep when removing near-duplicates, as a boolean mask.
+
+    :param rotations: (dict): arrays of shape (n, 4) of quaternions, as returned by `_as_quaternions`, for each field
+    :param groups: (array): a group number for each frame; only frames in the same group can be duplicates
+    :param threshold: (float): the geodesic distance, in radians, below which two rotations are considered the same
+    """
+    # index the field with the most distinct cells, since it produces the fewest candidate pairs
+    indices = {field: RotationIndex(q, threshold, groups) for field, q in rotations.items()}
+    index = max(indices.values(), key=lambda i: len(i._cell_keys))
+    a, b = index.pairs()
+    min_dot = np.cos(threshold / 2)
+    for q in rotations.values():
+        within = np.abs(np.einsum('ij,ij->i', q[a], q[b])) >= min_dot
+        a, b = a[within], b[within]
+    return _greedy_keep(len(groups), a, b)
+
+
+@profiled('deduplicate')
+def deduplicate(sequence, threshold, fields=('pose', 'lighting', 'background'),
+                exact=('position', 'distance', 'offset'), return_index=False):
+    """Removes frames that are nearly identical to an earlier frame in a sequence.
+
+    Two frames are near-duplicates if all of their rotations in ``fields`` are within ``threshold`` of each other and
+    all of their parameters in ``exact`` are equal. Frames are processed in order, and each frame is dropped if it is a
+    near-duplicate of an earlier frame that was kept, so the result does not depend on anything but the order of the
+    sequence.
+
+    :param sequence: (starfish.Sequence or list of starfish.Frame): the frames to deduplicate
+    :param threshold: (float): the geodesic distance, in radians, below which two rotations are considered the same
+    :param fields: (seq of str): the rotation parameters to compare (default: ('pose', 'lighting', 'background'))
+    :param exact: (seq of str): the parameters that must match exactly (default: ('position', 'distance', 'offset'))
+    :param return_index: (bool): if True, also return the indices of the frames that were kept (default: False)
+
+    :returns: a new `Sequence <starfish.Sequence>`, and, if ``return_index`` is True, a numpy array of indices
+    """
+    from .core import Sequence
+
+    frames = list(sequence)
+    if not frames or not fields:
+        raise ValueError('At least one frame and one rotation field are required')
+    # group frames whose exact parameters are equal
+    group_ids = {}
+    groups = np.array([group_ids.setdefault(tuple(_hashable(getattr(frame, name)) for name in exact), len(group_ids))
+                       for frame in frames], dtype=np.int64)
+    rotations = {field: _as_quaternions([getattr(frame, field) for frame in frames]) for field in fields}
+    kept = np.flatnonzero(_near_duplicates(rotations, groups, threshold))
+    result = Sequence([frames[i] for i in kept])
+    return (result, kept) if return_index else result
+
+
+def _hashable(value):
+    try:
+        return tuple(value)
+    except TypeError:
+        return value
+
+
+@profiled('coverage')
+def coverage(sequence, radius, field='pose', num_probes=100000, seed=0):
+    """Measures how well a set of rotations covers SO(3).
+
+    The covered fraction is estimated by sampling uniformly random probe rotations and checking whether each one is
+    within ``radius`` of any of the given rotations.
+
+    :param sequence: a `Sequence <starfish.Sequence>` or list of frames, a list of rotations, or an array of shape
+        (n, 4) of quaternions in wxyz order
+    :param radius: (float): the geodesic distance, in radians, that each rotation covers
+    :param field: (str): the rotation parameter of the frames to measure (default: 'pose')
+    :param num_probes: (int): the number of random rotations used to estimate coverage (default: 100000)
+    :param seed: (int): the seed of the random probe rotations (default: 0)
+
+    :returns: a dictionary with the keys:
+
+        * 'num_rotations': the number of rotations
+        * 'covered': the estimated fraction of SO(3) within ``radius`` of at least one rotation
+        * 'ideal': the fraction that would be covered if no two rotations covered the same area, which is an upper
+          bound on 'covered'
+        * 'efficiency': 'covered' divided by 'ideal'
+        * 'redundant': the number of rotations that are within ``radius`` of an earlier rotation
+    """
+    q = _frame_rotations(sequence, field)
+    index = RotationIndex(q, radius)
+    probes = np.random.default_rng(seed).normal(size=(num_probes, 4))
+    hits, _ = index.query(probes)
+    covered = len(np.unique(hits)) / num_probes
+
+    # the volume of a geodesic ball as a fraction of the volume of SO(3)
+    ideal = float(min(1.0, len(q) * (radius - np.sin(radius)) / np.pi))
+    a, b = index.pairs()
+    return {
+        'num_rotations': len(q),
+        'covered': covered,
+        'ideal': ideal,
+        'efficiency': covered / ideal if ideal else 0.0,
+        'redundant': int(len(q) - np.count_nonzero(_greedy_keep(len(q), a, b))),
+    }
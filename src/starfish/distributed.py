@@ -0,0 +1,330 @@
+"""
+This module splits the rendering of a `Sequence <starfish.Sequence>` across several machines (or several Blender
+processes on one machine).
+
+A `Coordinator` holds the sequence and hands out ranges of frame indices to workers as leases. Each lease has a timeout
+that is extended every time the worker finishes a frame; if a worker dies or loses its connection, its lease expires and
+the unfinished part of its range is given to the next worker that asks for work. Workers talk to the coordinator over a
+plain TCP socket, one JSON message per connection, so the coordinator can run in any Python process (it doesn't need
+Blender), while the workers run inside Blender::
+
+    # on the coordinator machine
+    with Coordinator(sequence, host='0.0.0.0', port=5555) as coordinator:
+        coordinator.wait()
+
+    # on each render node, inside Blender
+    session = RenderSession(['Real', 'Mask'], 'MyObject', 'MyCamera', 'TheSun', outputs=...)
+    Worker(('coordinator-host', 5555)).run(lambda i, frame: session.render(frame, index=i))
+
+Frames are sent to the workers along with their leases, so the workers don't need their own copy of the sequence. Along
+with the 6 frame parameters, any extra attributes (e.g. ``sequence_name``) are sent, so they must be serializable to
+JSON, like the metadata written by `Frame.dumps <starfish.Frame.dumps>`.
+"""
+
+import json
+import socket
+import socketserver
+import threading
+import time
+import uuid
+
+import numpy as np
+from mathutils import Quaternion
+
+from .core import Frame
+from .utils import _recursive_jsonify
+
+_ROTATIONS = ('pose', 'lighting', 'background')
+_PARAMETERS = ('position', 'distance', 'pose', 'lighting', 'offset', 'background', 'translation')
+
+
+def _frame_to_dict(frame):
+    params = _recursive_jsonify(vars(frame))
+    params.pop('translation', None)
+    return params
+
+
+def _frame_from_dict(params):
+    params = dict(params)
+    kwargs = {name: params.pop(name) for name in ('position', 'distance', 'pose', 'lighting', 'offset', 'background')
+              if name in params}
+    for name in _ROTATIONS:
+        if name in kwargs:
+            kwargs[name] = Quaternion(kwargs[name])
+    frame = Frame(**kwargs)
+    for name, value in params.items():
+        setattr(frame, name, value)
+    return frame
+
+
+def _default(o):
+    # numpy scalars (e.g. distances from np.linspace) aren't JSON serializable on their own
+    if isinstance(o, np.generic):
+        return o.item()
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+def _encode(message):
+    return json.dumps(message, default=_default).encode() + b'\n'
+
+
+def _check_attributes(frames):
+    """Raises a TypeError if any extra attribute of any frame can't be sent to the workers."""
+    for i, frame in enumerate(frames):
+        for name, value in vars(frame).items():
+            if name in _PARAMETERS:
+                continue
+            try:
+                json.dumps(_recursive_jsonify(value), default=_default)
+            except TypeError as e:
+                raise TypeError(f'Attribute {name!r} of frame {i} cannot be sent to workers: {e}') from None
+
+
+def _request(address, message, timeout=30):
+    """Sends a single JSON message to the coordinator and returns its JSON reply."""
+    with socket.create_connection(address, timeout=timeout) as sock:
+        sock.sendall(_encode(message))
+        with sock.makefile('rb') as f:
+            reply = f.readline()
+    if not reply:
+        raise ConnectionError(f'No reply from coordinator at {address}')
+    return json.loads(reply)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            message = json.loads(line)
+            reply = self.server.coordinator._handle(message)
+        except (ValueError, KeyError, TypeError) as e:
+            reply = {'error': str(e)}
+        self.wfile.write(_encode(reply))
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class Coordinator:
+    """Serves ranges of frames of a sequence to `Worker` processes, and keeps track of which frames are done.
+
+    The coordinator starts listening as soon as it is created, on a background thread, and stops when it is closed.
+    The easiest way to make sure it is closed is to use it as a context manager.
+
+    Attributes:
+
+    * address: The (host, port) that the coordinator is listening on. If port 0 was requested, this contains the port
+      that was actually assigned.
+    * done: A numpy boolean array with one entry per frame, which is True once the frame has been reported as rendered.
+    * durations: A numpy array with one entry per frame of the time (in seconds) that the worker reported the frame
+      took to render, or NaN if the frame hasn't been rendered yet.
+    * predicted: A numpy array with one entry per frame of the render time (in seconds) that the scheduler predicted
+      when the frame was leased, or NaN if there is no scheduler or the frame hasn't been leased yet. Compare it with
+      `durations` using `CostModel.report <starfish.scheduling.CostModel.report>`.
+    """
+
+    def __init__(self, sequence, chunk_size=10, lease_timeout=600, host='127.0.0.1', port=0, scheduler=None):
+        """
+        :param sequence: (seq): a `Sequence <starfish.Sequence>` or list of frames to render. Any extra attributes of
+            the frames must be serializable to JSON, or a TypeError is raised.
+        :param chunk_size: (int): the number of frames in each lease, if there is no ``scheduler`` (default: 10)
+        :param lease_timeout: (float): the number of seconds a worker may take to render one frame before its lease
+            expires and the rest of its frames are given to another worker (default: 600)
+        :param host: (str): the interface to listen on. Use '0.0.0.0' to accept workers from other machines.
+            (default: '127.0.0.1')
+        :param port: (int): the port to listen on, or 0 to pick any free port (default: 0)
+        :param scheduler: (starfish.scheduling.Scheduler): if given, sizes each lease by the predicted render time of
+            its frames and the speed of the worker, instead of using a fixed ``chunk_size`` (default: None)
+        """
+        if chunk_size < 1:
+            raise ValueError('chunk_size must be at least 1')
+        if lease_timeout <= 0:
+            raise ValueError('lease_timeout must be positive')
+        self.frames = list(sequence)
+        _check_attributes(self.frames)
+        self.chunk_size = chunk_size
+        self.lease_timeout = lease_timeout
+        self.done = np.zeros(len(self.frames), dtype=bool)
+        self.durations = np.full(len(self.frames), np.nan)
+        self.predicted = np.full(len(self.frames), np.nan)
+        self.scheduler = scheduler
+
+        # ranges of frames that haven't been leased yet, as (start, stop) tuples in order
+        self._pending = [(0, len(self.frames))] if self.frames else []
+        # lease id -> [start, next, stop, worker, deadline], where next is the first frame not yet reported as done
+        self._leases = {}
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+        if not self.frames:
+            self._finished.set()
+
+        self._server = _Server((host, port), _Handler)
+        self._server.coordinator = self
+        self.address = self._server.server_address[:2]
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+        self._thread.start()
+
+    def progress(self):
+        """Returns a dictionary with the number of frames that are ``done``, ``leased`` to workers, and ``pending``."""
+        with self._lock:
+            self._expire(time.monotonic())
+            return self._progress()
+
+    def wait(self, timeout=None):
+        """Blocks until every frame has been rendered, or until ``timeout`` seconds have passed.
+
+        :returns: True if every frame has been rendered
+        """
+        return self._finished.wait(timeout)
+
+    def close(self):
+        """Stops listening for workers."""
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def _progress(self):
+        leased = sum(stop - next_ for _, next_, stop, _, _ in self._leases.values())
+        pending = sum(stop - start for start, stop in self._pending)
+        return {'done': int(self.done.sum()), 'leased': leased, 'pending': pending}
+
+    def _expire(self, now):
+        """Returns the unfinished frames of expired leases to the pending ranges. Must hold the lock."""
+        for lease_id, (start, next_, stop, worker, deadline) in list(self._leases.items()):
+            if deadline < now:
+                del self._leases[lease_id]
+                self._record(start, next_, worker)
+                if next_ < stop:
+                    self._pending.append((next_, stop))
+        self._pending.sort()
+
+    def _record(self, start, stop, worker):
+        """Passes the render times of a finished (or expired) lease on to the scheduler. Must hold the lock."""
+        if self.scheduler is not None and stop > start:
+            self.scheduler.record(self.frames[start:stop], self.durations[start:stop], worker)
+
+    def _next_range(self, worker):
+        """Takes the range of frames for the next lease from the first pending range. Must hold the lock."""
+        start, stop = self._pending[0]
+        if self.scheduler is not None:
+            end = self.scheduler.chunk(self.frames, start, stop, self._pending, worker)
+            self.predicted[start:end] = self.scheduler.predict(start, end, worker)
+        else:
+            end = min(start + self.chunk_size, stop)
+        self._pending.pop(0)
+        if end < stop:
+            self._pending.insert(0, (end, stop))
+        return start, end
+
+    def _handle(self, message):
+        op = message['op']
+        worker = message.get('worker')
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            if op == 'lease':
+                if self._finished.is_set():
+                    return {'finished': True}
+                if not self._pending:
+                    # everything is leased out, but a lease may still expire
+                    return {'wait': min(1.0, self.lease_timeout)}
+                start, stop = self._next_range(worker)
+                lease_id = uuid.uuid4().hex
+                self._leases[lease_id] = [start, start, stop, worker, now + self.lease_timeout]
+                return {'lease': lease_id, 'start': start,
+                        'frames': [_frame_to_dict(frame) for frame in self.frames[start:stop]]}
+            if op == 'complete':
+                # reports that the next frame of a lease is done, which also renews the lease
+                lease = self._leases.get(message['lease'])
+                if lease is None:
+                    # the lease expired, and its frames were given to another worker
+                    return {'ok': False}
+                index = lease[1]
+                if not self.done[index]:
+                    self.done[index] = True
+                    self.durations[index] = message.get('duration', np.nan)
+                lease[1] += 1
+                lease[4] = now + self.lease_timeout
+                if lease[1] == lease[2]:
+                    del self._leases[message['lease']]
+                    self._record(lease[0], lease[2], lease[3])
+                if self.done.all():
+                    self._finished.set()
+                return {'ok': True}
+            if op == 'progress':
+                return self._progress()
+            raise ValueError(f'Unknown operation {op!r}')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+class Worker:
+    """Pulls leases of frames from a `Coordinator` and renders them.
+
+    Attributes:
+
+    * address: The (host, port) of the coordinator.
+    * name: The name that the worker identifies itself with.
+    * rendered: The indices of the frames that this worker has rendered, in order.
+    """
+
+    def __init__(self, address, name=None, timeout=30):
+        """
+        :param address: (tuple): the (host, port) of the coordinator
+        :param name: (str): the name of the worker, for bookkeeping. Defaults to the host name and a random suffix.
+        :param timeout: (float): the number of seconds to wait for the coordinator to reply (default: 30)
+        """
+        self.address = tuple(address)
+        self.name = name if name is not None else f'{socket.gethostname()}-{uuid.uuid4().hex[:8]}'
+        self.timeout = timeout
+        self.rendered = []
+
+    def _send(self, message):
+        reply = _request(self.address, dict(message, worker=self.name), self.timeout)
+        if 'error' in reply:
+            raise ValueError(f'Coordinator error: {reply["error"]}')
+        return reply
+
+    def leases(self):
+        """Yields leases from the coordinator until every frame of the sequence has been rendered.
+
+        :returns: a generator of ``(lease_id, start, frames)`` tuples, where ``frames`` is a list of `Frame
+            <starfish.Frame>` objects whose indices in the sequence start at ``start``
+        """
+        while True:
+            reply = self._send({'op': 'lease'})
+            if reply.get('finished'):
+                return
+            if 'wait' in reply:
+                time.sleep(reply['wait'])
+                continue
+            yield reply['lease'], reply['start'], [_frame_from_dict(f) for f in reply['frames']]
+
+    def complete(self, lease_id, duration=None):
+        """Reports that the next frame of a lease has been rendered.
+
+        :returns: False if the lease has expired and the rest of its frames should not be rendered
+        """
+        return self._send({'op': 'complete', 'lease': lease_id, 'duration': duration})['ok']
+
+    def run(self, render):
+        """Renders frames until every frame of the sequence has been rendered.
+
+        :param render: (callable): called as ``render(index, frame)`` for each frame, where ``index`` is the frame's
+            index in the sequence
+        """
+        for lease_id, start, frames in self.leases():
+            for index, frame in enumerate(frames, start):
+                begin = time.perf_counter()
+                render(index, frame)
+                self.rendered.append(index)
+                if not self.complete(lease_id, time.perf_counter() - begin):
+                    break
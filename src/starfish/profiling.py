@@ -0,0 +1,180 @@
+"""
+This module provides opt-in timing instrumentation for render loops.
+
+Starfish's main entry points (`Frame.setup <starfish.Frame.setup>`, `Sequence.bake <starfish.Sequence.bake>`, the
+annotation functions, and `jsonify <starfish.utils.jsonify>`) are instrumented with named stages. The instrumentation
+does nothing until a `Profiler` is enabled, at which point every stage is timed and recorded. Your own code (e.g. the
+call to ``bpy.ops.render.render``) can be timed the same way using `stage`::
+
+    profiler = profiling.Profiler()
+    with profiler:
+        for frame in sequence:
+            frame.setup(...)
+            with profiling.stage('render'):
+                bpy.ops.render.render(...)
+            profiler.next_frame()
+
+    print(profiler.report())
+    profiler.to_csv('trace.csv')
+"""
+
+import contextlib
+import csv
+import functools
+import json
+import threading
+import time
+
+import numpy as np
+
+_active = None
+_null_stage = contextlib.nullcontext()
+
+
+class Profiler:
+    """Collects timings of named stages and arbitrary counters, and aggregates them into a report.
+
+    Attributes:
+
+    * frame: The index of the current frame, which is recorded alongside each timing. Incremented by `next_frame`.
+    * records: A list of ``(frame, stage, start, duration)`` tuples, one per timed stage, in the order that they
+      finished. ``start`` is in seconds relative to the creation of the profiler.
+    * counters: A dictionary mapping counter names to their current values.
+    """
+
+    def __init__(self):
+        self.frame = 0
+        self.records = []
+        self.counters = {}
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Context manager that times the code inside it as the stage ``name``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.records.append((self.frame, name, start - self._origin, end - start))
+
+    def count(self, name, n=1):
+        """Increments the counter ``name`` by ``n``."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def next_frame(self):
+        """Marks the end of the current frame. Timings recorded afterwards will be attributed to the next frame."""
+        self.frame += 1
+
+    def summary(self):
+        """Aggregates the recorded timings by stage.
+
+        :returns: a dictionary mapping each stage name to a dictionary with the keys 'count', 'total', 'mean', 'p50',
+            'p95', 'p99', and 'max'. All times are in seconds.
+        """
+        durations = {}
+        for _, name, _, duration in self.records:
+            durations.setdefault(name, []).append(duration)
+
+        summary = {}
+        for name, values in durations.items():
+            values = np.array(values)
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            summary[name] = {
+                'count': len(values),
+                'total': float(values.sum()),
+                'mean': float(values.mean()),
+                'p50': float(p50),
+                'p95': float(p95),
+                'p99': float(p99),
+                'max': float(values.max()),
+            }
+        return summary
+
+    def report(self):
+        """Returns a human-readable table of the `summary`, sorted by total time, plus any counters."""
+        header = f'{"stage":<32}{"count":>8}{"total (s)":>12}{"p50 (ms)":>12}{"p95 (ms)":>12}{"p99 (ms)":>12}'
+        lines = [header, '-' * len(header)]
+        for name, s in sorted(self.summary().items(), key=lambda item: -item[1]['total']):
+            lines.append(f'{name:<32}{s["count"]:>8}{s["total"]:>12.3f}'
+                         f'{s["p50"] * 1000:>12.3f}{s["p95"] * 1000:>12.3f}{s["p99"] * 1000:>12.3f}')
+        for name, value in sorted(self.counters.items()):
+            lines.append(f'{name:<32}{value:>8}')
+        return '\n'.join(lines)
+
+    def to_json(self, path):
+        """Writes the summary, counters, and full trace of recorded timings to a JSON file."""
+        with open(path, 'w') as f:
+            json.dump({
+                'summary': self.summary(),
+                'counters': self.counters,
+                'trace': [dict(zip(('frame', 'stage', 'start', 'duration'), r)) for r in self.records],
+            }, f, indent=4)
+
+    def to_csv(self, path):
+        """Writes the full trace of recorded timings to a CSV file with the columns frame, stage, start, and
+        duration."""
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['frame', 'stage', 'start', 'duration'])
+            writer.writerows(self.records)
+
+    def __enter__(self):
+        enable(self)
+        return self
+
+    def __exit__(self, *_):
+        disable()
+
+
+def enable(profiler=None):
+    """Starts recording all instrumented stages into ``profiler``.
+
+    :param profiler: (Profiler): the profiler to record into. If None, a new one is created. (default: None)
+
+    :returns: the enabled `Profiler`
+    """
+    global _active
+    _active = profiler if profiler is not None else Profiler()
+    return _active
+
+
+def disable():
+    """Stops recording instrumented stages."""
+    global _active
+    _active = None
+
+
+def active():
+    """Returns the currently enabled `Profiler`, or None if profiling is disabled."""
+    return _active
+
+
+def stage(name):
+    """Context manager that times the code inside it as the stage ``name`` if profiling is enabled, and otherwise
+    does nothing."""
+    if _active is None:
+        return _null_stage
+    return _active.stage(name)
+
+
+def count(name, n=1):
+    """Increments the counter ``name`` by ``n`` if profiling is enabled."""
+    if _active is not None:
+        _active.count(name, n)
+
+
+def profiled(name):
+    """Decorator that times every call to the decorated function as the stage ``name`` when profiling is enabled."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            profiler = _active
+            if profiler is None:
+                return fn(*args, **kwargs)
+            with profiler.stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,363 @@
+"""
+This module provides `RenderSession`, which resolves everything a render loop needs from Blender once (the scenes, the
+object, camera, and sun, and the compositor ``File Output`` nodes) instead of looking them up by name on every frame.
+
+A typical loop renders each frame in two scenes that share the same objects: the "real" scene and a "mask" scene for
+segmentation. Since the objects are shared, the frame only has to be set up once, and its transforms are then valid in
+both scenes::
+
+    session = RenderSession(['Real', 'Mask'], 'MyObject', 'MyCamera', 'TheSun', outputs={
+        'Real': {'File Output': 'real_{index}'},
+        'Mask': {'File Output': 'mask_{index}'},
+    })
+    for i, frame in session.run(sequence):
+        ...  # postprocessing of real_{i} and mask_{i}
+
+If a scene has its own copies of the object, camera, and sun (e.g. the mask scene was made with a full copy rather than
+linked objects), pass them as ``mirrors``, and the transforms computed for the first scene are copied onto them.
+
+The mask scene only needs flat colors, so it can be rendered far more cheaply than the real scene.
+`configure_mask_scene` switches it to the fastest settings that still produce exact colors, so that masks can be used
+directly without `normalize_mask_colors <starfish.annotation.normalize_mask_colors>`::
+
+    configure_mask_scene(bpy.data.scenes['Mask'], {'MyObject': (255, 255, 255)})
+
+Cycles can't draw flat object colors, so with ``engine='CYCLES'`` the object index pass is shown in the compositor's
+Viewer node instead, and `read_labels` turns the pass indices back into the exact colors after each render.
+
+Masks don't have to be written to disk and read back, either. `configure_mask_scene` connects the mask to the
+compositor's Viewer node, and `read_mask` copies its pixels straight into a numpy array after each render, which can be
+passed to the annotation functions (e.g. `get_bounding_boxes_from_mask
+<starfish.annotation.get_bounding_boxes_from_mask>`) in place of a path.
+"""
+
+import numpy as np
+
+from .profiling import profiled, stage
+
+# the attributes set by Frame.setup that fully determine an object's placement
+_TRANSFORM_ATTRIBUTES = ('location', 'rotation_mode', 'rotation_quaternion', 'matrix_world')
+
+
+def _srgb_to_linear(color):
+    """Converts an 8-bit sRGB color into the linear color that Blender's 'Standard' view transform maps back to it."""
+    c = [channel / 255 for channel in color]
+    return tuple(x / 12.92 if x <= 0.04045 else ((x + 0.055) / 1.055) ** 2.4 for x in c)
+
+
+def configure_mask_scene(scene, colors, background=(0, 0, 0), engine='BLENDER_WORKBENCH'):
+    """Configures a scene to render segmentation masks as cheaply as possible, with exact colors.
+
+    Every object in ``colors`` is given a unique pass index (1, 2, ... in order) and the object index pass is enabled on
+    all of the scene's view layers, so that an ``IndexOB`` output can be used instead of colors. Every other object in
+    the scene gets pass index 0 and the background color, so that with either engine it shows up as background (while
+    still hiding anything behind it).
+
+    * With the ``'BLENDER_WORKBENCH'`` engine (the default), objects are drawn with flat, unlit object colors and no
+      anti-aliasing, so that every pixel of the mask is exactly one of the given colors. The ``Image`` output of the
+      compositor's Render Layers node is connected to its Viewer node, so the mask can be read with `read_mask`.
+    * With the ``'CYCLES'`` engine, the scene is rendered on the CPU with a single sample, no denoising, no light
+      bounces, and the smallest pixel filter. Object colors don't show up in Cycles renders, so the ``IndexOB`` output
+      of the Render Layers node is connected to the Viewer node instead. Read the mask with `read_labels`, passing it
+      the same ``colors`` and ``background``.
+
+    The compositor is enabled, and the Render Layers and Viewer nodes are created if the scene doesn't have them. Any
+    other nodes (e.g. ``File Output`` nodes) are left alone; mute them if the mask doesn't need to be saved to disk.
+
+    In both cases, the view transform is set to 'Standard' and dithering is turned off, since both alter the output
+    colors. Nothing else about the scene (e.g. its objects' transforms) is changed, so it can still share objects with
+    the real scene, e.g. in a `RenderSession`.
+
+    :param scene: (BlendDataObject): the mask scene
+    :param colors: (dict): maps objects (or object names) to the (r, g, b) colors, from 0 to 255, that they should have
+        in the mask
+    :param background: (seq of int, len 3): the (r, g, b) color of the background, from 0 to 255 (default: (0, 0, 0))
+    :param engine: (str): the render engine to use, either 'BLENDER_WORKBENCH' or 'CYCLES' (default:
+        'BLENDER_WORKBENCH')
+
+    :returns: a dictionary mapping object names to their pass indices
+    """
+    import bpy
+
+    if engine not in ('BLENDER_WORKBENCH', 'CYCLES'):
+        raise ValueError(f'Unsupported mask engine {engine!r}')
+    for color in list(colors.values()) + [background]:
+        if len(color) != 3 or not all(0 <= c <= 255 for c in color):
+            raise ValueError(f'Colors must be (r, g, b) tuples of values from 0 to 255, got {color!r}')
+
+    indices = {}
+    for index, (obj, color) in enumerate(colors.items(), 1):
+        if isinstance(obj, str):
+            if bpy.data.objects.get(obj) is None:
+                raise ValueError(f'Object {obj!r} does not exist')
+            obj = bpy.data.objects[obj]
+        obj.pass_index = index
+        obj.color = _srgb_to_linear(color) + (1.0,)
+        indices[obj.name] = index
+    for obj in scene.objects:
+        if obj.name not in indices:
+            obj.pass_index = 0
+            obj.color = _srgb_to_linear(background) + (1.0,)
+    for view_layer in scene.view_layers:
+        view_layer.use_pass_object_index = True
+
+    render = scene.render
+    render.engine = engine
+    render.dither_intensity = 0.0
+    render.film_transparent = False
+    scene.view_settings.view_transform = 'Standard'
+    scene.view_settings.look = 'None'
+    scene.view_settings.exposure = 0.0
+    scene.view_settings.gamma = 1.0
+    if scene.world is not None:
+        scene.world.color = _srgb_to_linear(background)
+
+    if engine == 'BLENDER_WORKBENCH':
+        scene.display.render_aa = 'OFF'
+        shading = scene.display.shading
+        shading.light = 'FLAT'
+        shading.color_type = 'OBJECT'
+        shading.show_shadows = False
+        shading.show_cavity = False
+        shading.show_specular_highlight = False
+        shading.show_object_outline = False
+        shading.show_xray = False
+    else:
+        cycles = scene.cycles
+        cycles.device = 'CPU'
+        cycles.samples = 1
+        cycles.use_denoising = False
+        for attribute in ('max_bounces', 'diffuse_bounces', 'glossy_bounces', 'transmission_bounces',
+                          'volume_bounces', 'transparent_max_bounces'):
+            setattr(cycles, attribute, 0)
+        render.filter_size = 0.01
+
+    # show the mask in the compositor's Viewer node, so that it can be read straight from memory
+    scene.use_nodes = True
+    tree = scene.node_tree
+    layers = _find_node(tree, 'R_LAYERS', 'CompositorNodeRLayers')
+    viewer = _find_node(tree, 'VIEWER', 'CompositorNodeViewer')
+    tree.links.new(layers.outputs['IndexOB' if engine == 'CYCLES' else 'Image'], viewer.inputs['Image'])
+    return indices
+
+
+def _find_node(tree, type, type_name):
+    """Returns the first node of a type in a node tree, creating one if there isn't any."""
+    node = next((node for node in tree.nodes if node.type == type), None)
+    return node if node is not None else tree.nodes.new(type_name)
+
+
+def _get_image(image):
+    import bpy
+    if not isinstance(image, str):
+        return image
+    result = bpy.data.images.get(image)
+    if result is None:
+        raise ValueError(f'Image {image!r} does not exist (a Viewer node must be rendered before it can be read)')
+    return result
+
+
+@profiled('read_pixels')
+def read_pixels(image='Viewer Node', out=None):
+    """Copies the pixels of a Blender image into a numpy array, without going through the disk.
+
+    By default, this reads the 'Viewer Node' image, which holds the output of the Viewer node of the compositor of the
+    last scene that was rendered. (Blender doesn't expose the pixels of the 'Render Result' image itself, so a Viewer
+    node is needed.) The pixels are copied with a single ``foreach_get`` call.
+
+    :param image: (str or BlendDataObject): the image, or its name (default: 'Viewer Node')
+    :param out: (np.ndarray): a C-contiguous float32 array of shape (h, w, channels) to copy the pixels into, so that
+        it can be reused between frames. If None, a new array is allocated. (default: None)
+
+    :returns: float32 array of shape (h, w, channels) of linear pixel values, with the top row first. This is a view of
+        ``out`` (Blender stores the bottom row first).
+    """
+    image = _get_image(image)
+    width, height = image.size
+    shape = (height, width, image.channels)
+    if out is None:
+        out = np.empty(shape, dtype=np.float32)
+    elif out.shape != shape or out.dtype != np.float32 or not out.flags.c_contiguous:
+        raise ValueError(f'out must be a C-contiguous float32 array of shape {shape}')
+    image.pixels.foreach_get(out.reshape(-1))
+    return out[::-1]
+
+
+@profiled('read_mask')
+def read_mask(image='Viewer Node', out=None, buffer=None, srgb=True):
+    """Reads an RGB mask from a Blender image, with the same 8-bit colors that it would have if it were saved to disk.
+
+    :param image: (str or BlendDataObject): the image, or its name (default: 'Viewer Node')
+    :param out: (np.ndarray): a uint8 array of shape (h, w, 3) to write the mask into, so that it can be reused between
+        frames. If None, a new array is allocated. (default: None)
+    :param buffer: (np.ndarray): a float32 array to pass to `read_pixels` as its ``out`` parameter. Its contents are
+        overwritten. (default: None)
+    :param srgb: (bool): whether to apply the sRGB transfer function, as the 'Standard' view transform does when
+        saving an image. Set to False for images that are saved with linear colors. (default: True)
+
+    :returns: uint8 array of shape (h, w, 3), with the top row first
+    """
+    rgb = read_pixels(image, buffer)[..., :3]
+    if out is None:
+        out = np.empty(rgb.shape, dtype=np.uint8)
+    elif out.shape != rgb.shape or out.dtype != np.uint8:
+        raise ValueError(f'out must be a uint8 array of shape {rgb.shape}')
+    rgb = np.clip(rgb, 0, 1)
+    if srgb:
+        rgb = np.where(rgb <= 0.0031308, rgb * 12.92, 1.055 * rgb ** (1 / 2.4) - 0.055)
+    np.rint(rgb * 255, out=rgb)
+    out[...] = rgb
+    return out
+
+
+@profiled('read_labels')
+def read_labels(image='Viewer Node', colors=None, background=(0, 0, 0), buffer=None):
+    """Reads the object index pass from a Blender image, e.g. a mask scene that was set up by `configure_mask_scene`
+    with the 'CYCLES' engine.
+
+    :param image: (str or BlendDataObject): the image, or its name (default: 'Viewer Node')
+    :param colors: (dict): the ``colors`` that were passed to `configure_mask_scene`. If given, each pass index is
+        replaced by the color of its object, so the result can be used like the output of `read_mask`. (default: None)
+    :param background: (seq of int, len 3): the (r, g, b) color of pixels that don't belong to any of the objects in
+        ``colors``, from 0 to 255 (default: (0, 0, 0))
+    :param buffer: (np.ndarray): a float32 array to pass to `read_pixels` as its ``out`` parameter. Its contents are
+        overwritten. (default: None)
+
+    :returns: if ``colors`` is None, an int32 array of shape (h, w) of pass indices, where 0 is the background.
+        Otherwise, a uint8 array of shape (h, w, 3) of colors. Both have the top row first.
+    """
+    labels = np.rint(read_pixels(image, buffer)[..., 0]).astype(np.int32)
+    if colors is None:
+        return labels
+    palette = np.array([tuple(background)] + [tuple(color) for color in colors.values()], dtype=np.uint8)
+    # pass indices of objects that aren't in colors are background
+    labels[(labels < 0) | (labels >= len(palette))] = 0
+    return palette[labels]
+
+
+def _aspect_ratio(scene):
+    render = scene.render
+    return (render.resolution_x * render.pixel_aspect_x) / (render.resolution_y * render.pixel_aspect_y)
+
+
+class RenderSession:
+    """Renders frames into one or more scenes, with all Blender data-blocks resolved up front.
+
+    Attributes:
+
+    * scenes: The list of scenes that each frame is rendered in, in order. The first scene is the one passed to
+      `Frame.setup <starfish.Frame.setup>`.
+    * obj, camera, sun: The objects that each frame is set up with.
+    * mirrors: A dictionary mapping scene names to the (obj, camera, sun) objects in that scene that transforms are
+      copied to after each setup. Scenes that share the objects of the first scene do not appear here.
+    * outputs: A list of ``(scene_name, file_slot, template)`` tuples, one per output path that is set for each frame.
+    """
+
+    def __init__(self, scenes, obj, camera, sun, outputs=None, mirrors=None):
+        """
+        Scenes and objects may be given either as Blender data-blocks or by name.
+
+        :param scenes: (seq): the scenes to render each frame in, in order. The first scene is the one used to set up
+            the frame. All scenes must have the same output aspect ratio, since the offset of the object in the picture
+            depends on it (see `Frame.setup <starfish.Frame.setup>`).
+        :param obj: (BlendDataObject): the object that will be the subject of the pictures
+        :param camera: (BlendDataObject): the camera to take the pictures with
+        :param sun: (BlendDataObject): the sun lamp that is providing the lighting
+        :param outputs: (dict): maps scene names to dictionaries that map the names of ``File Output`` nodes in that
+            scene's compositor to path templates. A template is formatted with ``str.format`` for each frame (see
+            `render`), and may also be a list of templates, one per file slot of the node. (default: None)
+        :param mirrors: (dict): maps scene names to (obj, camera, sun) tuples of separate copies of the objects in that
+            scene, which are moved to match the originals after each setup. (default: None)
+        """
+        import bpy
+
+        def resolve(collection, item, kind):
+            if not isinstance(item, str):
+                return item
+            resolved = collection.get(item)
+            if resolved is None:
+                raise ValueError(f'{kind} {item!r} does not exist')
+            return resolved
+
+        if isinstance(scenes, str):
+            scenes = [scenes]
+        self.scenes = [resolve(bpy.data.scenes, scene, 'Scene') for scene in scenes]
+        if not self.scenes:
+            raise ValueError('At least one scene must be provided')
+        ratios = {round(_aspect_ratio(scene), 6) for scene in self.scenes}
+        if len(ratios) > 1:
+            raise ValueError(f'All scenes must have the same aspect ratio, got {sorted(ratios)}')
+        names = [scene.name for scene in self.scenes]
+
+        self.obj, self.camera, self.sun = (resolve(bpy.data.objects, o, 'Object') for o in (obj, camera, sun))
+
+        self.mirrors = {}
+        for scene_name, objects in (mirrors or {}).items():
+            if scene_name not in names:
+                raise ValueError(f'Mirrored scene {scene_name!r} is not one of the rendered scenes')
+            self.mirrors[scene_name] = tuple(resolve(bpy.data.objects, o, 'Object') for o in objects)
+
+        self.outputs = []
+        for scene_name, nodes in (outputs or {}).items():
+            if scene_name not in names:
+                raise ValueError(f'Output scene {scene_name!r} is not one of the rendered scenes')
+            scene = self.scenes[names.index(scene_name)]
+            for node_name, templates in nodes.items():
+                node = scene.node_tree.nodes.get(node_name) if scene.node_tree is not None else None
+                if node is None:
+                    raise ValueError(f'Scene {scene_name!r} has no node named {node_name!r}')
+                if isinstance(templates, str):
+                    templates = [templates]
+                if len(templates) > len(node.file_slots):
+                    raise ValueError(f'Node {node_name!r} has only {len(node.file_slots)} file slots')
+                self.outputs.extend((scene_name, slot, t) for slot, t in zip(node.file_slots, templates))
+
+    @profiled('RenderSession.setup')
+    def setup(self, frame):
+        """Sets up the frame in the first scene, and copies the resulting transforms to any mirrored objects.
+
+        :param frame: (starfish.Frame): the frame to set up
+        """
+        originals = (self.obj, self.camera, self.sun)
+        frame.setup(self.scenes[0], *originals)
+        for copies in self.mirrors.values():
+            for original, copy in zip(originals, copies):
+                for attribute in _TRANSFORM_ATTRIBUTES:
+                    setattr(copy, attribute, getattr(original, attribute))
+
+    def set_outputs(self, **fields):
+        """Sets the path of every output file slot by formatting its template with ``fields``."""
+        for _, slot, template in self.outputs:
+            slot.path = template.format(**fields)
+
+    @profiled('RenderSession.render')
+    def render(self, frame, **fields):
+        """Sets up the frame, sets the output paths, and renders every scene.
+
+        :param frame: (starfish.Frame): the frame to render
+        :param fields: the values to format the output path templates with, e.g. ``index=i``
+
+        :returns: the frame, which now has its ``translation`` computed
+        """
+        import bpy
+
+        self.setup(frame)
+        self.set_outputs(**fields)
+        for scene in self.scenes:
+            with stage(f'render.{scene.name}'):
+                bpy.ops.render.render(scene=scene.name)
+        return frame
+
+    def run(self, sequence, start=0, **fields):
+        """Renders every frame of a sequence, yielding each one as soon as it has been rendered.
+
+        The output path templates are formatted with the frame's index in the sequence plus ``start`` as ``index``, as
+        well as any extra ``fields``, which are the same for every frame.
+
+        :param sequence: (seq): a `Sequence <starfish.Sequence>` or list of frames
+        :param start: (int): the index of the first frame (default: 0)
+
+        :returns: a generator of ``(index, frame)`` tuples
+        """
+        for index, frame in enumerate(sequence, start):
+            yield index, self.render(frame, index=index, **fields)
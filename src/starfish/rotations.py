@@ -96,3 +96,336 @@ class Spherical:
 
     def __repr__(self):
         return f"<Spherical (theta={self.theta}, phi={self.phi}, roll={self.roll})>"
+
+
+# Blender's rotation orders, as the (i, j, k) axes and whether the order is an odd permutation of XYZ
+_EULER_ORDERS = {
+    'XYZ': ((0, 1, 2), False),
+    'XZY': ((0, 2, 1), True),
+    'YXZ': ((1, 0, 2), True),
+    'YZX': ((1, 2, 0), False),
+    'ZXY': ((2, 0, 1), False),
+    'ZYX': ((2, 1, 0), True),
+}
+
+
+def _multiply(a, b):
+    """Hamilton product of two arrays of quaternions in wxyz order, with broadcasting."""
+    aw, ax, ay, az = np.moveaxis(a, -1, 0)
+    bw, bx, by, bz = np.moveaxis(b, -1, 0)
+    return np.stack((
+        aw * bw - ax * bx - ay * by - az * bz,
+        aw * bx + ax * bw + ay * bz - az * by,
+        aw * by - ax * bz + ay * bw + az * bx,
+        aw * bz + ax * by - ay * bx + az * bw,
+    ), axis=-1)
+
+
+class QuaternionArray:
+    """An array of rotations stored as quaternions in a single numpy array of shape (n, 4), in wxyz order.
+
+    This is the vectorized counterpart of `mathutils.Quaternion`: operations like multiplication, slerp, and conversion
+    to and from Euler angles act on every rotation at once, instead of on one Python object at a time. The results
+    match those of the corresponding mathutils methods (up to mathutils' single precision).
+
+    Indexing with an integer returns a `mathutils.Quaternion`, and iterating yields them, so a QuaternionArray can be
+    passed anywhere that a list of rotations is expected, e.g. to `Sequence.standard <starfish.Sequence.standard>`::
+
+        poses = QuaternionArray.from_euler(np.random.random((1000, 3)) * 2 * np.pi)
+        sequence = Sequence.standard(pose=poses @ Quaternion((0, 0, 1), np.pi))
+
+    Attributes:
+
+    * data: the underlying numpy array of shape (n, 4)
+    """
+
+    def __init__(self, data):
+        """
+        :param data: an array-like of shape (n, 4) or (4,) of quaternions in wxyz order
+        """
+        self.data = np.array(data, dtype=np.float64).reshape(-1, 4)
+
+    @classmethod
+    def from_quaternions(cls, rotations):
+        """Creates an array from a list of rotations (anything with a to_quaternion() method, or Quaternions)."""
+        if isinstance(rotations, cls):
+            return cls(rotations.data)
+        return cls([tuple(to_quat(r)) for r in rotations])
+
+    @classmethod
+    def identity(cls, n):
+        """Creates an array of n zero rotations."""
+        data = np.zeros((n, 4))
+        data[:, 0] = 1
+        return cls(data)
+
+    @classmethod
+    def from_axis_angle(cls, axis, angle):
+        """Creates rotations of ``angle`` radians about ``axis``, like ``mathutils.Quaternion(axis, angle)``.
+
+        :param axis: array-like of shape (n, 3) or (3,)
+        :param angle: array-like of shape (n,), or a single angle
+        """
+        axis = np.atleast_2d(np.asarray(axis, dtype=np.float64))
+        # like mathutils, wrap the angle to [-pi, pi)
+        angle = (np.asarray(angle, dtype=np.float64) + np.pi) % (2 * np.pi) - np.pi
+        norm = np.linalg.norm(axis, axis=1, keepdims=True)
+        # like mathutils, a zero axis gives the zero rotation
+        with np.errstate(invalid='ignore', divide='ignore'):
+            axis = np.where(norm > 0, axis / norm, 0)
+        n = max(len(axis), angle.size)
+        half = np.broadcast_to(angle, (n,)) / 2
+        data = np.column_stack((np.cos(half), axis * np.sin(half)[:, None]))
+        data[np.broadcast_to(norm[:, 0] == 0, (n,))] = (1, 0, 0, 0)
+        return cls(data)
+
+    @classmethod
+    def from_euler(cls, angles, order='XYZ'):
+        """Creates rotations from Euler angles, like ``mathutils.Euler(angles, order).to_quaternion()``.
+
+        :param angles: array-like of shape (n, 3) of angles in radians about the X, Y, and Z axes
+        :param order: (str): the order in which the rotations are applied (default: 'XYZ')
+        """
+        (i, j, k), _ = _EULER_ORDERS[order]
+        angles = np.atleast_2d(np.asarray(angles, dtype=np.float64))
+        axes = np.eye(3)
+        result = None
+        # the first axis in the order is applied first, so it is on the right of the product
+        for axis in (i, j, k):
+            q = cls.from_axis_angle(axes[axis], angles[:, axis]).data
+            result = q if result is None else _multiply(q, result)
+        return cls(result)
+
+    @classmethod
+    def from_matrix(cls, matrices):
+        """Creates rotations from rotation matrices, like ``mathutils.Matrix.to_quaternion()``.
+
+        :param matrices: array-like of shape (n, 3, 3) (or (n, 4, 4)) of rotation matrices in row-major order
+        """
+        m = np.asarray(matrices, dtype=np.float64).reshape(-1, *np.shape(matrices)[-2:])[:, :3, :3]
+        trace = np.trace(m, axis1=1, axis2=2)
+        data = np.empty((len(m), 4))
+        # pick the numerically stable formula for each matrix based on its largest diagonal element
+        cases = np.where(trace > 0, 3, np.argmax(np.diagonal(m, axis1=1, axis2=2), axis=1))
+        s = np.sqrt(np.maximum(1 + trace, 1e-300)) * 2
+        t = cases == 3
+        data[t] = np.column_stack((s[t] / 4, (m[t, 2, 1] - m[t, 1, 2]) / s[t], (m[t, 0, 2] - m[t, 2, 0]) / s[t],
+                                   (m[t, 1, 0] - m[t, 0, 1]) / s[t]))
+        for axis in range(3):
+            c = cases == axis
+            a, b = (axis + 1) % 3, (axis + 2) % 3
+            s = np.sqrt(np.maximum(1 + m[c, axis, axis] - m[c, a, a] - m[c, b, b], 1e-300)) * 2
+            data[c, 0] = (m[c, b, a] - m[c, a, b]) / s
+            data[c, 1 + axis] = s / 4
+            data[c, 1 + a] = (m[c, a, axis] + m[c, axis, a]) / s
+            data[c, 1 + b] = (m[c, b, axis] + m[c, axis, b]) / s
+        data[data[:, 0] < 0] *= -1
+        return cls(data)
+
+    @classmethod
+    def from_spherical(cls, theta, phi, roll):
+        """Creates rotations from `Spherical` coordinates, like ``Spherical(theta, phi, roll).to_quaternion()``.
+
+        :param theta: array-like of azimuthal angles, in radians
+        :param phi: array-like of polar angles, in radians
+        :param roll: array-like of roll angles, in radians
+        """
+        theta, phi, roll = np.broadcast_arrays(*(np.asarray(a, dtype=np.float64).ravel() % (2 * np.pi)
+                                                 for a in (theta, phi, roll)))
+        roll_quat = cls.from_axis_angle((0, 0, 1), roll + theta).data
+        theta_tangent = np.column_stack((-np.sin(theta), np.cos(theta), np.zeros_like(theta)))
+        rot_quat = cls.from_axis_angle(theta_tangent, phi).data
+        return cls(_multiply(rot_quat, roll_quat))
+
+    def to_euler(self, order='XYZ'):
+        """Converts the rotations to Euler angles, like ``mathutils.Quaternion.to_euler(order)``.
+
+        :param order: (str): the order in which the rotations are applied (default: 'XYZ')
+
+        :returns: numpy array of shape (n, 3) of angles in radians about the X, Y, and Z axes
+        """
+        (i, j, k), parity = _EULER_ORDERS[order]
+        # Blender's matrices are column-major, so mat[a][b] is m[:, b, a] here
+        m = self.normalized().to_matrix()
+
+        def mat(a, b):
+            return m[:, b, a]
+
+        cy = np.hypot(mat(i, i), mat(i, j))
+        regular = cy > 16 * np.finfo(np.float32).eps
+        euler1, euler2 = np.empty((len(m), 3)), np.empty((len(m), 3))
+        euler1[:, i] = np.where(regular, np.arctan2(mat(j, k), mat(k, k)), np.arctan2(-mat(k, j), mat(j, j)))
+        euler1[:, j] = np.arctan2(-mat(i, k), cy)
+        euler1[:, k] = np.where(regular, np.arctan2(mat(i, j), mat(i, i)), 0)
+        euler2[:, i] = np.where(regular, np.arctan2(-mat(j, k), -mat(k, k)), euler1[:, i])
+        euler2[:, j] = np.where(regular, np.arctan2(-mat(i, k), -cy), euler1[:, j])
+        euler2[:, k] = np.where(regular, np.arctan2(-mat(i, j), -mat(i, i)), euler1[:, k])
+        if parity:
+            euler1, euler2 = -euler1, -euler2
+        # of the two equivalent solutions, use the one with the smallest angles
+        second = np.abs(euler1).sum(axis=1) > np.abs(euler2).sum(axis=1)
+        return np.where(second[:, None], euler2, euler1)
+
+    def to_matrix(self):
+        """Converts the rotations to rotation matrices, like ``mathutils.Quaternion.to_matrix()``.
+
+        :returns: numpy array of shape (n, 3, 3) of rotation matrices in row-major order
+        """
+        w, x, y, z = self.data.T
+        return np.stack((
+            np.stack((1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)), axis=-1),
+            np.stack((2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)), axis=-1),
+            np.stack((2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)), axis=-1),
+        ), axis=1)
+
+    def to_spherical(self):
+        """Converts the rotations to `Spherical` coordinates, like ``Spherical.from_other``.
+
+        :returns: a tuple of the form (theta, phi, roll) of numpy arrays of angles, each between 0 and 2 pi
+        """
+        q = self.normalized()
+        z_axis = q.rotate((0, 0, 1))
+        theta = np.arctan2(z_axis[:, 1], z_axis[:, 0])
+        phi = np.arccos(np.clip(z_axis[:, 2], -1, 1))
+        # the rotation that moves the rotated +Z axis back onto +Z, which leaves just the roll
+        axis = np.column_stack((z_axis[:, 1], -z_axis[:, 0], np.zeros(len(q))))
+        inverse = QuaternionArray.from_axis_angle(axis, phi)
+        roll = (inverse @ q).to_euler()[:, 2] - theta
+        return theta % (2 * np.pi), phi % (2 * np.pi), roll % (2 * np.pi)
+
+    def normalized(self):
+        """Returns a copy with every quaternion scaled to unit length."""
+        return QuaternionArray(self.data / np.linalg.norm(self.data, axis=1, keepdims=True))
+
+    def conjugated(self):
+        """Returns the conjugate of every quaternion."""
+        return QuaternionArray(self.data * (1, -1, -1, -1))
+
+    def inverted(self):
+        """Returns the inverse of every quaternion, like ``mathutils.Quaternion.inverted()``."""
+        return QuaternionArray(self.conjugated().data / np.sum(self.data ** 2, axis=1, keepdims=True))
+
+    def rotate(self, vectors):
+        """Rotates vectors by the (normalized) rotations.
+
+        :param vectors: array-like of shape (n, 3) or (3,). A single vector is rotated by every rotation, and a single
+            rotation rotates every vector.
+
+        :returns: numpy array of shape (n, 3)
+        """
+        q = self.normalized().data
+        v = np.atleast_2d(np.asarray(vectors, dtype=np.float64))
+        w, u = q[:, :1], q[:, 1:]
+        t = 2 * np.cross(u, v)
+        return v + w * t + np.cross(u, t)
+
+    def slerp(self, other, factor):
+        """Spherical linear interpolation between each rotation and the corresponding rotation in ``other``, like
+        ``mathutils.Quaternion.slerp``.
+
+        :param other: a QuaternionArray, a list of rotations, or a single rotation
+        :param factor: (float or array-like): the interpolation factor(s) between 0 (self) and 1 (other). An array of
+            factors with a single rotation in self and other interpolates between the two at every factor.
+
+        :returns: a QuaternionArray
+        """
+        a = self.data
+        b = _as_data(other)
+        t = np.asarray(factor, dtype=np.float64).reshape(-1, 1)
+        cos = np.sum(a * b, axis=1, keepdims=True)
+        # like mathutils, take the short way around by negating the first quaternion
+        a = np.where(cos < 0, -a, a)
+        cos = np.abs(cos)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            omega = np.arccos(np.minimum(cos, 1))
+            sin = np.sin(omega)
+            linear = cos >= 1 - 1e-4
+            wa = np.where(linear, 1 - t, np.sin((1 - t) * omega) / sin)
+            wb = np.where(linear, t, np.sin(t * omega) / sin)
+        return QuaternionArray(wa * a + wb * b)
+
+    def to_list(self):
+        """Returns the rotations as a list of `mathutils.Quaternion` objects."""
+        return [Quaternion(q) for q in self.data]
+
+    def __matmul__(self, other):
+        return QuaternionArray(_multiply(self.data, _as_data(other)))
+
+    def __rmatmul__(self, other):
+        return QuaternionArray(_multiply(_as_data(other), self.data))
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, i):
+        if isinstance(i, (int, np.integer)):
+            return Quaternion(self.data[i])
+        return QuaternionArray(self.data[i])
+
+    def __iter__(self):
+        return iter(self.to_list())
+
+    def __array__(self, dtype=None, copy=None):
+        return self.data if dtype is None else self.data.astype(dtype)
+
+    def __eq__(self, other):
+        return isinstance(other, QuaternionArray) and np.array_equal(self.data, other.data)
+
+    def __repr__(self):
+        return f"<QuaternionArray of {len(self)} rotations>"
+
+
+def _as_data(rotations):
+    """Converts a QuaternionArray, a list of rotations, or a single rotation into an array of shape (n, 4)."""
+    if isinstance(rotations, QuaternionArray):
+        return rotations.data
+    if hasattr(rotations, 'to_quaternion') or isinstance(rotations, Quaternion):
+        return np.array(to_quat(rotations), dtype=np.float64).reshape(1, 4)
+    return QuaternionArray.from_quaternions(rotations).data
+
+
+def _log(q):
+    """Logarithm of an array of shape (n, 4) of unit quaternions, as the vector part of a pure quaternion (n, 3)."""
+    v = q[:, 1:]
+    norm = np.linalg.norm(v, axis=1, keepdims=True)
+    angle = np.arctan2(norm, q[:, :1])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(norm > 0, v * angle / norm, 0.0)
+
+
+def _exp(v):
+    """Exponential of pure quaternions given by their vector parts (n, 3), as unit quaternions (n, 4)."""
+    angle = np.linalg.norm(v, axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scale = np.where(angle > 0, np.sin(angle) / angle, 1.0)
+    return np.column_stack((np.cos(angle), v * scale))
+
+
+def _continuous(q):
+    """Flips the signs of a path of quaternions of shape (n, 4) so that each one is in the same hemisphere as the one
+    before it, which doesn't change the rotations."""
+    signs = np.sign(np.sum(q[:-1] * q[1:], axis=1))
+    signs[signs == 0] = 1
+    q = q.copy()
+    q[1:] *= np.cumprod(signs)[:, None]
+    return q
+
+
+def _squad_controls(q):
+    """Computes the inner control points of SQUAD for a continuous path of unit quaternions of shape (n, 4), so that
+    the interpolated rotations have a continuous angular velocity. The endpoints are their own control points."""
+    s = q.copy()
+    if len(q) > 2:
+        inverse = q[1:-1] * (1, -1, -1, -1)
+        tangent = _log(_multiply(inverse, q[2:])) + _log(_multiply(inverse, q[:-2]))
+        s[1:-1] = _multiply(q[1:-1], _exp(-tangent / 4))
+    return s
+
+
+def _squad(a, b, sa, sb, t):
+    """Spherical quadrangle interpolation between rotations a and b, with control points sa and sb (see
+    `_squad_controls`), at factors t of shape (n,)."""
+    t = np.asarray(t, dtype=np.float64)
+    outer = QuaternionArray(a).slerp(QuaternionArray(b), t)
+    inner = QuaternionArray(sa).slerp(QuaternionArray(sb), t)
+    return outer.slerp(inner, 2 * t * (1 - t))
@@ -0,0 +1,477 @@
+"""
+This module generates low-discrepancy samples: deterministic point sets that fill a space much more evenly than
+independent random samples, so that the same coverage of the parameter space can be reached with fewer frames. For
+example, `sobol_rotations` covers SO(3) as evenly as `random_rotations <starfish.utils.random_rotations>` does with
+several times as many rotations.
+
+All of the generators here are deterministic. `halton` and `sobol` are sequences, so the first n points of a longer
+run are the same as a run of length n, and runs can be continued with the ``skip`` parameter.
+
+`poisson_sphere` and `poisson_rotations` instead use Sample Elimination (the same algorithm as `generate_keypoints
+<starfish.annotation.generate_keypoints>`) to order their points so that every prefix is spread out as evenly as
+possible, at a higher up-front cost.
+"""
+
+import heapq
+
+import mathutils
+import numpy as np
+from mathutils import Quaternion
+
+# primitive polynomials and initial direction numbers for dimensions 2 and up, from S. Joe and F. Y. Kuo, "Constructing
+# Sobol sequences with better two-dimensional projections" (2008), as (degree, coefficients, initial numbers)
+_SOBOL_PARAMETERS = [
+    (1, 0, (1,)),
+    (2, 1, (1, 3)),
+    (3, 1, (1, 3, 1)),
+    (3, 2, (1, 1, 1)),
+    (4, 1, (1, 1, 3, 3)),
+    (4, 4, (1, 3, 5, 13)),
+    (5, 2, (1, 1, 5, 5, 17)),
+    (5, 4, (1, 1, 5, 5, 5)),
+    (5, 7, (1, 1, 7, 11, 19)),
+    (5, 11, (1, 1, 5, 1, 1)),
+    (5, 13, (1, 1, 1, 3, 11)),
+    (5, 14, (1, 3, 5, 5, 31)),
+    (6, 1, (1, 3, 3, 9, 7, 49)),
+    (6, 13, (1, 1, 1, 15, 21, 21)),
+    (6, 16, (1, 3, 1, 13, 27, 49)),
+    (6, 19, (1, 1, 1, 15, 7, 5)),
+    (6, 22, (1, 3, 1, 15, 13, 25)),
+    (6, 25, (1, 1, 5, 5, 19, 61)),
+    (7, 1, (1, 3, 7, 11, 23, 15, 103)),
+    (7, 4, (1, 3, 7, 13, 13, 15, 69)),
+]
+_SOBOL_BITS = 32
+
+# parameters of sample elimination, from the paper
+ALPHA = 8
+BETA = 0.65
+GAMMA = 1.5
+SOBOL_MAX_DIMENSIONS = len(_SOBOL_PARAMETERS) + 1
+"""The maximum number of dimensions supported by `sobol`."""
+RANDOM_BLOCK_SIZE = 4096
+"""The number of points that `random_points` generates from each child seed."""
+
+
+def _primes(n):
+    """Returns the first n prime numbers."""
+    primes = []
+    candidate = 2
+    while len(primes) < n:
+        if all(candidate % p for p in primes if p * p <= candidate):
+            primes.append(candidate)
+        candidate += 1
+    return primes
+
+
+def _radical_inverse(indices, base):
+    """Mirrors the base-``base`` digits of each index about the radix point, e.g. 6 = 110b becomes 0.011b."""
+    result = np.zeros(len(indices))
+    indices = indices.copy()
+    factor = 1 / base
+    while np.any(indices):
+        indices, digits = np.divmod(indices, base)
+        result += digits * factor
+        factor /= base
+    return result
+
+
+def halton(n, d, skip=0):
+    """Generates the Halton sequence, which uses the radical inverses of the point indices in the first d prime bases.
+
+    Halton points are simple and work in any number of dimensions, but their quality degrades in high dimensions;
+    prefer `sobol` when d is more than about 6.
+
+    :param n: (int): number of points to generate
+    :param d: (int): number of dimensions
+    :param skip: (int): number of points at the start of the sequence to skip (default: 0)
+
+    :returns: numpy array of shape (n, d) with values in [0, 1)
+    """
+    indices = np.arange(skip, skip + n, dtype=np.int64)
+    return np.column_stack([_radical_inverse(indices, base) for base in _primes(d)]).reshape(n, d)
+
+
+def _sobol_directions(d):
+    """Returns the direction numbers of the first d dimensions as an integer array of shape (d, bits)."""
+    directions = np.zeros((d, _SOBOL_BITS), dtype=np.uint64)
+    directions[0] = [1 << (_SOBOL_BITS - 1 - j) for j in range(_SOBOL_BITS)]
+    for k, (s, a, m) in enumerate(_SOBOL_PARAMETERS[:d - 1], 1):
+        v = [m[j] << (_SOBOL_BITS - 1 - j) for j in range(s)]
+        for j in range(s, _SOBOL_BITS):
+            value = v[j - s] ^ (v[j - s] >> s)
+            for i in range(1, s):
+                if (a >> (s - 1 - i)) & 1:
+                    value ^= v[j - i]
+            v.append(value)
+        directions[k] = v
+    return directions
+
+
+def sobol(n, d, skip=0):
+    """Generates the (unscrambled) Sobol sequence, using the direction numbers of Joe and Kuo.
+
+    Sobol points are most evenly distributed when n and ``skip`` are powers of 2.
+
+    :param n: (int): number of points to generate
+    :param d: (int): number of dimensions, up to `SOBOL_MAX_DIMENSIONS`
+    :param skip: (int): number of points at the start of the sequence to skip (default: 0)
+
+    :returns: numpy array of shape (n, d) with values in [0, 1)
+    """
+    if not 1 <= d <= SOBOL_MAX_DIMENSIONS:
+        raise ValueError(f'd must be between 1 and {SOBOL_MAX_DIMENSIONS}')
+    if skip + n > 2 ** _SOBOL_BITS:
+        raise ValueError(f'At most 2^{_SOBOL_BITS} points are supported')
+    directions = _sobol_directions(d)
+    indices = np.arange(skip, skip + n, dtype=np.uint64)
+    # each point is the XOR of the direction numbers selected by the bits of the Gray code of its index
+    gray = indices ^ (indices >> np.uint64(1))
+    points = np.zeros((n, d), dtype=np.uint64)
+    for j in range(_SOBOL_BITS):
+        selected = ((gray >> np.uint64(j)) & np.uint64(1)).astype(bool)
+        points[selected] ^= directions[:, j]
+    return points / 2.0 ** _SOBOL_BITS
+
+
+def _block_seed(root, block):
+    """Returns child number ``block`` of a SeedSequence, the same as ``root.spawn(block + 1)[block]`` but without
+    spawning (or changing the state of) anything."""
+    return np.random.SeedSequence(root.entropy, spawn_key=root.spawn_key + (block,), pool_size=root.pool_size)
+
+
+def random_points(n, d, skip=0, seed=0):
+    """Generates uniformly random points that can be generated in parallel and still be reproduced exactly.
+
+    The points are split into blocks of `RANDOM_BLOCK_SIZE`, and each block is generated from its own child of
+    ``SeedSequence(seed)`` (the same children that ``SeedSequence.spawn`` would create). Any range of points therefore
+    only depends on ``seed`` and its position, like a `sobol` or `halton` sequence: it can be generated on its own
+    (e.g. by each of several processes), and is bit-identical to the same range of one long serial run.
+
+    :param n: (int): number of points to generate
+    :param d: (int): number of dimensions
+    :param skip: (int): number of points at the start of the sequence to skip (default: 0)
+    :param seed: (int or numpy.random.SeedSequence): the root seed (default: 0)
+
+    :returns: numpy array of shape (n, d) with values in [0, 1)
+    """
+    if n < 0 or skip < 0:
+        raise ValueError('n and skip must not be negative')
+    root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    size = RANDOM_BLOCK_SIZE
+    points = np.empty((n, d))
+    for block in range(skip // size, -(-(skip + n) // size)):
+        start, stop = max(skip, block * size), min(skip + n, (block + 1) * size)
+        values = np.random.default_rng(_block_seed(root, block)).random((size, d))
+        points[start - skip:stop - skip] = values[start - block * size:stop - block * size]
+    return points
+
+
+def _quaternions_from_unit(u):
+    """Maps points in the unit cube of shape (n, 3) to unit quaternions of shape (n, 4) in wxyz order, using
+    Shoemake's method. Uniformly distributed points map to uniformly distributed rotations."""
+    r1, r2 = np.sqrt(1 - u[:, 0]), np.sqrt(u[:, 0])
+    t1, t2 = 2 * np.pi * u[:, 1], 2 * np.pi * u[:, 2]
+    return np.column_stack((r2 * np.cos(t2), r1 * np.sin(t1), r1 * np.cos(t1), r2 * np.sin(t2)))
+
+
+def sobol_rotations(n, skip=0):
+    """Generates n rotations that are evenly distributed over SO(3) by mapping the 3D Sobol sequence onto the space of
+    rotations.
+
+    This is a drop-in replacement for `random_rotations <starfish.utils.random_rotations>`.
+
+    :param n: (int): number of rotations to generate
+    :param skip: (int): number of rotations at the start of the sequence to skip (default: 0)
+
+    :returns: List of `mathutils.Quaternion` objects.
+    """
+    return [Quaternion(q) for q in _quaternions_from_unit(sobol(n, 3, skip=skip))]
+
+
+def hopf_rotations(n):
+    """Generates a grid of about n rotations that are evenly spaced over SO(3), based on the Hopf fibration.
+
+    The Hopf fibration splits a rotation into a point on the sphere (the direction that the rotation points the object's
+    +Z axis in) and an angle around that direction. The grid combines evenly spaced points on the sphere (from
+    `uniform_sphere <starfish.utils.uniform_sphere>`) with evenly spaced angles, with the number of each chosen so
+    that both are spaced equally far apart. See A. Yershova et al., "Generating uniform incremental grids on SO(3)
+    using the Hopf fibration" (2010).
+
+    Unlike `sobol_rotations`, this is a grid rather than a sequence, so it is not possible to extend it.
+
+    :param n: (int): number of rotations to generate
+
+    :returns: List of `mathutils.Quaternion` objects.
+    """
+    from .utils import uniform_sphere
+
+    # points on the sphere are about sqrt(4 pi / m) apart, so use sqrt(pi * m) angles to space them equally
+    num_angles = max(1, int(round((np.pi * n) ** (1 / 3))))
+    num_points = -(-n // num_angles)
+    theta, phi = uniform_sphere(num_points)
+    psi = (np.arange(num_angles) + 0.5) * 2 * np.pi / num_angles
+    theta, phi, psi = np.repeat(theta, num_angles), np.repeat(phi, num_angles), np.tile(psi, num_points)
+
+    # Hopf coordinates to quaternions
+    q = np.column_stack((
+        np.cos(phi / 2) * np.cos(psi / 2),
+        np.cos(phi / 2) * np.sin(psi / 2),
+        np.sin(phi / 2) * np.cos(theta + psi / 2),
+        np.sin(phi / 2) * np.sin(theta + psi / 2),
+    ))
+    # drop any extra rotations evenly from throughout the grid
+    keep = np.round(np.linspace(0, len(q) - 1, n)).astype(np.int64) if n else np.zeros(0, dtype=np.int64)
+    return [Quaternion(row) for row in q[keep]]
+
+
+def frame_parameters(n, rotations=('pose',), method='sobol', skip=0, seed=0, **ranges):
+    """Generates low-discrepancy samples of several frame parameters at once, ready to be passed to `Sequence.standard
+    <starfish.Sequence.standard>`::
+
+        params = frame_parameters(1024, rotations=('pose', 'lighting'), distance=(20, 60), offset=[(0.3, 0.7)] * 2)
+        sequence = Sequence.standard(**params)
+
+    All of the parameters are sampled together from a single multi-dimensional sequence, so that every combination of
+    them is covered evenly, rather than just each parameter individually. The 'random' method samples independent
+    random points with `random_points` instead, which can also be split up with ``skip``, e.g. to generate each part
+    of a large random sequence in a different process.
+
+    :param n: (int): number of frames to generate
+    :param rotations: (seq of str): the rotation parameters (e.g. 'pose', 'lighting', 'background') to sample
+        uniformly from SO(3) (default: ('pose',))
+    :param method: (str): 'sobol', 'halton', or 'random' (default: 'sobol')
+    :param skip: (int): number of points at the start of the sequence to skip (default: 0)
+    :param seed: (int or numpy.random.SeedSequence): the root seed of the 'random' method (default: 0)
+    :param ranges: the (low, high) range to sample each numeric parameter from. For parameters with multiple values
+        (e.g. 'position' and 'offset'), provide a list of ranges, one for each value.
+
+    :returns: a dictionary mapping each parameter name to a list of n values
+    """
+    if method not in ('sobol', 'halton', 'random'):
+        raise ValueError(f'Unknown method: {method}')
+    # figure out which dimensions of the sample belong to each parameter
+    dims = {}
+    d = 0
+    for name in rotations:
+        dims[name] = slice(d, d + 3)
+        d += 3
+    scalars = {}
+    for name, r in ranges.items():
+        r = np.array(r, dtype=np.float64)
+        scalars[name] = r.ndim == 1
+        r = r.reshape(-1, 2)
+        dims[name] = (slice(d, d + len(r)), r)
+        d += len(r)
+
+    if method == 'random':
+        points = random_points(n, d, skip=skip, seed=seed)
+    else:
+        points = (sobol if method == 'sobol' else halton)(n, d, skip=skip)
+    params = {}
+    for name in rotations:
+        params[name] = [Quaternion(q) for q in _quaternions_from_unit(points[:, dims[name]])]
+    for name in ranges:
+        columns, r = dims[name]
+        values = r[:, 0] + points[:, columns] * (r[:, 1] - r[:, 0])
+        params[name] = values[:, 0].tolist() if scalars[name] else [tuple(v) for v in values.tolist()]
+    return params
+
+
+def _compute_rmax_rmin(curr_num, target_num, volume, dimension=3):
+    if dimension == 2:
+        rmax = np.sqrt(volume / (2 * np.sqrt(3) * target_num))
+    else:
+        rmax = (volume / (4 * np.sqrt(2) * target_num)) ** (1 / 3)
+    rmin = rmax * (1 - (target_num / curr_num) ** GAMMA) * BETA
+    return rmax, rmin
+
+
+def _weight(d, rmax, rmin):
+    d_hat = min(d, 2 * rmax) if d > 2 * rmin else 2 * rmin
+    return (1 - (d_hat / (2 * rmax))) ** ALPHA
+
+
+def _build_kdtree(points):
+    kdtree = mathutils.kdtree.KDTree(len(points))
+    for i, point in enumerate(points):
+        kdtree.insert(point, i)
+    kdtree.balance()
+    return kdtree
+
+
+def _kdtree_pairs(points, kdtree=None, size=None):
+    """Returns a pair finder (see `_sample_eliminate`) for 3D points under the Euclidean distance.
+
+    :param kdtree: a prebuilt kd-tree of the first ``size`` points. Any points after those are not in the tree, so
+        they are only ever paired with points in the tree. (default: build one containing all of the points)
+    """
+    if kdtree is None:
+        kdtree, size = _build_kdtree(points), len(points)
+
+    def find_pairs(radius, indices):
+        alive = set(indices)
+        a, b, distances = [], [], []
+        for i in indices:
+            for _, j, d in kdtree.find_range(points[i], radius):
+                if (j > i or i >= size) and j in alive:
+                    a.append(i)
+                    b.append(j)
+                    distances.append(d)
+        return a, b, distances
+
+    return find_pairs
+
+
+def _sphere_pairs(directions):
+    """Returns a pair finder for unit vectors under the geodesic (great circle) distance."""
+    find_chord_pairs = _kdtree_pairs([tuple(v) for v in directions])
+
+    def find_pairs(radius, indices):
+        a, b, chords = find_chord_pairs(2 * np.sin(min(radius, np.pi) / 2), indices)
+        return a, b, (2 * np.arcsin(np.clip(np.array(chords) / 2, 0, 1))).tolist()
+
+    return find_pairs
+
+
+def _rotation_pairs(quaternions):
+    """Returns a pair finder for unit quaternions under the geodesic distance between rotations (the rotation angle)."""
+    from .coverage import RotationIndex
+
+    def find_pairs(radius, indices):
+        indices = np.asarray(indices)
+        a, b = RotationIndex(quaternions[indices], min(radius, np.pi)).pairs()
+        a, b = indices[a], indices[b]
+        distances = 2 * np.arccos(np.clip(np.abs(np.einsum('ij,ij->i', quaternions[a], quaternions[b])), 0, 1))
+        return a.tolist(), b.tolist(), distances.tolist()
+
+    return find_pairs
+
+
+def _sample_eliminate(points, target_num, stop_num, volume, dimension=3, find_pairs=None, fixed=()):
+    """Run sample elimination to get a Poisson disk distribution.
+
+    :param points: the candidate points
+    :param target_num: (int): the number of points to keep
+    :param stop_num: (int): the number of points at which to stop eliminating
+    :param volume: (float): the volume (or area, if ``dimension`` is 2) of the space that the points are in
+    :param dimension: (int): 2 for points on a surface or 3 for points in a volume (default: 3)
+    :param find_pairs: a function ``find_pairs(radius, indices)`` that returns a tuple (a, b, distances) of lists
+        describing every pair of points (a[k], b[k]) among ``indices`` that are within ``radius`` of each other, each
+        pair listed once. (default: the Euclidean distance between 3D points, using a kd-tree)
+    :param fixed: (seq of int): indices of points that are never eliminated, but still push the other points away.
+        These count towards ``target_num`` and ``stop_num``. (default: none)
+
+    :returns: the fixed points, followed by the rest of the points in order, so that each prefix of ``stop_num`` or
+        more points is also evenly spread out
+    """
+    if find_pairs is None:
+        find_pairs = _kdtree_pairs(points)
+    fixed = list(fixed)
+    fixed_set = set(fixed)
+
+    def neighbors(radius, indices):
+        adjacent = {i: [] for i in indices}
+        for i, j, d in zip(*find_pairs(radius, indices)):
+            adjacent[i].append((j, d))
+            adjacent[j].append((i, d))
+        return adjacent
+
+    def build_heap(indices, rmax, rmin):
+        adjacent = neighbors(2 * rmax, indices + fixed)
+        heap = [[-sum(_weight(d, rmax, rmin) for _, d in adjacent[i]), i] for i in indices]
+        heapq.heapify(heap)
+        return heap, {e[1]: e for e in heap}, adjacent
+
+    rmax, rmin = _compute_rmax_rmin(len(points), target_num, volume, dimension)
+    heap, heap_dict, adjacent = build_heap([i for i in range(len(points)) if i not in fixed_set], rmax, rmin)
+
+    result_indices = []
+    curr_target = target_num
+    while len(heap_dict) + len(fixed) > stop_num:
+        if len(heap_dict) + len(fixed) == curr_target:
+            # move down target size by factors of 2, as in the paper
+            curr_target //= 2
+            # update rmax, rmin, and heap values
+            rmax, rmin = _compute_rmax_rmin(len(heap_dict) + len(fixed), curr_target, volume, dimension)
+            heap, heap_dict, adjacent = build_heap(list(heap_dict.keys()), rmax, rmin)
+
+        _, index = heapq.heappop(heap)
+        if index == -1:
+            continue
+
+        if len(heap_dict) + len(fixed) <= target_num:
+            # we've reached the original target, so we need to start keeping track of the ordering
+            result_indices.append(index)
+
+        del heap_dict[index]
+
+        # update points adjacent to the one that was just removed
+        for ni, d in adjacent[index]:
+            if ni in heap_dict:
+                # mark old value as dirty
+                heap_dict[ni][1] = -1
+                # insert new value
+                heap_dict[ni] = [heap_dict[ni][0] + _weight(d, rmax, rmin), ni]
+                heapq.heappush(heap, heap_dict[ni])
+
+    # reverse indices and then add the rest in no particular order
+    result_indices = fixed + result_indices[::-1] + list(heap_dict.keys())
+
+    return [points[i] for i in result_indices]
+
+
+def _check_poisson_arguments(n, stop, oversample):
+    if stop < 1 or stop > n:
+        raise ValueError('stop must be between 1 and n, inclusive')
+    if oversample < 1:
+        raise ValueError('oversample must be greater than or equal to 1')
+
+
+def poisson_sphere(n, stop=1, oversample=10, seed=0):
+    """Generates n points on the surface of a sphere that follow a Poisson disk distribution under the great-circle
+    distance, using the same Sample Elimination algorithm as `generate_keypoints
+    <starfish.annotation.generate_keypoints>`.
+
+    The points are ordered so that the first k points are also evenly spread out for any ``stop <= k <= n``, which
+    makes it possible to stop rendering a sequence early and still have evenly distributed (e.g.) background
+    directions.
+
+    :param n: (int): number of points to generate
+    :param stop: (int): an integer between 1 and ``n`` (inclusive) at which sample elimination will stop (default: 1)
+    :param oversample: (float): the number of random candidates to eliminate from, as a multiple of n (default: 10)
+    :param seed: (int): seed for the random candidates (default: 0)
+
+    :returns: A tuple of the form (theta, phi), the same as `uniform_sphere <starfish.utils.uniform_sphere>`.
+    """
+    _check_poisson_arguments(n, stop, oversample)
+    directions = np.random.default_rng(seed).normal(size=(int(n * oversample), 3))
+    directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+    order = _sample_eliminate(list(range(len(directions))), n, stop, 4 * np.pi, dimension=2,
+                              find_pairs=_sphere_pairs(directions))
+    x, y, z = directions[order].T
+    return np.arctan2(y, x) % (2 * np.pi), np.arccos(np.clip(z, -1, 1))
+
+
+def poisson_rotations(n, stop=1, oversample=10, seed=0):
+    """Generates n rotations that follow a Poisson disk distribution over SO(3) under the geodesic distance between
+    rotations, using the same Sample Elimination algorithm as `generate_keypoints
+    <starfish.annotation.generate_keypoints>`.
+
+    The rotations are ordered so that the first k rotations are also evenly spread out for any ``stop <= k <= n``, so
+    that e.g. the frames of a sequence made from them are a good set of viewpoints no matter where rendering stops.
+
+    :param n: (int): number of rotations to generate
+    :param stop: (int): an integer between 1 and ``n`` (inclusive) at which sample elimination will stop (default: 1)
+    :param oversample: (float): the number of random candidates to eliminate from, as a multiple of n (default: 10)
+    :param seed: (int): seed for the random candidates (default: 0)
+
+    :returns: List of `mathutils.Quaternion` objects.
+    """
+    _check_poisson_arguments(n, stop, oversample)
+    q = np.random.default_rng(seed).normal(size=(int(n * oversample), 4))
+    q /= np.linalg.norm(q, axis=1, keepdims=True)
+    # SO(3) has a volume of 8 pi^2 when distances are measured by the rotation angle
+    order = _sample_eliminate(list(range(len(q))), n, stop, 8 * np.pi ** 2, find_pairs=_rotation_pairs(q))
+    return [Quaternion(row) for row in q[order]]
@@ -0,0 +1,249 @@
+"""
+This module balances the rendering of a sequence across workers whose frames take different amounts of time.
+
+Some frames are much more expensive to render than others: the object fills more of the picture when the camera is
+close, some parts of the background are more detailed than others, and some lighting angles cause more shadows and
+reflections. A `CostModel` learns to predict the render time of a frame from its parameters, using the render times of
+frames that have already been rendered. A `Scheduler` then uses these predictions to decide how many frames to give a
+worker at once: big chunks while there's lots of work left (to keep the overhead low), and smaller and smaller chunks
+towards the end, sized by each worker's measured speed, so that all of the workers finish at about the same time.
+
+Pass a scheduler to a `Coordinator <starfish.distributed.Coordinator>` to use it::
+
+    scheduler = Scheduler(target=120)
+    with Coordinator(sequence, scheduler=scheduler) as coordinator:
+        coordinator.wait()
+    print(CostModel.report(coordinator.predicted, coordinator.durations))
+"""
+
+import numpy as np
+
+from .utils import to_quat
+
+# the names of the features that the cost model is fit to, in order
+FEATURES = ('constant', 'inverse_square_distance', 'off_center', 'background_x', 'background_y', 'background_z',
+            'lighting_angle')
+
+
+def frame_features(frames):
+    """Computes the features that render cost is predicted from for a list of frames.
+
+    The features are: a constant, the inverse square of the distance (proportional to the fraction of the picture that
+    the object covers), the distance of the offset from the center of the picture, the direction that the camera looks
+    in (which determines the part of the background that is visible), and the angle of the lighting away from the
+    camera.
+
+    :param frames: (seq): a `Sequence <starfish.Sequence>` or list of frames
+
+    :returns: numpy array of shape (n, len(FEATURES))
+    """
+    n = len(frames)
+    features = np.ones((n, len(FEATURES)))
+    if not n:
+        return features
+    distance = np.array([frame.distance for frame in frames], dtype=np.float64)
+    offset = np.array([frame.offset for frame in frames], dtype=np.float64)
+    background = np.array([tuple(to_quat(frame.background)) for frame in frames])
+    lighting = np.array([tuple(to_quat(frame.lighting)) for frame in frames])
+
+    features[:, 1] = 1 / np.maximum(distance, 1e-6) ** 2
+    features[:, 2] = np.linalg.norm(offset - 0.5, axis=1)
+    # the camera looks along the background rotation's -Z axis, which is minus the third column of its matrix
+    w, x, y, z = (background / np.linalg.norm(background, axis=1, keepdims=True)).T
+    features[:, 3] = -2 * (x * z + w * y)
+    features[:, 4] = -2 * (y * z - w * x)
+    features[:, 5] = -(1 - 2 * (x * x + y * y))
+    features[:, 6] = 2 * np.arccos(np.clip(np.abs(lighting[:, 0]) / np.linalg.norm(lighting, axis=1), 0, 1))
+    return features
+
+
+class CostModel:
+    """Predicts the render time of frames from their parameters using ridge regression on `frame_features`.
+
+    The model is updated incrementally: every call to `update` adds to its history, and the fit always uses all of the
+    history so far. Until there are enough rendered frames to fit every feature, the mean render time so far is
+    predicted for every frame (or ``prior``, before any frame has been rendered).
+
+    Attributes:
+
+    * weights: The fitted weight of each of the `FEATURES`, or None if there isn't enough history yet.
+    * count: The number of rendered frames in the history.
+    """
+
+    def __init__(self, prior=1.0, regularization=1e-3):
+        """
+        :param prior: (float): the render time, in seconds, that is predicted before any frame has been rendered
+            (default: 1.0)
+        :param regularization: (float): the strength of the ridge penalty on the weights, relative to the scale of
+            each feature (default: 1e-3)
+        """
+        if prior <= 0:
+            raise ValueError('prior must be positive')
+        self.prior = prior
+        self.regularization = regularization
+        self.weights = None
+        self.count = 0
+        # sufficient statistics of the history, so that the history itself doesn't need to be kept
+        self._xtx = np.zeros((len(FEATURES), len(FEATURES)))
+        self._xty = np.zeros(len(FEATURES))
+        self._total = 0.0
+
+    def update(self, frames, durations):
+        """Adds rendered frames and their render times (in seconds) to the history, and refits the model.
+
+        Frames with a NaN duration (i.e. not rendered) are ignored.
+        """
+        durations = np.asarray(durations, dtype=np.float64)
+        if len(frames) != len(durations):
+            raise ValueError('frames and durations must have the same length')
+        valid = ~np.isnan(durations)
+        if not valid.any():
+            return self
+        x = frame_features([frame for frame, v in zip(frames, valid) if v])
+        y = durations[valid]
+        self._xtx += x.T @ x
+        self._xty += x.T @ y
+        self._total += y.sum()
+        self.count += len(y)
+
+        if self.count >= 2 * len(FEATURES):
+            # the penalty is scaled by each feature's magnitude so that it doesn't depend on the units, and it doesn't
+            # apply to the constant
+            penalty = self.regularization * np.diag(self._xtx).copy()
+            penalty[0] = 0
+            self.weights = np.linalg.lstsq(self._xtx + np.diag(penalty), self._xty, rcond=None)[0]
+        return self
+
+    def predict(self, frames):
+        """Predicts the render time, in seconds, of each frame.
+
+        :returns: numpy array of shape (n,) of positive render times
+        """
+        if self.weights is None:
+            mean = self._total / self.count if self.count else self.prior
+            return np.full(len(frames), mean)
+        floor = 0.01 * self._total / self.count
+        return np.maximum(frame_features(frames) @ self.weights, floor)
+
+    @staticmethod
+    def report(predicted, actual):
+        """Compares predicted render times with actual ones, e.g. to tune a cost model.
+
+        :param predicted: (array-like): predicted render times
+        :param actual: (array-like): actual render times, where NaN means the frame wasn't rendered
+
+        :returns: a dictionary with the number of frames compared, the total predicted and actual time, the mean
+            absolute error, the mean absolute relative error, and the correlation between predicted and actual times
+        """
+        predicted = np.asarray(predicted, dtype=np.float64)
+        actual = np.asarray(actual, dtype=np.float64)
+        valid = ~(np.isnan(predicted) | np.isnan(actual))
+        predicted, actual = predicted[valid], actual[valid]
+        report = {'count': int(valid.sum()), 'predicted': float(predicted.sum()), 'actual': float(actual.sum())}
+        if not report['count']:
+            return report
+        error = np.abs(predicted - actual)
+        report['mae'] = float(error.mean())
+        report['relative_error'] = float(np.mean(error / np.maximum(actual, 1e-9)))
+        if report['count'] > 1 and predicted.std() > 0 and actual.std() > 0:
+            report['correlation'] = float(np.corrcoef(predicted, actual)[0, 1])
+        return report
+
+
+class Scheduler:
+    """Decides how many frames go in each lease handed out by a `Coordinator <starfish.distributed.Coordinator>`.
+
+    Each lease is sized to take about ``target`` seconds on the worker that asks for it, according to the cost model
+    and the worker's measured speed, but never more than a ``1 / (factor * workers)`` share of the predicted work that
+    is left. This is guided self-scheduling: leases shrink as the work runs out, so that no worker is left with a long
+    lease while the others sit idle.
+
+    Attributes:
+
+    * model: The `CostModel`.
+    * speeds: A dictionary mapping worker names to how long each worker takes to render a frame relative to the model's
+      prediction (e.g. 2.0 for a worker that is twice as slow as predicted).
+    """
+
+    def __init__(self, model=None, target=60.0, min_frames=1, max_frames=1000, factor=2.0, smoothing=0.3):
+        """
+        :param model: (CostModel): the cost model to use (default: a new `CostModel`)
+        :param target: (float): the number of seconds that each lease should take (default: 60)
+        :param min_frames: (int): the minimum number of frames in a lease (default: 1)
+        :param max_frames: (int): the maximum number of frames in a lease (default: 1000)
+        :param factor: (float): how quickly leases shrink towards the end; each lease gets at most ``1 / (factor *
+            workers)`` of the remaining predicted work (default: 2)
+        :param smoothing: (float): the weight of each new measurement in the exponential moving average of a worker's
+            speed (default: 0.3)
+        """
+        if min_frames < 1 or max_frames < min_frames:
+            raise ValueError('Must have 1 <= min_frames <= max_frames')
+        self.model = model if model is not None else CostModel()
+        self.target = target
+        self.min_frames = min_frames
+        self.max_frames = max_frames
+        self.factor = factor
+        self.smoothing = smoothing
+        self.speeds = {}
+        self._frames = None
+        self._costs = None
+        self._cumulative = None
+        self._fitted_count = 0
+
+    def _refresh(self, frames):
+        """Recomputes the predicted cost of every frame when the model has changed enough to matter."""
+        # refitting is cheap, but predicting every frame isn't, so only do it each time the history doubles
+        count = self.model.count
+        if self._frames is not frames or (count != self._fitted_count and count >= 2 * self._fitted_count):
+            self._frames = frames
+            self._costs = self.model.predict(frames)
+            self._cumulative = np.concatenate(([0], np.cumsum(self._costs)))
+            self._fitted_count = self.model.count
+
+    def costs(self, frames):
+        """Returns the current predicted render time of each frame, in seconds, for a worker with a speed of 1."""
+        self._refresh(frames)
+        return self._costs
+
+    def chunk(self, frames, start, stop, remaining, worker):
+        """Chooses the end of the next lease, which starts at ``start`` and may extend up to ``stop``.
+
+        :param frames: (seq): every frame of the sequence
+        :param start: (int): the index of the first frame of the lease
+        :param stop: (int): the end of the range of pending frames that the lease is taken from
+        :param remaining: (seq): the (start, stop) ranges of every pending frame, including this one
+        :param worker: (str): the name of the worker that the lease is for
+
+        :returns: the index one past the last frame of the lease
+        """
+        self._refresh(frames)
+        speed = self.speeds.get(worker, 1.0)
+        workers = max(len(self.speeds), 1)
+        left = sum(self._cumulative[b] - self._cumulative[a] for a, b in remaining)
+        budget = min(self.target / speed, left / (self.factor * workers))
+        end = int(np.searchsorted(self._cumulative, self._cumulative[start] + budget, side='right')) - 1
+        return min(max(end, start + self.min_frames), start + self.max_frames, stop)
+
+    def record(self, frames, durations, worker):
+        """Adds rendered frames to the cost model's history, and updates the speed of the worker that rendered them.
+
+        :param frames: (seq): the rendered frames
+        :param durations: (array-like): the render time of each frame, in seconds
+        :param worker: (str): the name of the worker that rendered them
+        """
+        durations = np.asarray(durations, dtype=np.float64)
+        valid = ~np.isnan(durations)
+        if not valid.any():
+            return
+        predicted = self.model.predict([frame for frame, v in zip(frames, valid) if v]).sum()
+        ratio = durations[valid].sum() / predicted
+        previous = self.speeds.get(worker)
+        speed = ratio if previous is None else (1 - self.smoothing) * previous + self.smoothing * ratio
+        self.speeds[worker] = speed
+        # the model learns the cost of frames on a worker with a speed of 1, so that it doesn't mix up slow workers
+        # with expensive frames
+        self.model.update(frames, durations / speed)
+
+    def predict(self, start, stop, worker):
+        """Returns the predicted render time of each frame in a lease on a worker, including the worker's speed."""
+        return self._costs[start:stop] * self.speeds.get(worker, 1.0)
@@ -0,0 +1,185 @@
+"""
+This module summarizes the distribution of the parameters of a sequence, so that it can be checked before anything is
+rendered.
+
+Every parameter of every frame is gathered into numpy arrays once, and all of the statistics are computed from those
+arrays, so even sequences with millions of frames are described in a few seconds. The summary only contains plain
+numbers, lists, and dictionaries, so it can be saved as JSON alongside the rendered dataset::
+
+    summary = sequence.describe(threshold=np.radians(1))
+    print(summary['distance']['histogram'], summary['duplicates'])
+    with open('summary.json', 'w') as f:
+        json.dump(summary, f, indent=2)
+"""
+
+import itertools
+from operator import attrgetter
+
+import numpy as np
+
+from .coverage import _as_quaternions, _near_duplicates
+from .profiling import profiled, stage
+from .rotations import QuaternionArray
+from .utils import to_quat
+
+# the frame parameters, and the number of values in each
+PARAMETERS = {'position': 3, 'distance': 1, 'pose': 4, 'lighting': 4, 'offset': 2, 'background': 4}
+_ROTATIONS = ('pose', 'lighting', 'background')
+_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def frame_arrays(sequence):
+    """Gathers the 6 parameters of every frame of a sequence into numpy arrays.
+
+    :param sequence: (seq): a `Sequence <starfish.Sequence>` or list of frames
+
+    :returns: a dictionary mapping each parameter name to a float64 array with one row per frame: 'position' (n, 3),
+        'distance' (n,), 'pose' (n, 4), 'lighting' (n, 4), 'offset' (n, 2), and 'background' (n, 4). Rotations are
+        quaternions in wxyz order.
+    """
+    frames = list(sequence)
+    n = len(frames)
+    arrays = {}
+    for name, width in PARAMETERS.items():
+        values = map(attrgetter(name), frames)
+        if width == 1:
+            arrays[name] = np.fromiter(values, np.float64, n)
+            continue
+        if name in _ROTATIONS:
+            values = map(to_quat, values)
+        # flattening the values with itertools is several times faster than having numpy convert each one
+        arrays[name] = np.fromiter(itertools.chain.from_iterable(values), np.float64, n * width).reshape(n, width)
+    return arrays
+
+
+def _row_ids(array):
+    """Numbers the distinct rows of a 2D array, returning the number of the row that each row is equal to."""
+    # adding 0 turns -0.0 into 0.0, so that rows that are equal have the same bytes
+    array = np.ascontiguousarray(array + 0.0)
+    # sorting whole rows is slow, so hash each row into a single integer and sort those instead
+    bits = array.view(np.uint64)
+    keys = bits[:, 0].copy()
+    for column in bits.T[1:]:
+        keys = keys * _HASH_MULTIPLIER + column
+    order = np.argsort(keys)
+    keys = keys[order]
+    same = keys[1:] == keys[:-1]
+    if np.array_equal(array[order[1:][same]], array[order[:-1][same]]):
+        ids = np.empty(len(keys), dtype=np.int64)
+        ids[order] = np.concatenate(([0], np.cumsum(~same)))
+        return ids
+    # two different rows have the same hash
+    rows = array.view(np.dtype((np.void, array.dtype.itemsize * array.shape[1]))).ravel()
+    return np.unique(rows, return_inverse=True)[1].ravel()
+
+
+def _histogram(values, bins, limits=None):
+    counts, edges = np.histogram(values, bins=bins, range=limits)
+    return {'counts': counts.tolist(), 'edges': edges.tolist()}
+
+
+def _describe_values(values, bins):
+    """Describes an array of shape (n,) or (n, k), column by column."""
+    result = {
+        'min': values.min(axis=0).tolist(),
+        'max': values.max(axis=0).tolist(),
+        'mean': values.mean(axis=0).tolist(),
+        'std': values.std(axis=0).tolist(),
+    }
+    if values.ndim == 1:
+        result['histogram'] = _histogram(values, bins)
+    else:
+        result['unique'] = int(_row_ids(values).max()) + 1
+    return result
+
+
+def _describe_offsets(offsets, bins):
+    result = _describe_values(offsets, bins)
+    in_frame = np.all((offsets >= 0) & (offsets <= 1), axis=1)
+    counts, _, _ = np.histogram2d(offsets[:, 0], offsets[:, 1], bins=bins, range=((0, 1), (0, 1)))
+    result['in_frame'] = float(in_frame.mean())
+    # rows are vertical offsets, columns horizontal offsets, like the picture itself
+    result['histogram'] = counts.astype(np.int64).tolist()
+    result['covered'] = float(np.count_nonzero(counts) / counts.size)
+    return result
+
+
+def _describe_rotations(q, bins):
+    """Describes an array of shape (n, 4) of unit quaternions with w >= 0."""
+    # the chordal mean rotation: the quaternion that maximizes the sum of squared dot products, which doesn't depend
+    # on the signs of the quaternions
+    mean = np.linalg.eigh(q.T @ q)[1][:, -1]
+    mean *= np.sign(mean[0]) or 1
+    angles = 2 * np.arccos(np.clip(np.abs(q @ mean), 0, 1))
+    # the theta and phi of `Spherical` coordinates are the direction of the rotated +Z axis
+    z_axis = QuaternionArray(q).rotate((0, 0, 1))
+    theta = np.arctan2(z_axis[:, 1], z_axis[:, 0]) % (2 * np.pi)
+    phi = np.arccos(np.clip(z_axis[:, 2], -1, 1))
+    # cells of equal area on the sphere: equal steps in theta and in cos(phi)
+    directions, _, _ = np.histogram2d(theta, np.cos(phi), bins=bins, range=((0, 2 * np.pi), (-1, 1)))
+    return {
+        'unique': int(_row_ids(q).max()) + 1,
+        'mean': mean.tolist(),
+        'spread': float(np.sqrt(np.mean(angles ** 2))),
+        'max_angle': float(angles.max()),
+        'angle_histogram': _histogram(angles, bins, (0, np.pi)),
+        'theta_histogram': _histogram(theta, bins, (0, 2 * np.pi)),
+        'phi_histogram': _histogram(phi, bins, (0, np.pi)),
+        'directions_covered': float(np.count_nonzero(directions) / directions.size),
+    }
+
+
+@profiled('describe')
+def describe(sequence, bins=10, threshold=None):
+    """Summarizes the distribution of the parameters of a sequence.
+
+    For rotations, the 'spread' is the root mean square angle from the mean rotation, and 'theta_histogram',
+    'phi_histogram', and 'directions_covered' describe the rotated +Z axis in `Spherical <starfish.rotations.Spherical>`
+    coordinates, e.g. the direction that the light comes from. 'directions_covered' is the fraction of ``bins * bins``
+    equal-area cells of the sphere that contain at least one direction.
+
+    :param sequence: (seq): a `Sequence <starfish.Sequence>` or list of frames
+    :param bins: (int): the number of bins in each histogram (default: 10)
+    :param threshold: (float): if given, also count the near-duplicate frames, as `deduplicate
+        <starfish.coverage.deduplicate>` would remove with this threshold (in radians) (default: None)
+
+    :returns: a dictionary that can be serialized to JSON, with the keys:
+
+        * 'num_frames': the number of frames
+        * 'distance': the 'min', 'max', 'mean', 'std', and 'histogram' (a dictionary of 'counts' and 'edges')
+        * 'position': the 'min', 'max', 'mean', and 'std' of each coordinate, and the number of 'unique' positions
+        * 'offset': the same as 'position', plus the fraction of offsets that are 'in_frame', a 2D 'histogram' of
+          offsets within the frame, and the fraction of its cells that are 'covered'
+        * 'pose', 'lighting', 'background': the number of 'unique' rotations, the 'mean' rotation (wxyz), the
+          'spread', the 'max_angle' from the mean, histograms of the angle from the mean, theta, and phi, and
+          'directions_covered'
+        * 'duplicates': the number of frames that are 'exact' duplicates of an earlier frame, and, if ``threshold``
+          is given, the number that are 'near' duplicates
+    """
+    if bins < 1:
+        raise ValueError('bins must be at least 1')
+    with stage('describe.gather'):
+        arrays = frame_arrays(sequence)
+    n = len(arrays['distance'])
+    if not n:
+        raise ValueError('Cannot describe an empty sequence')
+    rotations = {name: _as_quaternions(arrays[name]) for name in _ROTATIONS}
+
+    with stage('describe.statistics'):
+        summary = {
+            'num_frames': n,
+            'distance': _describe_values(arrays['distance'], bins),
+            'position': _describe_values(arrays['position'], bins),
+            'offset': _describe_offsets(arrays['offset'], bins),
+        }
+        for name in _ROTATIONS:
+            summary[name] = _describe_rotations(rotations[name], bins)
+
+    with stage('describe.duplicates'):
+        exact = np.column_stack([arrays['position'], arrays['distance'], arrays['offset']])
+        everything = np.column_stack([exact] + [rotations[name] for name in _ROTATIONS])
+        summary['duplicates'] = {'exact': n - int(_row_ids(everything).max()) - 1}
+        if threshold is not None:
+            kept = _near_duplicates(rotations, _row_ids(exact), threshold)
+            summary['duplicates']['near'] = n - int(np.count_nonzero(kept))
+    return summary
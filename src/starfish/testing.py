@@ -0,0 +1,782 @@
+"""
+This module is a lightweight stand-in for the small part of Blender's Python API that Starfish uses, so that
+`Frame.setup <starfish.Frame.setup>`, `Sequence.bake <starfish.Sequence.bake>`, and the keypoint annotation functions
+can be tested and benchmarked without a Blender install.
+
+It is not a general-purpose replacement for ``bpy``. Only the attributes and methods that Starfish (and typical render
+scripts built on top of it) touch are implemented, but those are implemented faithfully: object transforms, camera
+`view_frame <FakeCamera.view_frame>`, ``world_to_camera_view``, keyframes, mesh volumes, and particle distribution all
+follow Blender's own definitions.
+
+The fake modules are installed using the `fake_blender` context manager::
+
+    with fake_blender() as bpy:
+        scene = bpy.data.scenes.new('Scene')
+        obj = bpy.data.objects.new('Object', FakeMesh.cube())
+        camera = bpy.data.objects.new('Camera', bpy.data.cameras.new('Camera'))
+        sun = bpy.data.objects.new('Sun', bpy.data.lights.new('Sun', 'SUN'))
+
+        frame.setup(scene, obj, camera, sun)
+        keypoints = project_keypoints_onto_image([(0, 0, 0)], scene, obj, camera)
+"""
+
+import contextlib
+import sys
+import types
+
+import numpy as np
+from mathutils import Euler, Matrix, Quaternion, Vector
+
+
+class FakeIDCollection:
+    """A named collection of data-blocks, like ``bpy.data.objects``."""
+
+    def __init__(self, factory=None):
+        self._items = {}
+        self._factory = factory
+
+    def new(self, name, *args, **kwargs):
+        item = self._factory(name, *args, **kwargs)
+        self._items[name] = item
+        return item
+
+    def add(self, item):
+        self._items[item.name] = item
+        return item
+
+    def remove(self, item):
+        del self._items[item.name]
+
+    def get(self, name, default=None):
+        return self._items.get(name, default)
+
+    def keys(self):
+        return self._items.keys()
+
+    def values(self):
+        return list(self._items.values())
+
+    def __getitem__(self, name):
+        return self._items[name]
+
+    def __contains__(self, name):
+        return name in self._items
+
+    def __iter__(self):
+        return iter(list(self._items.values()))
+
+    def __len__(self):
+        return len(self._items)
+
+
+class FakeRenderSettings:
+    def __init__(self):
+        self.resolution_x = 1920
+        self.resolution_y = 1080
+        self.resolution_percentage = 100
+        self.pixel_aspect_x = 1.0
+        self.pixel_aspect_y = 1.0
+        self.engine = 'BLENDER_EEVEE'
+        self.dither_intensity = 1.0
+        self.film_transparent = False
+        self.filter_size = 1.5
+
+
+class FakeShading:
+    def __init__(self):
+        self.light = 'STUDIO'
+        self.color_type = 'MATERIAL'
+        self.show_shadows = False
+        self.show_cavity = False
+        self.show_specular_highlight = True
+        self.show_object_outline = False
+        self.show_xray = False
+
+
+class FakeDisplay:
+    def __init__(self):
+        self.shading = FakeShading()
+        self.render_aa = '8'
+
+
+class FakeViewSettings:
+    def __init__(self):
+        self.view_transform = 'Filmic'
+        self.look = 'None'
+        self.exposure = 0.0
+        self.gamma = 1.0
+
+
+class FakeCyclesSettings:
+    def __init__(self):
+        self.device = 'CPU'
+        self.samples = 128
+        self.use_denoising = True
+        self.max_bounces = 12
+        self.diffuse_bounces = 4
+        self.glossy_bounces = 4
+        self.transmission_bounces = 12
+        self.volume_bounces = 0
+        self.transparent_max_bounces = 8
+
+
+class FakeSceneViewLayer:
+    """A view layer of a scene (``scene.view_layers``), with only its render pass settings."""
+
+    def __init__(self, name='ViewLayer'):
+        self.name = name
+        self.use_pass_object_index = False
+
+
+class FakeWorld:
+    def __init__(self, name='World'):
+        self.name = name
+        self.color = (0.05, 0.05, 0.05)
+
+
+class FakeFileSlot:
+    def __init__(self, path=''):
+        self.path = path
+
+
+class FakePixels:
+    """The flat, bottom-to-top RGBA float pixel buffer of an image (``Image.pixels``)."""
+
+    def __init__(self, size):
+        self._data = np.zeros(size, dtype=np.float32)
+
+    def foreach_get(self, seq):
+        seq[:] = self._data
+
+    def foreach_set(self, seq):
+        self._data[:] = seq
+
+    def __len__(self):
+        return len(self._data)
+
+
+class FakeImage:
+    """An image data-block (``bpy.types.Image``), e.g. the 'Viewer Node' image that the compositor writes to."""
+
+    def __init__(self, name, width=1920, height=1080, channels=4):
+        self.name = name
+        self.size = (width, height)
+        self.channels = channels
+        self.pixels = FakePixels(width * height * channels)
+
+
+class FakeNodeSocket:
+    def __init__(self, node, name):
+        self.node = node
+        self.name = name
+
+
+class FakeNodeSockets(dict):
+    """The inputs or outputs of a node. Sockets are created when they are first accessed, whatever their name."""
+
+    def __init__(self, node):
+        super().__init__()
+        self._node = node
+
+    def __missing__(self, name):
+        socket = self[name] = FakeNodeSocket(self._node, name)
+        return socket
+
+
+class FakeNode:
+    def __init__(self, name, type):
+        self.name = name
+        self.type = type
+        self.base_path = ''
+        self.file_slots = [FakeFileSlot()]
+        self.mute = False
+        self.inputs = FakeNodeSockets(self)
+        self.outputs = FakeNodeSockets(self)
+
+
+class FakeNodes(FakeIDCollection):
+    """The nodes of a node tree. Like Blender, ``new`` takes a node type name (e.g. 'CompositorNodeViewer') and gives
+    the node its default name, but ``new(name, type)`` can also be used to name the node."""
+
+    # node type name -> (default name, type)
+    TYPES = {
+        'CompositorNodeRLayers': ('Render Layers', 'R_LAYERS'),
+        'CompositorNodeViewer': ('Viewer', 'VIEWER'),
+        'CompositorNodeComposite': ('Composite', 'COMPOSITE'),
+        'CompositorNodeOutputFile': ('File Output', 'OUTPUT_FILE'),
+    }
+
+    def __init__(self):
+        super().__init__(FakeNode)
+
+    def new(self, name, type=None):
+        if type is None:
+            name, type = self.TYPES[name]
+        return super().new(name, type)
+
+
+class FakeNodeLink:
+    def __init__(self, from_socket, to_socket):
+        self.from_socket = from_socket
+        self.to_socket = to_socket
+        self.from_node = from_socket.node
+        self.to_node = to_socket.node
+
+
+class FakeNodeLinks(list):
+    def new(self, from_socket, to_socket):
+        # an input can only have one link
+        self[:] = [link for link in self if link.to_socket is not to_socket]
+        link = FakeNodeLink(from_socket, to_socket)
+        self.append(link)
+        return link
+
+
+class FakeNodeTree:
+    def __init__(self):
+        self.nodes = FakeNodes()
+        self.links = FakeNodeLinks()
+
+
+class FakeScene:
+    def __init__(self, name):
+        self.name = name
+        self.render = FakeRenderSettings()
+        self.frame_start = 1
+        self.frame_end = 250
+        self.frame_current = 1
+        self.use_nodes = False
+        self.node_tree = FakeNodeTree()
+        self.display = FakeDisplay()
+        self.view_settings = FakeViewSettings()
+        self.cycles = FakeCyclesSettings()
+        self.view_layers = [FakeSceneViewLayer()]
+        self.world = FakeWorld()
+        self.collection = FakeCollection()
+
+    @property
+    def objects(self):
+        """The objects in the scene."""
+        return list(self.collection.objects)
+
+
+class FakeCamera:
+    """Camera data (``bpy.types.Camera``), with Blender's default lens and sensor."""
+
+    def __init__(self, name='Camera'):
+        self.name = name
+        self.type = 'PERSP'
+        self.lens = 50.0
+        self.sensor_width = 36.0
+        self.sensor_height = 24.0
+        self.sensor_fit = 'AUTO'
+        self.shift_x = 0.0
+        self.shift_y = 0.0
+        self.ortho_scale = 6.0
+        self.clip_start = 0.1
+        self.clip_end = 1000.0
+
+    def view_frame(self, scene=None):
+        """Returns the 4 corners of the camera frame in camera space, following ``BKE_camera_view_frame``."""
+        asp_x, asp_y = 1.0, 1.0
+        if scene is not None:
+            aspx = scene.render.resolution_x * scene.render.pixel_aspect_x
+            aspy = scene.render.resolution_y * scene.render.pixel_aspect_y
+            sensor_fit = self.sensor_fit
+            if sensor_fit == 'AUTO':
+                sensor_fit = 'HORIZONTAL' if aspx >= aspy else 'VERTICAL'
+            if sensor_fit == 'HORIZONTAL':
+                asp_y = aspy / aspx
+            else:
+                asp_x = aspx / aspy
+
+        if self.type == 'ORTHO':
+            fac_x = 0.5 * self.ortho_scale * asp_x
+            fac_y = 0.5 * self.ortho_scale * asp_y
+            shift_x = self.shift_x * self.ortho_scale
+            shift_y = self.shift_y * self.ortho_scale
+            depth = -1.0
+        else:
+            half_sensor = 0.5 * (self.sensor_height if self.sensor_fit == 'VERTICAL' else self.sensor_width)
+            draw_size = 0.5
+            depth = draw_size * self.lens / -half_sensor
+            fac_x = draw_size * asp_x
+            fac_y = draw_size * asp_y
+            shift_x = self.shift_x * draw_size * 2
+            shift_y = self.shift_y * draw_size * 2
+
+        return (
+            Vector((shift_x + fac_x, shift_y + fac_y, depth)),
+            Vector((shift_x + fac_x, shift_y - fac_y, depth)),
+            Vector((shift_x - fac_x, shift_y - fac_y, depth)),
+            Vector((shift_x - fac_x, shift_y + fac_y, depth)),
+        )
+
+
+class FakeLight:
+    def __init__(self, name='Light', type='SUN'):
+        self.name = name
+        self.type = type
+        self.energy = 1.0
+
+
+class FakeVertex:
+    def __init__(self, co):
+        self.co = Vector(co)
+
+
+class FakeMeshVertices(list):
+    def foreach_get(self, attr, seq):
+        seq[:] = np.array([tuple(getattr(v, attr)) for v in self], dtype=np.float64).reshape(-1)
+
+
+class FakePolygon:
+    def __init__(self, vertices):
+        self.vertices = tuple(vertices)
+
+
+class FakeMesh:
+    """Mesh data (``bpy.types.Mesh``) made of vertices and polygons."""
+
+    def __init__(self, name='Mesh'):
+        self.name = name
+        self.vertices = FakeMeshVertices()
+        self.polygons = []
+
+    def from_pydata(self, vertices, edges, faces):
+        self.vertices = FakeMeshVertices(FakeVertex(v) for v in vertices)
+        self.polygons = [FakePolygon(f) for f in faces]
+
+    @classmethod
+    def cube(cls, size=2.0, name='Cube'):
+        """Creates an axis-aligned cube centered on the origin, like Blender's default cube."""
+        h = size / 2
+        vertices = [(x, y, z) for x in (-h, h) for y in (-h, h) for z in (-h, h)]
+        faces = [(0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1), (2, 3, 7, 6), (0, 2, 6, 4), (1, 5, 7, 3)]
+        mesh = cls(name)
+        mesh.from_pydata(vertices, [], faces)
+        return mesh
+
+    def _triangles(self):
+        """Returns an array of shape (n, 3, 3) containing the mesh's polygons, fan-triangulated."""
+        co = np.array([v.co for v in self.vertices], dtype=np.float64)
+        triangles = [(p.vertices[0], a, b) for p in self.polygons for a, b in zip(p.vertices[1:], p.vertices[2:])]
+        return co[np.array(triangles, dtype=np.int64).reshape(-1, 3)]
+
+
+class FakeBMesh:
+    """The subset of ``bmesh.types.BMesh`` used to compute mesh volumes."""
+
+    def __init__(self):
+        self._mesh = None
+
+    def from_mesh(self, mesh):
+        self._mesh = mesh
+
+    def calc_volume(self, signed=False):
+        # divergence theorem: sum of signed volumes of tetrahedra formed by each triangle and the origin
+        t = self._mesh._triangles()
+        volume = np.einsum('ij,ij->i', t[:, 0], np.cross(t[:, 1], t[:, 2])).sum() / 6
+        return float(volume if signed else abs(volume))
+
+    def free(self):
+        self._mesh = None
+
+
+class FakeBVHTree:
+    """The subset of ``mathutils.bvhtree.BVHTree`` used for ray casting. Rays are tested against every triangle at
+    once instead of using an actual bounding volume hierarchy."""
+
+    def __init__(self, triangles):
+        self._triangles = triangles
+
+    @classmethod
+    def FromPolygons(cls, vertices, polygons, all_triangles=False, epsilon=0.0):
+        co = np.array(vertices, dtype=np.float64).reshape(-1, 3)
+        triangles = [(p[0], a, b) for p in polygons for a, b in zip(p[1:], p[2:])]
+        return cls(co[np.array(triangles, dtype=np.int64).reshape(-1, 3)])
+
+    def ray_cast(self, origin, direction, distance=float('inf')):
+        """Returns (location, normal, index, distance) of the closest hit, or all None if there is no hit."""
+        # Moller-Trumbore intersection against all triangles
+        origin = np.array(origin, dtype=np.float64)
+        direction = np.array(direction, dtype=np.float64)
+        direction /= np.linalg.norm(direction)
+        v0, e1, e2 = self._triangles[:, 0], self._triangles[:, 1] - self._triangles[:, 0], \
+            self._triangles[:, 2] - self._triangles[:, 0]
+        p = np.cross(direction, e2)
+        det = np.einsum('ij,ij->i', e1, p)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            inv = 1 / det
+            s = origin - v0
+            u = np.einsum('ij,ij->i', s, p) * inv
+            q = np.cross(s, e1)
+            v = (q @ direction) * inv
+            t = np.einsum('ij,ij->i', e2, q) * inv
+            hit = (np.abs(det) > 1e-12) & (u >= 0) & (v >= 0) & (u + v <= 1) & (t >= 0) & (t <= distance)
+        if not np.any(hit):
+            return None, None, None, None
+        index = int(np.flatnonzero(hit)[np.argmin(t[hit])])
+        normal = Vector(np.cross(e1[index], e2[index])).normalized()
+        return Vector(origin + t[index] * direction), normal, index, float(t[index])
+
+
+class FakeParticle:
+    def __init__(self, location):
+        self.location = Vector(location)
+
+
+class FakeParticleSettings:
+    # the emit_from modes that the fake particle system can distribute particles for ('VOLUME' is not supported)
+    EMIT_FROM = ('VERT', 'FACE')
+
+    def __init__(self):
+        self.count = 1000
+        self.emit_from = 'FACE'
+        self.distribution = 'JIT'
+        self.use_even_distribution = True
+
+    @property
+    def emit_from(self):
+        return self._emit_from
+
+    @emit_from.setter
+    def emit_from(self, value):
+        if value not in self.EMIT_FROM:
+            raise ValueError(f'Unsupported emit_from {value!r}, must be one of {self.EMIT_FROM}')
+        self._emit_from = value
+
+
+class FakeParticleSystem:
+    """A particle system that emits particles uniformly at random from the faces (or the vertices) of its object's
+    mesh. The same seed always produces the same particles."""
+
+    def __init__(self, obj):
+        self._obj = obj
+        self.seed = 0
+        self.settings = FakeParticleSettings()
+        self.particles = {}
+
+    def _distribute(self):
+        rng = np.random.default_rng(self.seed)
+        n = self.settings.count
+        if self.settings.emit_from == 'VERT':
+            vertices = np.array([v.co for v in self._obj.data.vertices], dtype=np.float64)
+            local = vertices[rng.integers(len(vertices), size=n)]
+        else:
+            triangles = self._obj.data._triangles()
+            areas = np.linalg.norm(np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0]),
+                                   axis=1)
+            chosen = triangles[rng.choice(len(triangles), n, p=areas / areas.sum())]
+            # uniform barycentric coordinates
+            u, v = rng.random((2, n, 1))
+            flip = (u + v) > 1
+            u, v = np.where(flip, 1 - u, u), np.where(flip, 1 - v, v)
+            local = chosen[:, 0] + u * (chosen[:, 1] - chosen[:, 0]) + v * (chosen[:, 2] - chosen[:, 0])
+        matrix = self._obj.matrix_world
+        self.particles = {i: FakeParticle(matrix @ Vector(p)) for i, p in enumerate(local)}
+
+
+class FakeModifier:
+    def __init__(self, name, type, obj):
+        self.name = name
+        self.type = type
+        self.particle_system = FakeParticleSystem(obj) if type == 'PARTICLE_SYSTEM' else None
+
+
+class FakeModifiers(list):
+    def __init__(self, obj):
+        super().__init__()
+        self._obj = obj
+
+    def new(self, name, type):
+        modifier = FakeModifier(name, type, self._obj)
+        self.append(modifier)
+        if modifier.particle_system is not None:
+            self._obj.particle_systems.append(modifier.particle_system)
+        return modifier
+
+    def remove(self, modifier):
+        super().remove(modifier)
+        if modifier.particle_system is not None:
+            self._obj.particle_systems.remove(modifier.particle_system)
+
+
+class FakeAnimationData:
+    def __init__(self):
+        self.keyframes = {}
+        """A dictionary mapping data paths to dictionaries mapping frame numbers to keyframed values."""
+
+
+class FakeObject:
+    """An object (``bpy.types.Object``) with a transform, data, modifiers, and keyframes.
+
+    As in Blender, ``matrix_world`` is only recomputed from the location, rotation, and scale when it is assigned to
+    directly or when the view layer is updated.
+    """
+
+    def __init__(self, name, data=None):
+        self.name = name
+        self.data = data
+        self.rotation_mode = 'XYZ'
+        self._location = Vector((0, 0, 0))
+        self._rotation_quaternion = Quaternion()
+        self._rotation_euler = Euler((0, 0, 0))
+        self._scale = Vector((1, 1, 1))
+        self._matrix_world = Matrix.Identity(4)
+        self.modifiers = FakeModifiers(self)
+        self.particle_systems = []
+        self.animation_data = None
+        self.color = (1.0, 1.0, 1.0, 1.0)
+        self.pass_index = 0
+
+    @property
+    def type(self):
+        if isinstance(self.data, FakeMesh):
+            return 'MESH'
+        if isinstance(self.data, FakeCamera):
+            return 'CAMERA'
+        if isinstance(self.data, FakeLight):
+            return 'LIGHT'
+        return 'EMPTY'
+
+    @property
+    def location(self):
+        return self._location
+
+    @location.setter
+    def location(self, value):
+        self._location = Vector(value)
+
+    @property
+    def rotation_quaternion(self):
+        return self._rotation_quaternion
+
+    @rotation_quaternion.setter
+    def rotation_quaternion(self, value):
+        self._rotation_quaternion = Quaternion(value)
+
+    @property
+    def rotation_euler(self):
+        return self._rotation_euler
+
+    @rotation_euler.setter
+    def rotation_euler(self, value):
+        self._rotation_euler = Euler(value)
+
+    @property
+    def scale(self):
+        return self._scale
+
+    @scale.setter
+    def scale(self, value):
+        self._scale = Vector(value)
+
+    @property
+    def matrix_basis(self):
+        if self.rotation_mode == 'QUATERNION':
+            rotation = self._rotation_quaternion.normalized().to_matrix()
+        else:
+            rotation = Euler(self._rotation_euler, self.rotation_mode).to_matrix()
+        scale = Matrix.Diagonal(self._scale)
+        return Matrix.Translation(self._location) @ (rotation @ scale).to_4x4()
+
+    @property
+    def matrix_world(self):
+        return self._matrix_world
+
+    @matrix_world.setter
+    def matrix_world(self, value):
+        self._matrix_world = Matrix(value)
+
+    @property
+    def bound_box(self):
+        """The 8 corners of the object's bounding box in object space, in Blender's order."""
+        if not isinstance(self.data, FakeMesh) or not self.data.vertices:
+            return [(0.0, 0.0, 0.0)] * 8
+        co = np.array([v.co for v in self.data.vertices])
+        (x0, y0, z0), (x1, y1, z1) = co.min(axis=0), co.max(axis=0)
+        return [(x0, y0, z0), (x0, y0, z1), (x0, y1, z1), (x0, y1, z0),
+                (x1, y0, z0), (x1, y0, z1), (x1, y1, z1), (x1, y1, z0)]
+
+    def keyframe_insert(self, data_path, index=-1, frame=None):
+        if self.animation_data is None:
+            self.animation_data = FakeAnimationData()
+        value = getattr(self, data_path)
+        self.animation_data.keyframes.setdefault(data_path, {})[frame] = tuple(value)
+        return True
+
+    def animation_data_clear(self):
+        self.animation_data = None
+
+    def evaluated_get(self, depsgraph):
+        return self
+
+
+class FakeCollectionObjects:
+    def __init__(self):
+        self._objects = []
+
+    def link(self, obj):
+        if obj in self._objects:
+            raise RuntimeError(f"Object '{obj.name}' already in collection")
+        self._objects.append(obj)
+
+    def unlink(self, obj):
+        if obj not in self._objects:
+            raise RuntimeError(f"Object '{obj.name}' not in collection")
+        self._objects.remove(obj)
+
+    def __contains__(self, obj):
+        return obj in self._objects
+
+    def __iter__(self):
+        return iter(list(self._objects))
+
+
+class FakeCollection:
+    def __init__(self):
+        self.objects = FakeCollectionObjects()
+
+
+class FakeDepsgraphObjects:
+    def __init__(self, data):
+        self._data = data
+
+    def get(self, name, default=None):
+        return self._data.objects.get(name, default)
+
+
+class FakeDepsgraph:
+    def __init__(self, data):
+        self.objects = FakeDepsgraphObjects(data)
+
+
+class FakeViewLayer:
+    def __init__(self, data):
+        self._data = data
+
+    def update(self):
+        """Recomputes world matrices and redistributes particles, like a depsgraph evaluation."""
+        for obj in self._data.objects:
+            obj.matrix_world = obj.matrix_basis
+            for psys in obj.particle_systems:
+                psys._distribute()
+
+
+class FakeRenderOps:
+    def __init__(self):
+        self.calls = []
+        """The keyword arguments of each call to `render`, in order."""
+
+    def render(self, **kwargs):
+        self.calls.append(kwargs)
+        return {'FINISHED'}
+
+
+def world_to_camera_view(scene, obj, coord):
+    """Same as ``bpy_extras.object_utils.world_to_camera_view``."""
+    co_local = obj.matrix_world.normalized().inverted() @ coord
+    z = -co_local.z
+
+    camera = obj.data
+    frame = [v for v in camera.view_frame(scene=scene)[:3]]
+    if camera.type != 'ORTHO':
+        if z == 0.0:
+            return Vector((0.5, 0.5, 0.0))
+        else:
+            frame = [-(v / (v.z / z)) for v in frame]
+
+    min_x, max_x = frame[2].x, frame[1].x
+    min_y, max_y = frame[1].y, frame[0].y
+
+    x = (co_local.x - min_x) / (max_x - min_x)
+    y = (co_local.y - min_y) / (max_y - min_y)
+
+    return Vector((x, y, z))
+
+
+def _make_modules():
+    bpy = types.ModuleType('bpy')
+    bpy.data = types.SimpleNamespace(
+        objects=FakeIDCollection(FakeObject),
+        scenes=FakeIDCollection(FakeScene),
+        meshes=FakeIDCollection(FakeMesh),
+        cameras=FakeIDCollection(FakeCamera),
+        lights=FakeIDCollection(FakeLight),
+        images=FakeIDCollection(FakeImage),
+    )
+    # creating an object from existing data also registers the data, like in Blender
+    create_object = bpy.data.objects._factory
+
+    def new_object(name, object_data=None):
+        if isinstance(object_data, FakeMesh) and object_data.name not in bpy.data.meshes:
+            bpy.data.meshes.add(object_data)
+        return create_object(name, object_data)
+
+    bpy.data.objects._factory = new_object
+    collection = FakeCollection()
+    bpy.context = types.SimpleNamespace(
+        collection=collection,
+        scene=None,
+        view_layer=FakeViewLayer(bpy.data),
+        evaluated_depsgraph_get=lambda: FakeDepsgraph(bpy.data),
+    )
+    bpy.ops = types.SimpleNamespace(render=FakeRenderOps())
+
+    bpy_extras = types.ModuleType('bpy_extras')
+    object_utils = types.ModuleType('bpy_extras.object_utils')
+    object_utils.world_to_camera_view = world_to_camera_view
+    bpy_extras.object_utils = object_utils
+
+    bmesh = types.ModuleType('bmesh')
+    bmesh.new = FakeBMesh
+
+    modules = {'bpy': bpy, 'bpy_extras': bpy_extras, 'bpy_extras.object_utils': object_utils, 'bmesh': bmesh}
+    try:
+        import mathutils.bvhtree  # noqa: F401
+    except ImportError:
+        # the standalone mathutils package does not include bvhtree
+        bvhtree = types.ModuleType('mathutils.bvhtree')
+        bvhtree.BVHTree = FakeBVHTree
+        modules['mathutils.bvhtree'] = bvhtree
+    return modules
+
+
+@contextlib.contextmanager
+def fake_blender():
+    """Context manager that installs fresh fake ``bpy``, ``bpy_extras``, and ``bmesh`` modules (and
+    ``mathutils.bvhtree``, if it is missing) into ``sys.modules``, and restores the previous modules (if any) on exit.
+
+    :returns: the fake ``bpy`` module
+    """
+    modules = _make_modules()
+    previous = {name: sys.modules.get(name) for name in modules}
+    sys.modules.update(modules)
+    try:
+        yield modules['bpy']
+    finally:
+        for name, module in previous.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+
+
+def make_scene(bpy, resolution=(1920, 1080)):
+    """Creates a scene containing a cube, a camera, and a sun lamp.
+
+    :param bpy: the fake ``bpy`` module returned by `fake_blender`
+    :param resolution: (seq of int, len 2): the (x, y) render resolution of the scene (default: (1920, 1080))
+
+    :returns: a tuple of the form (scene, obj, camera, sun), the same as the arguments to `Frame.setup
+        <starfish.Frame.setup>`
+    """
+    scene = bpy.data.scenes.new('Scene')
+    scene.render.resolution_x, scene.render.resolution_y = resolution
+    obj = bpy.data.objects.new('Cube', FakeMesh.cube())
+    camera = bpy.data.objects.new('Camera', bpy.data.cameras.new('Camera'))
+    sun = bpy.data.objects.new('Sun', bpy.data.lights.new('Sun', 'SUN'))
+    for o in (obj, camera, sun):
+        scene.collection.objects.link(o)
+    return scene, obj, camera, sun
@@ -1,13 +1,132 @@
+import itertools
 import json
 
 import numpy as np
 from mathutils import Quaternion, Vector
 
+from .profiling import profiled
+
 
 def to_quat(x):
     return x if type(x) is Quaternion else x.to_quaternion()
 
 
+def _as_column(array):
+    """Converts a 1D sequence into a numpy array, keeping numeric dtypes. Anything that isn't a 1D sequence of numbers
+    (e.g. a list of vectors or rotations) becomes an object array of the original items."""
+    try:
+        column = np.asarray(array)
+        if column.ndim == 1 and column.dtype.kind in 'biufc':
+            return column
+    except (ValueError, TypeError):
+        pass
+    # must do it this way to prevent numpy from turning any iterable into an np.array
+    column = np.empty(len(array), dtype=object)
+    for j in range(len(array)):
+        column[j] = array[j]
+    return column
+
+
+class CartesianProduct:
+    """The cartesian product of multiple 1D sequences, without computing it up front.
+
+    The product is ordered the same way as `cartesian`: the last sequence varies the fastest. It can be indexed and
+    sliced without computing the rest of the product, iterated over item by item, or computed in chunks, so even
+    products that are far too large to hold in memory can be enumerated and split up::
+
+        product = CartesianProduct(np.linspace(10, 50, 1000), np.linspace(0, 1, 1000), np.arange(1000))
+        len(product)            # 1000000000
+        product[123456789]      # the values at a single index, as a tuple
+        product[:10]            # the first 10 rows, as a (10, 3) float64 array
+        for chunk in product.chunks(1000000):
+            ...
+
+    Attributes:
+
+    * arrays: The sequences, as given.
+    * shape: The length of each sequence.
+    * dtype: The dtype of the arrays of values that are returned: the common dtype of the sequences if they are all
+      1D sequences of numbers, and object otherwise.
+    """
+
+    def __init__(self, *arrays):
+        self.arrays = arrays
+        self._columns = [_as_column(array) for array in arrays]
+        self.shape = tuple(len(column) for column in self._columns)
+        if all(column.dtype != object for column in self._columns):
+            self.dtype = np.result_type(*self._columns) if self._columns else np.dtype(np.float64)
+        else:
+            self.dtype = np.dtype(object)
+
+    def indices(self, start=0, stop=None):
+        """Returns the index into each sequence of every item in a range of the product.
+
+        :param start: (int): the first item of the range (default: 0)
+        :param stop: (int): one past the last item of the range (default: the length of the product)
+
+        :returns: int64 array of shape (stop - start, len(arrays))
+        """
+        start, stop, _ = slice(start, stop).indices(len(self))
+        flat = np.arange(start, max(start, stop), dtype=np.int64)
+        return self._unravel(flat)
+
+    def _unravel(self, flat):
+        result = np.empty((len(flat), len(self.shape)), dtype=np.int64)
+        if len(flat) and all(self.shape):
+            for j, index in enumerate(np.unravel_index(flat, self.shape)):
+                result[:, j] = index
+        return result
+
+    def values(self, start=0, stop=None):
+        """Returns the items in a range of the product.
+
+        :param start: (int): the first item of the range (default: 0)
+        :param stop: (int): one past the last item of the range (default: the length of the product)
+
+        :returns: array of shape (stop - start, len(arrays)) with dtype `dtype`
+        """
+        return self._take(self.indices(start, stop))
+
+    def _take(self, indices):
+        result = np.empty(indices.shape, dtype=self.dtype)
+        for j, column in enumerate(self._columns):
+            result[:, j] = column[indices[:, j]]
+        return result
+
+    def chunks(self, size, indices=False):
+        """Yields the product in consecutive chunks.
+
+        :param size: (int): the number of items in each chunk (the last chunk may be smaller)
+        :param indices: (bool): if True, yield indices into the sequences (see `indices`) instead of values
+            (default: False)
+
+        :returns: a generator of arrays of shape (size, len(arrays))
+        """
+        if size < 1:
+            raise ValueError('size must be at least 1')
+        for start in range(0, len(self), size):
+            yield self.indices(start, start + size) if indices else self.values(start, start + size)
+
+    def __len__(self):
+        return int(np.prod(self.shape, dtype=object))
+
+    def __getitem__(self, index):
+        """An integer index returns a tuple of the original items; a slice or an array of indices returns an array of
+        values, like `values`."""
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            return self._take(self._unravel(np.arange(start, stop, step, dtype=np.int64)))
+        if isinstance(index, (int, np.integer)):
+            n = len(self)
+            if not -n <= index < n:
+                raise IndexError('CartesianProduct index out of range')
+            return tuple(array[i] for array, i in zip(self.arrays, self._unravel(np.array([index % n]))[0]))
+        return self._take(self._unravel(np.asarray(index, dtype=np.int64) % max(len(self), 1)))
+
+    def __iter__(self):
+        return itertools.product(*self.arrays)
+
+
 def cartesian(*arrays):
     """Returns the cartesian product of multiple 1D arrays.
     For example, ``cartesian([0], [1, 2], [3, 4, 5])`` returns::
@@ -19,30 +138,27 @@ def cartesian(*arrays):
                [0, 2, 4],
                [0, 2, 5]])
 
-    Works with arbitrary objects.
+    Works with arbitrary objects. If every array is a 1D sequence of numbers, the result has their common numeric dtype;
+    otherwise, it is an object array. To enumerate large products lazily or in chunks, use `CartesianProduct`.
     """
-    # must do it this way to prevent numpy from turning any iterable into an np.array
-    cleaned = np.empty(len(arrays), dtype=object)
-    for i, array in enumerate(arrays):
-        subcleaned = np.empty(len(array), dtype=object)
-        for j in range(len(array)):
-            subcleaned[j] = array[j]
-        cleaned[i] = subcleaned
-    return np.stack(np.meshgrid(*cleaned), -1).reshape(-1, len(arrays))
+    return CartesianProduct(*arrays).values()
 
 
-def random_rotations(n):
+def random_rotations(n, seed=None):
     """Generates n rotations sampled uniformly from the group of all 3D rotations, SO(3).
 
     :param n: (int): number of rotations to generate
+    :param seed: (int, numpy.random.SeedSequence, or numpy.random.Generator): the seed of the random rotations. If
+        None, numpy's global random state is used. (default: None)
 
     :returns: List of `mathutils.Quaternion` objects.
     """
-    wxyz = [np.random.normal(size=n) for _ in range(4)]
-    return [Quaternion(t).normalized() for t in zip(*wxyz)]
+    from .rotations import QuaternionArray
+    rng = np.random if seed is None else np.random.default_rng(seed)
+    return QuaternionArray(rng.normal(size=(4, n)).T).normalized().to_list()
 
 
-def uniform_sphere(n, random=None):
+def uniform_sphere(n, random=None, seed=None):
     """
     Generates n points on the surface of a sphere that are "evenly spaced" using the golden spiral method. Based on
     https://stackoverflow.com/a/44164075.
@@ -50,17 +166,22 @@ def uniform_sphere(n, random=None):
     :param n: (int): number of points to generate over the surface of the sphere
     :param random: (int): if None, return all generated points. Otherwise, randomly sample this many points from the
         generated ones (default: None)
+    :param seed: (int, numpy.random.SeedSequence, or numpy.random.Generator): the seed of the random sample. If None,
+        numpy's global random state is used. (default: None)
 
     :returns: A tuple of the form (theta, phi), where theta and phi are each numpy arrays of length n. theta is the
         azimuthal angle, and phi is the polar angle.
     """
-    indices = np.arange(0, n, dtype=np.float) + 0.5  # excludes start and endpoints while evenly spacing in between
+    indices = np.arange(0, n, dtype=float) + 0.5  # excludes start and endpoints while evenly spacing in between
     phi = np.arccos(2 * indices / n - 1)  # uniformly spaced along longitude lines
     theta = np.pi * (1 + 5 ** 0.5) * indices % (2 * np.pi)  # golden spiral down sphere
     if random is None:
         return theta, phi
     else:
-        return np.random.choice(theta, random), np.random.choice(theta, random)
+        rng = np.random if seed is None else np.random.default_rng(seed)
+        # sample whole points, so that each theta stays with its phi
+        chosen = rng.choice(n, random)
+        return theta[chosen], phi[chosen]
 
 
 def _recursive_jsonify(value):
@@ -82,6 +203,7 @@ def _recursive_jsonify(value):
         return value
 
 
+@profiled('jsonify')
 def jsonify(obj):
     """Serializes an object's attributes into a JSON string with support for mathutils objects.
 
@@ -0,0 +1,160 @@
+"""
+This module finds frames that would render useless pictures, before anything is rendered.
+
+Some combinations of parameters, especially in large `Sequence.exhaustive <starfish.Sequence.exhaustive>` sequences,
+put the object completely outside of the picture (an extreme offset at a small distance), put the camera inside the
+object, or light the object from directly behind so that all the camera sees is its unlit side. `find_degenerate`
+predicts all of these for every frame at once from the object's bounding box and the camera's view frame, using the same
+geometry as `Frame.setup <starfish.Frame.setup>`, and `prefilter` drops (or flags) them and reports how much render time
+that saves::
+
+    view = camera.data.view_frame(scene=scene)
+    sequence, report = prefilter(sequence, object_bounds(obj), view, cost=10)
+    print(f"skipping {report['degenerate']} frames saves {report['render_hours_saved']:.1f} hours")
+"""
+
+import numpy as np
+from mathutils import Euler
+
+from .profiling import profiled
+from .rotations import QuaternionArray
+from .statistics import frame_arrays
+
+# the reasons that a frame can be degenerate, in the order that they are reported in
+REASONS = ('out_of_frame', 'camera_inside', 'backlit')
+# Frame.setup turns the object by 180 degrees about X relative to the camera, so that the identity pose faces it
+_FLIP = tuple(Euler((np.pi, 0, 0)).to_quaternion())
+
+
+def object_bounds(obj):
+    """Returns the corners of an object's bounding box in its local coordinate system, including its scale.
+
+    :param obj: (BlendDataObject): the object
+
+    :returns: numpy array of shape (8, 3)
+    """
+    return np.array([tuple(corner) for corner in obj.bound_box], dtype=np.float64) * np.array(obj.scale)
+
+
+def _camera_geometry(arrays, view):
+    """Computes the object's center, its rotation, and the direction of the light, all in the camera's coordinate
+    system, for every frame."""
+    view = np.asarray(view, dtype=np.float64)
+    distance = arrays['distance']
+    y_frac, x_frac = arrays['offset'].T
+    # the same angle offsets as Frame.setup
+    x_angle = np.arctan2((x_frac - 0.5) * 2 * view[0, 0], -view[0, 2])
+    y_angle = np.arctan2((y_frac - 0.5) * 2 * view[0, 1], -view[0, 2])
+    offset = QuaternionArray.from_euler(np.column_stack((y_angle, x_angle, np.zeros(len(distance)))))
+    # the camera looks along its -Z axis, and the offset turns the camera away from the object
+    center = offset.inverted().rotate((0, 0, -1)) * distance[:, None]
+    rotation = QuaternionArray(_FLIP) @ QuaternionArray(arrays['pose'])
+    # a sun lamp shines along its -Z axis
+    light = QuaternionArray(arrays['lighting']).rotate((0, 0, -1))
+    return center, rotation, light
+
+
+@profiled('find_degenerate')
+def find_degenerate(sequence, bounds, view, min_visible=0.0, max_lighting_angle=np.radians(150)):
+    """Predicts which frames of a sequence will render degenerate pictures.
+
+    A frame is flagged as:
+
+    * 'out_of_frame' if no more than ``min_visible`` of the area of the object's projected bounding box lies inside the
+      picture. Bounding boxes that are partly behind the camera are never flagged, since their projection is unbounded.
+    * 'camera_inside' if the camera is inside the object's bounding box.
+    * 'backlit' if the angle between the direction that the light travels and the direction from the camera to the
+      object is more than ``max_lighting_angle``, i.e. the light comes from behind the object towards the camera.
+
+    :param sequence: (seq): a `Sequence <starfish.Sequence>` or list of frames
+    :param bounds: (array-like): points of shape (k, 3) that enclose the object, in its local coordinate system, e.g.
+        from `object_bounds`
+    :param view: (array-like): the 4 corners of the camera's view frame, as returned by
+        ``camera.data.view_frame(scene=scene)``
+    :param min_visible: (float): the fraction of the projected bounding box that must be inside the picture
+        (default: 0, i.e. only frames where the object is completely out of the picture are flagged)
+    :param max_lighting_angle: (float): the angle, in radians, above which a frame counts as lit from behind
+        (default: 150 degrees)
+
+    :returns: a dictionary mapping each of the `REASONS` to a numpy boolean array with one entry per frame
+    """
+    bounds = np.asarray(bounds, dtype=np.float64).reshape(-1, 3)
+    if not len(bounds):
+        raise ValueError('At least one bounding point is required')
+    arrays = frame_arrays(sequence)
+    n = len(arrays['distance'])
+    if not n:
+        return {reason: np.zeros(0, dtype=bool) for reason in REASONS}
+    center, rotation, light = _camera_geometry(arrays, view)
+
+    # every bounding point in camera coordinates, of shape (n, k, 3)
+    points = center[:, None, :] + np.stack([rotation.rotate(point) for point in bounds], axis=1)
+    depth = -points[..., 2]
+    in_front = depth > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        projected = points[..., :2] / depth[..., None]
+    # the extent of the picture, in the same units as the projected points
+    frame = np.asarray(view, dtype=np.float64)
+    frame = frame[:, :2] / -frame[:, 2:3]
+    lo, hi = frame.min(axis=0), frame.max(axis=0)
+    box_lo, box_hi = projected.min(axis=1), projected.max(axis=1)
+    overlap = np.prod(np.clip(np.minimum(box_hi, hi) - np.maximum(box_lo, lo), 0, None), axis=1)
+    area = np.prod(box_hi - box_lo, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # a box with no area is visible if it is inside the picture at all
+        visible = np.where(area > 0, overlap / area, np.all((box_lo >= lo) & (box_hi <= hi), axis=1))
+    visible = np.where(in_front.all(axis=1), visible, np.where(in_front.any(axis=1), 1.0, 0.0))
+
+    # the camera, relative to the object's center, in the object's coordinate system
+    camera = rotation.inverted().rotate(-center)
+    inside = np.all((camera >= bounds.min(axis=0)) & (camera <= bounds.max(axis=0)), axis=1)
+
+    direction = center / np.linalg.norm(center, axis=1, keepdims=True)
+    angle = np.arccos(np.clip(np.einsum('ij,ij->i', light, direction), -1, 1))
+    return {
+        'out_of_frame': ~inside & (visible <= min_visible),
+        'camera_inside': inside,
+        'backlit': angle > max_lighting_angle,
+    }
+
+
+def _costs(frames, cost):
+    if hasattr(cost, 'predict'):
+        return np.asarray(cost.predict(frames), dtype=np.float64)
+    return np.broadcast_to(np.asarray(cost, dtype=np.float64), (len(frames),))
+
+
+def prefilter(sequence, bounds, view, cost=None, drop=True, **kwargs):
+    """Removes (or flags) the frames of a sequence that `find_degenerate` predicts will render degenerate pictures.
+
+    :param sequence: (seq): a `Sequence <starfish.Sequence>` or list of frames
+    :param bounds: (array-like): points of shape (k, 3) that enclose the object, e.g. from `object_bounds`
+    :param view: (array-like): the 4 corners of the camera's view frame, from ``camera.data.view_frame(scene=scene)``
+    :param cost: the render time of each frame, in seconds, used to report the time saved: either a single number, an
+        array with one entry per frame, or a `CostModel <starfish.scheduling.CostModel>` (default: None)
+    :param drop: (bool): if True, leave the degenerate frames out of the result. If False, keep every frame, and set
+        the ``degenerate`` attribute of each degenerate frame to the list of reasons it was flagged for (which is
+        saved along with its other metadata). (default: True)
+    :param kwargs: passed on to `find_degenerate`
+
+    :returns: a tuple of the form (sequence, report), where report is a dictionary with the total number of frames
+        ('num_frames'), the number of 'degenerate' frames, the number flagged for each of the `REASONS`, and, if
+        ``cost`` is given, the 'render_hours_saved' by not rendering the degenerate frames
+    """
+    from .core import Sequence
+
+    frames = list(sequence)
+    flags = find_degenerate(frames, bounds, view, **kwargs)
+    degenerate = np.zeros(len(frames), dtype=bool)
+    for reason in REASONS:
+        degenerate |= flags[reason]
+    report = {'num_frames': len(frames), 'degenerate': int(degenerate.sum())}
+    report.update({reason: int(flags[reason].sum()) for reason in REASONS})
+    if cost is not None:
+        report['render_hours_saved'] = float(_costs(frames, cost)[degenerate].sum() / 3600)
+
+    if drop:
+        return Sequence([frame for frame, d in zip(frames, degenerate) if not d]), report
+    for i in np.flatnonzero(degenerate):
+        frames[i].degenerate = [reason for reason in REASONS if flags[reason][i]]
+    return Sequence(frames), report
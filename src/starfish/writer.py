@@ -0,0 +1,136 @@
+"""
+This module provides a background writer for moving disk I/O (metadata JSON, mask images, etc.) off of the render
+thread, so that Blender never has to wait on the disk in between renders.
+"""
+
+import atexit
+import copy
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import numpy as np
+
+
+def _write_text(path, text):
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+def _write_image(path, image):
+    import cv2
+    if not cv2.imwrite(path, cv2.cvtColor(image, cv2.COLOR_RGB2BGR)):
+        raise IOError(f'Could not write image to {path}')
+
+
+class AsyncWriter:
+    """Writes render outputs to disk in the background using a small pool of threads.
+
+    Work is submitted through a bounded queue: once ``max_pending`` writes are waiting, `submit` blocks until one of
+    them finishes. This applies back-pressure to the render loop instead of letting memory grow without bound when the
+    disk can't keep up. Any exception raised by a background write is re-raised on the calling thread the next time
+    `submit`, `flush`, or `close` is called.
+
+    The writer should be closed when it is no longer needed, which waits for all pending writes to finish. The easiest
+    way to do this is to use it as a context manager::
+
+        with AsyncWriter() as writer:
+            for i, frame in enumerate(sequence):
+                frame.setup(...)
+                bpy.ops.render.render(...)
+                writer.write_metadata(f'meta_{i}.json', frame)
+
+    Writers that are never closed are flushed automatically when the interpreter exits.
+    """
+
+    def __init__(self, max_pending=64, num_threads=2):
+        """
+        :param max_pending: (int): the maximum number of writes that may be waiting or in progress at once before
+            `submit` blocks (default: 64)
+        :param num_threads: (int): the number of background threads to write with (default: 2)
+        """
+        if max_pending < 1:
+            raise ValueError('max_pending must be at least 1')
+        self._executor = ThreadPoolExecutor(max_workers=num_threads, thread_name_prefix='starfish-writer')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._errors = []
+        self._closed = False
+        atexit.register(self.close)
+
+    def submit(self, fn, *args, **kwargs):
+        """Schedules ``fn(*args, **kwargs)`` to be called on a background thread. Blocks if there are already
+        ``max_pending`` writes in the queue.
+
+        :returns: a `concurrent.futures.Future` representing the write
+        """
+        self._raise_errors()
+        if self._closed:
+            raise RuntimeError('Cannot submit to a closed AsyncWriter')
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def write_text(self, path, text):
+        """Writes a string to a file in the background."""
+        return self.submit(_write_text, path, text)
+
+    def write_metadata(self, path, frame):
+        """Writes the output of `Frame.dumps <starfish.Frame.dumps>` to a file in the background.
+
+        A shallow copy of the frame is taken before returning, so reassigning attributes of the frame afterwards (e.g.
+        calling `Frame.setup <starfish.Frame.setup>` again) will not affect what gets written. Serialization itself
+        also happens in the background.
+        """
+        snapshot = copy.copy(frame)
+        return self.submit(lambda: _write_text(path, snapshot.dumps()))
+
+    def write_image(self, path, image):
+        """Writes an RGB image (e.g. a normalized mask) to a file in the background. The image is copied before
+        returning, so the caller may reuse its buffer immediately."""
+        return self.submit(_write_image, path, np.array(image, copy=True))
+
+    def flush(self):
+        """Blocks until every write submitted so far has finished."""
+        with self._lock:
+            pending = list(self._pending)
+        wait(pending)
+        self._raise_errors()
+
+    def close(self):
+        """Flushes all pending writes and shuts down the background threads. Calling this more than once has no
+        effect."""
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        self._executor.shutdown(wait=True)
+        self._raise_errors()
+
+    def _done(self, future):
+        with self._lock:
+            self._pending.discard(future)
+            if not future.cancelled() and future.exception() is not None:
+                self._errors.append(future.exception())
+        self._slots.release()
+
+    def _raise_errors(self):
+        with self._lock:
+            if not self._errors:
+                return
+            error = self._errors[0]
+            self._errors.clear()
+        raise error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
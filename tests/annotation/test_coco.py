@@ -0,0 +1,121 @@
+import json
+
+import numpy as np
+import pytest
+from starfish import Frame
+from starfish.annotation import CocoWriter, decode_rle
+from starfish.annotation.keypoints import OCCLUDED, OUT_OF_FRAME, VISIBLE
+
+LABEL_MAP = {'panel': (255, 255, 255), 'body': (0, 0, 206)}
+
+
+def make_mask():
+    mask = np.zeros((100, 200, 3), dtype=np.uint8)
+    mask[10:20, 10:30] = LABEL_MAP['panel']
+    mask[50:60, 100:150] = LABEL_MAP['panel']
+    mask[30:40, 40:60] = LABEL_MAP['body']
+    return mask
+
+
+def test_json(tmp_path):
+    path = str(tmp_path / 'dataset.json')
+    mask = make_mask()
+    with CocoWriter(path, LABEL_MAP, keypoint_names=['a', 'b']) as coco:
+        for i in range(3):
+            frame = Frame(distance=10 * (i + 1))
+            assert coco.add_frame(frame, f'real_{i}.png', mask=mask, keypoints=[(0.5, 0.5), (1.5, 0.5)]) == i + 1
+        coco.add_frame(Frame(), 'empty.png', width=200, height=100)
+
+    with open(path) as f:
+        dataset = json.load(f)
+    assert [c['name'] for c in dataset['categories']] == ['panel', 'body']
+    assert dataset['categories'][0]['keypoints'] == ['a', 'b']
+    assert [image['id'] for image in dataset['images']] == [1, 2, 3, 4]
+    assert dataset['images'][1]['starfish']['distance'] == 20
+    assert dataset['images'][0]['width'] == 200 and dataset['images'][0]['height'] == 100
+
+    annotations = [a for a in dataset['annotations'] if a['image_id'] == 1]
+    assert len(dataset['annotations']) == 9
+    assert len({a['id'] for a in dataset['annotations']}) == 9
+    assert sorted(a['bbox'] for a in annotations) == [[10, 10, 20, 10], [40, 30, 20, 10], [100, 50, 50, 10]]
+    for annotation in annotations:
+        segmentation = decode_rle(annotation['segmentation'])
+        assert segmentation.sum() == annotation['area']
+        x, y, w, h = annotation['bbox']
+        assert segmentation[y:y + h, x:x + w].all()
+
+    # keypoints go to the largest panel
+    with_keypoints, = [a for a in annotations if 'keypoints' in a]
+    assert with_keypoints['bbox'] == [100, 50, 50, 10]
+    assert with_keypoints['keypoints'] == [100, 50, 2, 0, 0, 0]
+    assert with_keypoints['num_keypoints'] == 1
+
+
+def test_keypoint_visibility_flags(tmp_path):
+    path = str(tmp_path / 'dataset.jsonl')
+    with CocoWriter(path, LABEL_MAP, keypoint_names=['a', 'b', 'c']) as coco:
+        coco.add_frame(Frame(), 'real.png', mask=make_mask(), keypoints=[(0.5, 0.5), (0.1, 0.2), (0.3, 0.4)],
+                       keypoint_visibility=np.array([VISIBLE, OCCLUDED, OUT_OF_FRAME], dtype=np.int8))
+
+    with open(path) as f:
+        image = [json.loads(line) for line in f][1]
+    with_keypoints, = [a for a in image['annotations'] if 'keypoints' in a]
+    assert with_keypoints['keypoints'] == [100, 50, 2, 40, 10, 1, 0, 0, 0]
+    assert with_keypoints['num_keypoints'] == 2
+
+
+def test_keypoints_without_mask_annotation(tmp_path):
+    path = str(tmp_path / 'dataset.jsonl')
+    mask = make_mask()
+    mask[np.all(mask == LABEL_MAP['panel'], axis=2)] = 0
+    with CocoWriter(path, LABEL_MAP, keypoint_names=['a', 'b', 'c']) as coco:
+        # no mask at all
+        coco.add_frame(Frame(), 'real.png', keypoints=[(0.5, 0.5), (0.1, 0.2), (1.5, 0.5)], width=200, height=100)
+        # a mask without any panels
+        coco.add_frame(Frame(), 'real.png', mask=mask, keypoints=[(0.5, 0.5), (0.1, 0.2), (1.5, 0.5)])
+        # every keypoint is out of the frame
+        coco.add_frame(Frame(), 'real.png', keypoints=[(1.5, 0.5)] * 3, width=200, height=100)
+
+    with open(path) as f:
+        images = [json.loads(line) for line in f][1:]
+    only, = images[0]['annotations']
+    body, keypoints = images[1]['annotations']
+    assert body['category_id'] == 2 and 'keypoints' not in body
+    for annotation in (only, keypoints):
+        assert annotation['category_id'] == 1
+        assert annotation['bbox'] == [40, 10, 60, 40]
+        assert annotation['area'] == 0 and annotation['iscrowd'] == 0
+        assert annotation['keypoints'] == [100, 50, 2, 40, 10, 2, 0, 0, 0]
+        assert annotation['num_keypoints'] == 2
+    assert keypoints['id'] == body['id'] + 1
+    empty, = images[2]['annotations']
+    assert empty['bbox'] == [0, 0, 0, 0] and empty['num_keypoints'] == 0
+
+
+def test_jsonl_and_polygons(tmp_path):
+    path = str(tmp_path / 'dataset.jsonl')
+    with CocoWriter(path, LABEL_MAP, segmentation='polygon', instances=False) as coco:
+        coco.add_frame(Frame(), 'real.png', mask=make_mask())
+        coco.add_frame(Frame(), 'real.png', mask=make_mask())
+
+    with open(path) as f:
+        lines = [json.loads(line) for line in f]
+    assert len(lines) == 3
+    assert lines[0]['categories'][1]['name'] == 'body'
+    annotations = lines[1]['annotations']
+    assert [a['bbox'] for a in annotations] == [[10, 10, 140, 50], [40, 30, 20, 10]]
+    assert annotations[0]['area'] == 700
+    assert len(annotations[0]['segmentation']) == 2
+    assert sorted(annotations[1]['segmentation'][0]) == sorted([40, 30, 40, 39, 59, 39, 59, 30])
+
+
+def test_errors(tmp_path):
+    with pytest.raises(ValueError):
+        CocoWriter(str(tmp_path / 'a.json'), LABEL_MAP, segmentation='bitmap')
+    with CocoWriter(str(tmp_path / 'a.json'), LABEL_MAP) as coco:
+        with pytest.raises(ValueError):
+            coco.add_frame(Frame(), 'real.png')
+        with pytest.raises(ValueError):
+            coco.add_frame(Frame(), 'real.png', mask=make_mask(), keypoints=[(0, 0)])
+    with pytest.raises(RuntimeError):
+        coco.add_frame(Frame(), 'real.png', mask=make_mask())
@@ -0,0 +1,71 @@
+import importlib
+
+import numpy as np
+import pytest
+from starfish.annotation import generate_keypoints
+from starfish.testing import fake_blender, make_scene
+
+# the function shadows the module of the same name in starfish.annotation
+module = importlib.import_module('starfish.annotation.generate_keypoints')
+
+
+@pytest.fixture
+def obj():
+    module._cache.clear()
+    with fake_blender() as bpy:
+        yield make_scene(bpy)[1]
+    module._cache.clear()
+
+
+@pytest.fixture
+def distributed(monkeypatch):
+    """Records the number of particles distributed by each call to Blender."""
+    calls = []
+    distribute = module._distribute_particles_random
+
+    def wrapper(obj, num, seed):
+        calls.append(num)
+        return distribute(obj, num, seed)
+
+    monkeypatch.setattr(module, '_distribute_particles_random', wrapper)
+    return calls
+
+
+def min_distance(a, b):
+    return np.linalg.norm(np.array(a)[:, None] - np.array(b)[None], axis=2).min()
+
+
+def test_cache(obj, distributed):
+    keypoints = generate_keypoints(obj, 20)
+    assert generate_keypoints(obj, 20) == keypoints
+    assert distributed == [200]
+    assert generate_keypoints(obj, 20, cache=False) == keypoints
+    assert distributed == [200, 200]
+
+    # editing the mesh invalidates its cached points, even though its name is the same
+    for vertex in obj.data.vertices:
+        vertex.co *= 2
+    edited = generate_keypoints(obj, 20)
+    assert distributed == [200, 200, 200]
+    assert np.allclose(np.abs(edited).max(axis=1), 2, atol=1e-5)
+
+
+def test_existing(obj, distributed):
+    first = generate_keypoints(obj, 30)
+    keypoints = generate_keypoints(obj, 60, existing=first)
+    # only the random points for the new keypoints are distributed
+    assert distributed == [300, 300]
+    assert len(keypoints) == 60
+    assert keypoints[:30] == first
+    assert len(set(keypoints)) == 60
+    assert np.allclose(np.abs(keypoints).max(axis=1), 1, atol=1e-5)
+
+    # the new keypoints fill the gaps between the existing ones rather than crowding them
+    fresh = generate_keypoints(obj, 60, seed=5)
+    assert min_distance(keypoints[30:], first) > 0.5 * min_distance(fresh[:30], fresh[30:])
+    # the result is the same whether or not the random points were cached
+    assert generate_keypoints(obj, 60, existing=first, cache=False) == keypoints
+
+    assert generate_keypoints(obj, 30, existing=first) == first
+    with pytest.raises(ValueError):
+        generate_keypoints(obj, 20, existing=first)
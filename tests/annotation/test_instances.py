@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from starfish.annotation import decode_rle, encode_rle, get_bounding_boxes_from_mask, get_instances_from_mask
+
+
+def test_instances():
+    mask = np.zeros((1080, 1920, 3), dtype=np.uint8)
+    mask[100:200, 100:200] = (1, 2, 3)
+    mask[500:600, 1000:1100] = (1, 2, 3)
+    mask[100:200, 200:300] = (4, 5, 6)
+    # touches the first box only diagonally
+    mask[200:210, 200:210] = (1, 2, 3)
+
+    label_map = {'box1': (1, 2, 3), 'box2': (4, 5, 6), 'doesnt_exist': (1, 1, 1)}
+    instances = get_instances_from_mask(mask, label_map)
+    assert instances == {
+        'box1': [
+            {'bbox': {'ymin': 100, 'ymax': 209, 'xmin': 100, 'xmax': 209}, 'centroid': (150, 150), 'area': 10100},
+            {'bbox': {'ymin': 500, 'ymax': 599, 'xmin': 1000, 'xmax': 1099}, 'centroid': (549, 1049), 'area': 10000},
+        ],
+        'box2': [
+            {'bbox': {'ymin': 100, 'ymax': 199, 'xmin': 200, 'xmax': 299}, 'centroid': (149, 249), 'area': 10000},
+        ],
+    }
+
+    instances = get_instances_from_mask(mask, label_map, connectivity=4)
+    assert [i['area'] for i in instances['box1']] == [10000, 100, 10000]
+
+    # classes with multiple colors are labeled as one
+    instances = get_instances_from_mask(mask, {'box': [(1, 2, 3), (4, 5, 6)]})
+    assert len(instances['box']) == 2
+    box_map = {'box': [(1, 2, 3), (4, 5, 6)]}
+    assert instances['box'][0]['bbox'] == get_bounding_boxes_from_mask(mask[:300], box_map)['box']
+
+    with pytest.raises(ValueError):
+        get_instances_from_mask(mask, label_map, connectivity=6)
+    with pytest.raises(ValueError):
+        get_instances_from_mask(mask, {'a': (1, 2, 3), 'b': (1, 2, 3)})
+
+
+@pytest.mark.repeat(10)
+@pytest.mark.parametrize('connectivity', [4, 8])
+def test_instances_match_flood_fill(connectivity):
+    import cv2
+    labels = (np.random.random((60, 80)) < 0.45).astype(np.uint8)
+    mask = np.zeros((60, 80, 3), dtype=np.uint8)
+    mask[labels == 1] = 255
+    num, components = cv2.connectedComponents(labels, connectivity=connectivity)
+
+    instances = get_instances_from_mask(mask, {'white': (255, 255, 255)}, connectivity=connectivity, rle=True)['white']
+    assert len(instances) == num - 1
+    for instance in instances:
+        instance_mask = decode_rle(instance['rle'])
+        component = np.unique(components[instance_mask])
+        assert len(component) == 1
+        assert np.array_equal(components == component[0], instance_mask)
+        assert instance_mask.sum() == instance['area']
+
+
+def test_rle():
+    mask = np.zeros((4, 3), dtype=bool)
+    assert encode_rle(mask) == {'size': [4, 3], 'counts': [12]}
+    mask[0, 0] = mask[1, 0] = mask[3, 2] = True
+    rle = encode_rle(mask)
+    assert rle == {'size': [4, 3], 'counts': [0, 2, 9, 1]}
+    assert np.array_equal(decode_rle(rle), mask)
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+from mathutils import Euler, Matrix, Vector
+from starfish import Frame
+from starfish.annotation import build_bvh, get_keypoint_visibility, project_keypoints_onto_image
+from starfish.annotation.keypoints import OCCLUDED, OUT_OF_FRAME, VISIBLE
+from starfish.testing import fake_blender, make_scene, world_to_camera_view
+
+# the corners of the default cube, and the centers of its faces
+CORNERS = [(x, y, z) for x in (-1, 1) for y in (-1, 1) for z in (-1, 1)]
+FACES = [(1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1)]
+
+
+@pytest.fixture
+def blender():
+    with fake_blender() as bpy:
+        yield bpy
+
+
+def render_depth(scene, obj, camera, bvh, shape=(90, 160)):
+    """Ray-traces a planar depth map of the scene, with infinite depth wherever nothing is hit."""
+    h, w = shape
+    frame = camera.data.view_frame(scene=scene)
+    to_object = obj.matrix_world.inverted() @ camera.matrix_world.normalized()
+    origin = to_object.translation
+    depth = np.full(shape, np.inf)
+    for row in range(h):
+        for col in range(w):
+            x = frame[2].x + (col + 0.5) / w * (frame[1].x - frame[2].x)
+            y = frame[0].y - (row + 0.5) / h * (frame[0].y - frame[1].y)
+            target = to_object @ Vector((x, y, frame[0].z))
+            location = bvh.ray_cast(origin, target - origin)[0]
+            if location is not None:
+                depth[row, col] = -(camera.matrix_world.normalized().inverted() @ (obj.matrix_world @ location)).z
+    return depth
+
+
+@pytest.mark.parametrize('camera_type', ['PERSP', 'ORTHO'])
+def test_projection_matches_blender(blender, camera_type):
+    scene, obj, camera, sun = make_scene(blender, resolution=(1280, 720))
+    camera.data.type = camera_type
+    frame = Frame(position=(1, -2, 3), distance=8, offset=(0.3, 0.6), pose=Euler((0.4, 1.2, -0.7)))
+    frame.setup(scene, obj, camera, sun)
+    keypoints = CORNERS + [(0, 0, 0), (0.3, -0.2, 0.9)]
+    expected = []
+    for keypoint in keypoints:
+        co = world_to_camera_view(scene, camera, obj.matrix_world @ Vector(keypoint))
+        expected.append((1 - co.y, co.x))
+    assert np.allclose(project_keypoints_onto_image(keypoints, scene, obj, camera), expected, atol=1e-5)
+    assert project_keypoints_onto_image([], scene, obj, camera) == []
+
+
+def test_visibility_bvh(blender):
+    scene, obj, camera, sun = make_scene(blender)
+    # looking straight at the +x face of the cube
+    rotation = Vector((-1, 0, 0)).to_track_quat('-Z', 'Y').to_matrix().to_4x4()
+    camera.matrix_world = Matrix.Translation((10, 0, 0)) @ rotation
+
+    flags = get_keypoint_visibility(FACES + [(20, 0, 0)], scene, obj, camera)
+    assert flags.tolist() == [VISIBLE] + [OCCLUDED] * 5 + [OUT_OF_FRAME]
+
+    # corners on the near face are visible, corners on the far face are behind it
+    flags = get_keypoint_visibility(CORNERS, scene, obj, camera, bvh=build_bvh(obj))
+    assert flags.tolist() == [OCCLUDED] * 4 + [VISIBLE] * 4
+
+
+def test_visibility_depth_matches_bvh(blender):
+    scene, obj, camera, sun = make_scene(blender, resolution=(160, 90))
+    Frame(distance=8, pose=Euler((0.5, 0.9, 0.3))).setup(scene, obj, camera, sun)
+    bvh = build_bvh(obj)
+    rng = np.random.default_rng(0)
+    # random points on the surface of the cube
+    keypoints = rng.uniform(-1, 1, (50, 3))
+    axes = rng.integers(0, 3, 50)
+    keypoints[np.arange(50), axes] = rng.choice([-1, 1], 50)
+
+    expected = get_keypoint_visibility(keypoints, scene, obj, camera, bvh=bvh)
+    assert set(expected.tolist()) == {VISIBLE, OCCLUDED}
+    depth = render_depth(scene, obj, camera, bvh)
+    assert get_keypoint_visibility(keypoints, scene, obj, camera, depth=depth).tolist() == expected.tolist()
+    # multi-channel depth maps use the first channel
+    flags = get_keypoint_visibility(keypoints, scene, obj, camera, depth=np.dstack([depth] * 3))
+    assert flags.tolist() == expected.tolist()
+
+    # radial depth
+    h, w = depth.shape
+    frame = camera.data.view_frame(scene=scene)
+    x = frame[2].x + (np.arange(w) + 0.5) / w * (frame[1].x - frame[2].x)
+    y = frame[0].y - (np.arange(h) + 0.5) / h * (frame[0].y - frame[1].y)
+    radial = depth * np.sqrt(x[None] ** 2 + y[:, None] ** 2 + frame[0].z ** 2) / -frame[0].z
+    flags = get_keypoint_visibility(keypoints, scene, obj, camera, depth=radial, radial_depth=True)
+    assert flags.tolist() == expected.tolist()
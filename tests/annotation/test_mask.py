@@ -1,5 +1,6 @@
 import pytest
-from starfish.annotation import get_bounding_boxes_from_mask, get_centroids_from_mask, normalize_mask_colors
+from starfish.annotation import (MaskAnnotator, get_bounding_boxes_from_mask, get_centroids_from_mask,
+                                 normalize_mask_colors)
 import numpy as np
 
 
@@ -42,4 +43,37 @@ def test_normalize_colors():
         clean_mask[512, 512, :] += np.array([2, 2, 3], dtype=np.uint8)
         normalize_mask_colors(clean_mask, [(100, 100, 100), (200, 200, 200)])
 
-        normalize_mask_colors(dirty_mask, [(100, 100, 100), (101, 101, 101), (200, 200, 200)])
\ No newline at end of file
+        normalize_mask_colors(dirty_mask, [(100, 100, 100), (101, 101, 101), (200, 200, 200)])
+
+
+def test_mask_annotator():
+    rng = np.random.default_rng(0)
+    mask = np.zeros((300, 400, 3), dtype=np.uint8)
+    mask[10:50, 20:90] = (1, 2, 3)
+    mask[100:250, 50:300] = (4, 5, 6)
+    mask[260:280, 390:400] = (200, 9, 9)
+    label_map = {'a': (1, 2, 3), 'b': [(4, 5, 6), (200, 9, 9)], 'doesnt_exist': (7, 7, 7)}
+    colors = [(0, 0, 0), (1, 2, 3), (4, 5, 6), (200, 9, 9)]
+    annotator = MaskAnnotator(label_map, (300, 400), colors=colors, color_variation_cutoff=3)
+
+    dirty = mask.astype(np.int64)
+    dirty[..., 0] += rng.integers(0, 2, (300, 400))
+    for _ in range(2):
+        assert annotator.bounding_boxes(mask) == get_bounding_boxes_from_mask(mask, label_map)
+        assert annotator.centroids(mask) == get_centroids_from_mask(mask, label_map)
+        assert np.array_equal(annotator.normalize(dirty), normalize_mask_colors(dirty, colors, 3))
+    assert np.array_equal(annotator.normalize(dirty), mask)
+    labels = annotator.labels(mask)
+    assert labels[0, 0] == 0 and labels[10, 20] == 1 and labels[100, 50] == labels[260, 390] == 2
+
+    # results can be written in place
+    out = dirty.astype(np.uint8)
+    assert annotator.normalize(out, out=out) is out and np.array_equal(out, mask)
+
+    with pytest.raises(ValueError):
+        annotator.bounding_boxes(np.zeros((400, 300, 3), dtype=np.uint8))
+    with pytest.raises(ValueError):
+        MaskAnnotator(label_map, (300, 400)).normalize(mask)
+    with pytest.raises(ValueError):
+        mask[0, 0] = (100, 100, 100)
+        annotator.normalize(mask)
@@ -1,6 +1,7 @@
+import numpy as np
 import pytest
 from starfish import Sequence, Frame
-from starfish.rotations import Spherical
+from starfish.rotations import QuaternionArray, Spherical
 from mathutils import Quaternion, Vector
 
 
@@ -131,3 +132,103 @@ class TestSequence:
                 Frame(distance=2, position=(1, 1, 2), pose=Quaternion([1, 1, 1, 1])),
             ]
         )
+
+    def test_quaternion_array(self):
+        poses = [Quaternion((1, 0, 0), 0.5), Quaternion((0, 1, 0), 1.5)]
+        assert self.sequence_equal(
+            Sequence.standard(pose=QuaternionArray.from_quaternions(poses), distance=[5]),
+            Sequence.standard(pose=poses, distance=[5])
+        )
+        assert self.sequence_set_equal(
+            Sequence.exhaustive(pose=QuaternionArray.from_quaternions(poses), distance=[1, 2]),
+            Sequence.exhaustive(pose=poses, distance=[1, 2])
+        )
+
+    def test_random(self):
+        kwargs = dict(seed=3, rotations=('pose', 'lighting'), distance=(10, 20), offset=[(0.4, 0.6), (0.4, 0.6)])
+        sequence = Sequence.random(5000, **kwargs)
+        assert len(sequence) == 5000 and all(10 <= frame.distance < 20 for frame in sequence)
+        assert len({tuple(frame.pose) for frame in sequence}) == 5000
+        # parts generated separately are identical to the serial run
+        parts = [Sequence.random(2500, skip=skip, **kwargs) for skip in (0, 2500)]
+        assert all(vars(a) == vars(b) for a, b in zip(parts[0] + parts[1], sequence))
+        assert self.sequence_equal(Sequence.random(3, seed=3), Sequence.random(3, seed=3))
+        assert not self.sequence_equal(Sequence.random(3, seed=3), Sequence.random(3, seed=4))
+        assert len(Sequence.random(2, rotations=())) == 2
+
+    def test_interpolated_rotations(self):
+        a = Frame(pose=Quaternion((1, 0, 0), 0.5), lighting=Quaternion((0, 0, 1), 2),
+                  background=Quaternion((0, 1, 0), 3))
+        b = Frame(pose=Quaternion((0, 1, 0), -2), lighting=Quaternion((1, 1, 0), 1),
+                  background=Quaternion((1, 0, 0), 1))
+        frames = Sequence.interpolated([a, b], 8)
+        for i, frame in enumerate(frames[:-1]):
+            for field in ('pose', 'lighting', 'background'):
+                expected = getattr(a, field).slerp(getattr(b, field), i / 8)
+                assert all(abs(x - y) < 1e-6 for x, y in zip(getattr(frame, field), expected))
+
+    def test_interpolated_lazy(self):
+        waypoints = Sequence.standard(distance=[1, 5, 2, 8],
+                                      pose=[Quaternion((1, 0, 0), 0.5), Quaternion((0, 1, 0), 2),
+                                            Quaternion((0, 0, 1), -1), Quaternion((1, 1, 0), 3)])
+        waypoints.frames[2].offset = (0.2, 0.9)
+        counts = [7, 0, 13]
+        lazy = Sequence.interpolated(waypoints, counts, lazy=True)
+        eager = Sequence.interpolated(waypoints, counts)
+        assert len(lazy) == len(eager) == sum(counts) + 1
+        assert self.sequence_equal(lazy, eager)
+        # random access gives the same frames as iterating
+        assert all(vars(lazy[i]) == vars(frame) for i, frame in enumerate(eager))
+        assert vars(lazy[-3]) == vars(eager[-3]) and lazy[-1] is waypoints[-1]
+        assert self.sequence_equal(lazy[3:17:4], eager[3:17:4])
+        with pytest.raises(IndexError):
+            lazy[len(lazy)]
+        with pytest.raises(TypeError):
+            lazy[0] = Frame()
+        # lazy and eager sequences can be added together in either order
+        assert self.sequence_equal(eager + lazy, list(eager) + list(eager))
+        assert self.sequence_equal(lazy + eager, list(eager) + list(eager))
+        assert len(eager + lazy) == len(lazy + eager) == len(lazy + lazy) == 2 * len(eager)
+
+        # long paths are never computed in full
+        lazy = Sequence.interpolated(waypoints, [10 ** 12] * 3, lazy=True)
+        assert len(lazy) == 3 * 10 ** 12 + 1
+        assert lazy[2 * 10 ** 12].distance == 2 and lazy[10 ** 12 // 2].distance == 3
+
+        with pytest.raises(ValueError):
+            Sequence.interpolated(waypoints, counts, method='cubic')
+
+    def test_interpolated_spline(self):
+        waypoints = Sequence.standard(distance=[1, 5, 2, 8], position=[(0, 0, 0), (1, 2, 0), (3, 2, 1), (4, 0, 0)],
+                                      pose=[Quaternion((1, 0, 0), 0.5), Quaternion((0, 1, 0), 2),
+                                            Quaternion((0, 0, 1), -1), Quaternion((1, 1, 0), 3)])
+        counts = [100, 100, 100]
+        spline = Sequence.interpolated(waypoints, counts, method='spline', lazy=True)
+        assert self.sequence_equal(spline, Sequence.interpolated(waypoints, counts, method='spline'))
+        # the path goes through every waypoint, which come back unchanged
+        for i, waypoint in enumerate(waypoints):
+            frame = spline[100 * i]
+            assert abs(frame.distance - waypoint.distance) < 1e-9
+            assert (frame.position - waypoint.position).length < 1e-6
+            assert frame.pose == waypoint.pose
+        # even where the spline has to flip the sign of a quaternion to take the short way around
+        flipped = Sequence.standard(distance=[1, 2, 3], pose=[Quaternion((1, 0, 0), 0.5), -Quaternion((0, 1, 0), 2),
+                                                              Quaternion((0, 0, 1), -1)])
+        path = Sequence.interpolated(flipped, [10, 10], method='spline')
+        assert [path[10 * i].pose for i in range(3)] == [frame.pose for frame in flipped]
+        # and, like slerp, each segment stays in the hemisphere of the waypoint it starts from
+        assert path[10].pose.dot(path[11].pose) > 0 and path[0].pose.dot(path[9].pose) > 0
+
+        # unlike linear interpolation, the velocity doesn't jump at the waypoints in between
+        def jumps(sequence, i):
+            before, at, after = sequence[i - 1], sequence[i], sequence[i + 1]
+            # the angle between the rotations from one frame to the next before and after
+            step_before = before.pose.rotation_difference(at.pose)
+            step_after = at.pose.rotation_difference(after.pose)
+            return np.array([abs((at.distance - before.distance) - (after.distance - at.distance)),
+                             ((at.position - before.position) - (after.position - at.position)).length,
+                             2 * np.arccos(min(abs(step_before.dot(step_after)), 1))])
+
+        linear = Sequence.interpolated(waypoints, counts, lazy=True)
+        for i in (100, 200):
+            assert np.all(jumps(spline, i) < jumps(linear, i) / 10)
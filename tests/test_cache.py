@@ -0,0 +1,103 @@
+import os
+
+import numpy as np
+import pytest
+from mathutils import Euler, Quaternion, Vector
+from starfish import Frame, profiling
+from starfish.cache import OutputCache, frame_hash, scene_fingerprint
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def test_frame_hash():
+    frame = Frame(position=(1, 2, 3), distance=20, pose=Euler((0.1, 0.2, 0.3)), offset=(0.2, 0.7))
+    same = Frame(position=Vector((1.0, 2.0, 3.0)), distance=np.float64(20.0),
+                 pose=-Euler((0.1, 0.2, 0.3)).to_quaternion(), offset=[0.2, 0.7])
+    same.translation = Vector((4, 5, 6))
+    assert frame_hash(frame) == frame_hash(same)
+    assert len(frame_hash(frame)) == 64
+
+    assert frame_hash(frame) != frame_hash(Frame(position=(1, 2, 3), distance=21, pose=Euler((0.1, 0.2, 0.3)),
+                                                 offset=(0.2, 0.7)))
+    assert frame_hash(frame) != frame_hash(frame, fingerprint='other scene')
+    same.sequence_name = 'test'
+    assert frame_hash(frame) != frame_hash(same)
+    assert frame_hash(frame) == frame_hash(same, metadata=False)
+    assert frame_hash(Frame(lighting=Quaternion((0, 0, 0, -1)))) == frame_hash(Frame(lighting=Quaternion((0, 0, 0, 1))))
+
+
+def test_scene_fingerprint(tmp_path):
+    path = str(tmp_path / 'scene.blend')
+    write(path, 'scene')
+    fingerprint = scene_fingerprint(path, resolution=(1920, 1080))
+    assert fingerprint == scene_fingerprint(path, resolution=[1920.0, 1080])
+    assert fingerprint != scene_fingerprint(path, resolution=(1280, 720))
+    write(path, 'changed scene')
+    assert fingerprint != scene_fingerprint(path, resolution=(1920, 1080))
+
+
+@pytest.mark.parametrize('link', [True, False])
+def test_output_cache(tmp_path, link):
+    cache = OutputCache(str(tmp_path / 'cache'), fingerprint='scene', link=link)
+    frame = Frame(distance=30)
+    outputs = {'real.png': str(tmp_path / 'out' / 'real_0.png'), 'meta.json': str(tmp_path / 'out' / 'meta_0.json')}
+    assert not cache.restore(frame, outputs) and frame not in cache
+
+    write(outputs['real.png'], 'real')
+    write(outputs['meta.json'], '{}')
+    key = cache.store(frame, outputs)
+    assert key == frame_hash(frame, 'scene') and frame in cache and key in cache
+    assert cache.files(frame) == ['meta.json', 'real.png'] and cache.size == 6
+
+    with profiling.Profiler() as profiler:
+        restored = {name: str(tmp_path / 'again' / name) for name in outputs}
+        assert cache.restore(Frame(distance=30.0), restored)
+        assert not cache.restore(frame, {'missing.png': str(tmp_path / 'missing.png')})
+        assert not cache.restore(Frame(distance=31), restored)
+    assert profiler.counters == {'cache.hits': 1, 'cache.misses': 2}
+    assert read(restored['real.png']) == 'real' and read(restored['meta.json']) == '{}'
+    assert os.path.samefile(restored['real.png'], cache._path(key, 'real.png')) == link
+    # the cache keeps its own copy of the files
+    write(outputs['real.png'], 'overwritten')
+    assert read(cache._path(key, 'real.png')) == 'real'
+
+    # a different fingerprint never matches
+    assert frame not in OutputCache(cache.directory, fingerprint='other scene')
+    with pytest.raises(ValueError):
+        cache.store(frame, {'../escape.png': outputs['real.png']})
+    with pytest.raises(ValueError):
+        OutputCache(cache.directory, max_bytes=-1)
+
+
+def test_output_cache_eviction(tmp_path):
+    directory = str(tmp_path / 'cache')
+    cache = OutputCache(directory, max_bytes=35)
+    frames = [Frame(distance=d) for d in range(4)]
+    for i, frame in enumerate(frames):
+        path = str(tmp_path / f'{i}.png')
+        write(path, '0123456789')
+        cache.store(frame, {'image.png': path})
+        if i == 2:
+            # using the first entry again makes the second one the least recently used
+            assert cache.restore(frames[0], {'image.png': str(tmp_path / 'restored.png')})
+    assert [frame in cache for frame in frames] == [True, False, True, True]
+    assert cache.size == 30 and len(cache) == 3
+
+    # the order is kept on disk, so a new cache object picks up where the last one left off
+    for i, frame in enumerate([frames[3], frames[0], frames[2]]):
+        os.utime(cache._path(cache.key(frame)), (100 * i, 100 * i))
+    reopened = OutputCache(directory, max_bytes=35)
+    assert len(reopened) == 3 and reopened.size == 30
+    assert reopened.evict(10) == 2 and [frame in reopened for frame in frames] == [False, False, True, False]
+    reopened.clear()
+    assert len(reopened) == 0 and reopened.size == 0
+    assert not os.listdir(os.path.join(directory, cache.key(frames[2])[:2]))
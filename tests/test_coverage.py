@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+from mathutils import Euler, Quaternion
+from starfish import Frame, Sequence
+from starfish.coverage import RotationIndex, coverage, deduplicate, geodesic_distance
+
+
+def random_quaternions(rng, n):
+    q = rng.normal(size=(n, 4))
+    # put some of them near w = 0, where q and -q are both close to the other rotations
+    q[:n // 4, 0] = rng.normal(scale=0.01, size=n // 4)
+    return q / np.linalg.norm(q, axis=1, keepdims=True)
+
+
+def brute_force_pairs(q, radius):
+    distances = 2 * np.arccos(np.clip(np.abs(q @ q.T), 0, 1))
+    return set(zip(*map(np.ndarray.tolist, np.nonzero(np.triu(distances <= radius, 1)))))
+
+
+def test_geodesic_distance():
+    a = Quaternion((0, 0, 1), 0.3)
+    assert geodesic_distance(a, Quaternion((0, 0, 1), -0.2)) == pytest.approx([0.5])
+    # q and -q are the same rotation
+    assert geodesic_distance(a, -a) == pytest.approx([0], abs=1e-6)
+    assert geodesic_distance([a, Euler((0, 0, 0))], [a, Euler((np.pi, 0, 0))]) == pytest.approx([0, np.pi], abs=1e-6)
+
+
+@pytest.mark.parametrize('radius', [0.05, 0.3, 1.0, 2.5, np.pi])
+def test_pairs(radius):
+    q = random_quaternions(np.random.default_rng(0), 500)
+    a, b = RotationIndex(q, radius).pairs()
+    assert np.all(a < b)
+    assert len(set(zip(a.tolist(), b.tolist()))) == len(a)
+    assert set(zip(a.tolist(), b.tolist())) == brute_force_pairs(q, radius)
+
+
+def test_query_and_groups():
+    rng = np.random.default_rng(1)
+    q = random_quaternions(rng, 300)
+    groups = rng.integers(0, 3, 300)
+    index = RotationIndex(q, 0.5, groups=groups)
+    queries = random_quaternions(rng, 100)
+    query_groups = rng.integers(0, 3, 100)
+    found = set(zip(*map(np.ndarray.tolist, index.query(queries, query_groups))))
+    distances = 2 * np.arccos(np.clip(np.abs(queries @ q.T), 0, 1))
+    expected = (distances <= 0.5) & (query_groups[:, None] == groups[None])
+    assert found == set(zip(*map(np.ndarray.tolist, np.nonzero(expected))))
+    assert len(RotationIndex(np.zeros((0, 4)), 0.5).pairs()[0]) == 0
+
+    with pytest.raises(ValueError):
+        RotationIndex(q, 0)
+    with pytest.raises(ValueError):
+        RotationIndex(q, 0.5, groups=[0])
+
+
+def test_deduplicate():
+    rng = np.random.default_rng(2)
+    q = random_quaternions(rng, 400)
+    poses = [Quaternion(p) for p in q]
+    distances = [10, 20]
+    seq = Sequence.standard(pose=poses + poses[:100], distance=[distances[i % 2] for i in range(500)])
+    result, kept = deduplicate(seq, 0.4, return_index=True)
+
+    # compare with a straightforward greedy pass
+    expected = []
+    for i, frame in enumerate(seq):
+        if not any(frame.distance == seq[j].distance and geodesic_distance(frame.pose, seq[j].pose)[0] <= 0.4
+                   for j in expected):
+            expected.append(i)
+    assert kept.tolist() == expected
+    assert [frame for frame in result] == [seq[i] for i in expected]
+    # exact repeats with the same distance are always removed
+    assert kept.max() < 400
+
+
+def test_deduplicate_multiple_fields():
+    pose = Quaternion((1, 0, 0), 0.1)
+    seq = Sequence([Frame(pose=pose, lighting=Euler((0, 0, 0))), Frame(pose=pose, lighting=Euler((0, 0, 1))),
+                    Frame(pose=pose, lighting=Euler((0, 0, 0.01)))])
+    assert deduplicate(seq, 0.1, return_index=True)[1].tolist() == [0, 1]
+    assert deduplicate(seq, 0.1, fields=('pose',), return_index=True)[1].tolist() == [0]
+
+
+def test_coverage():
+    # a single rotation covers a geodesic ball
+    stats = coverage(np.array([[1.0, 0, 0, 0]]), 0.5)
+    assert stats['ideal'] == pytest.approx((0.5 - np.sin(0.5)) / np.pi)
+    assert stats['covered'] == pytest.approx(stats['ideal'], rel=0.1)
+
+    seq = Sequence.standard(pose=[Quaternion(p) for p in random_quaternions(np.random.default_rng(3), 2000)])
+    stats = coverage(seq, 0.3)
+    assert stats['num_rotations'] == 2000
+    assert 0 < stats['covered'] < stats['ideal'] <= 1
+    assert stats['redundant'] == 2000 - len(deduplicate(seq, 0.3, fields=('pose',)))
@@ -0,0 +1,107 @@
+import json
+import multiprocessing
+import os
+
+import numpy as np
+import pytest
+from mathutils import Euler
+from starfish import Frame, Sequence
+from starfish.distributed import Coordinator, Worker, _encode, _frame_from_dict, _frame_to_dict
+
+
+def render_to_file(address, path, crash_after=None):
+    """Stands in for a render node: 'renders' each frame by appending its index and distance to a file."""
+    rendered = 0
+
+    def render(index, frame):
+        nonlocal rendered
+        if rendered == crash_after:
+            # die in the middle of a lease, without reporting anything
+            os._exit(1)
+        with open(path, 'a') as f:
+            f.write(f'{index} {frame.distance}\n')
+        rendered += 1
+
+    Worker(address, name=os.path.basename(path)).run(render)
+
+
+def test_frame_serialization():
+    frame = Frame(position=(1, 2, 3), distance=np.float64(20), pose=Euler((0.1, 0.2, 0.3)), offset=(0.2, 0.7))
+    frame.sequence_name = 'test'
+    frame.scale = np.float32(0.5)
+    result = _frame_from_dict(json.loads(_encode(_frame_to_dict(frame))))
+    assert result.distance == 20 and result.offset == (0.2, 0.7) and result.sequence_name == 'test'
+    assert result.scale == 0.5
+    assert tuple(result.position) == (1, 2, 3)
+    assert np.allclose(result.pose, frame.pose)
+
+
+def test_single_worker():
+    sequence = Sequence.standard(distance=list(range(25)))
+    with Coordinator(sequence, chunk_size=4) as coordinator:
+        worker = Worker(coordinator.address)
+        distances = []
+        worker.run(lambda i, frame: distances.append((i, frame.distance)))
+        assert coordinator.wait(5)
+        assert distances == [(i, i) for i in range(25)]
+        assert coordinator.done.all() and not np.isnan(coordinator.durations).any()
+        assert coordinator.progress() == {'done': 25, 'leased': 0, 'pending': 0}
+        # once everything is done, workers stop immediately
+        assert list(Worker(coordinator.address).leases()) == []
+
+
+def test_expired_lease_is_reassigned():
+    with Coordinator(Sequence.standard(distance=list(range(10))), chunk_size=5, lease_timeout=0.2) as coordinator:
+        lost = Worker(coordinator.address, name='lost')
+        lease_id, start, frames = next(lost.leases())
+        assert (start, len(frames)) == (0, 5)
+        assert lost.complete(lease_id)
+        assert coordinator.progress() == {'done': 1, 'leased': 4, 'pending': 5}
+
+        # the lost worker's lease expires, so its remaining frames go to the next worker
+        worker = Worker(coordinator.address)
+        indices = []
+        worker.run(lambda i, frame: (indices.append(i), frame))
+        assert sorted(indices) == list(range(1, 10))
+        assert not lost.complete(lease_id)
+        assert coordinator.wait(5)
+
+
+def test_errors():
+    with pytest.raises(ValueError):
+        Coordinator([Frame()], chunk_size=0)
+    # attributes that can't be serialized are rejected instead of being sent as strings
+    frames = [Frame(), Frame()]
+    frames[1].camera = object()
+    with pytest.raises(TypeError, match="'camera' of frame 1"):
+        Coordinator(frames)
+    with pytest.raises(TypeError):
+        _encode({'frames': [_frame_to_dict(frames[1])]})
+    with Coordinator([]) as coordinator:
+        assert coordinator.wait(0)
+        with pytest.raises(ValueError):
+            Worker(coordinator.address)._send({'op': 'unknown'})
+
+
+def test_local_processes(tmp_path):
+    sequence = Sequence.standard(distance=list(range(60)))
+    context = multiprocessing.get_context('fork')
+    with Coordinator(sequence, chunk_size=5, lease_timeout=1) as coordinator:
+        paths = [tmp_path / f'worker_{i}.txt' for i in range(4)]
+        # one of the workers dies partway through its second lease
+        processes = [context.Process(target=render_to_file, args=(coordinator.address, str(path),
+                                                                  7 if i == 0 else None))
+                     for i, path in enumerate(paths)]
+        for process in processes:
+            process.start()
+        assert coordinator.wait(30)
+        for process in processes:
+            process.join(30)
+    assert processes[0].exitcode == 1
+
+    rendered = [tuple(map(float, line.split())) for path in paths if path.exists()
+                for line in path.read_text().splitlines()]
+    # every frame was rendered with the right parameters, and only frames of the lost lease may be rendered twice
+    assert {int(i) for i, _ in rendered} == set(range(60))
+    assert all(i == distance for i, distance in rendered)
+    assert len(rendered) - 60 <= 1
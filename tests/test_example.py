@@ -1,6 +1,7 @@
 import sys
 import starfish
 import starfish.annotation
+import starfish.render
 
 
 class Dummy:
@@ -26,12 +27,22 @@ class Dummy:
         return Dummy()
 
 
+class DummySession:
+    def __init__(self, *_, **__):
+        pass
+
+    def run(self, sequence):
+        return enumerate(sequence)
+
+
 def test_example(monkeypatch):
     monkeypatch.setitem(sys.modules, 'bpy', Dummy())
-    monkeypatch.setattr(starfish.annotation, 'normalize_mask_colors', Dummy())
     monkeypatch.setattr(starfish.annotation, 'get_bounding_boxes_from_mask', Dummy())
     monkeypatch.setattr(starfish.annotation, 'get_centroids_from_mask', Dummy())
     monkeypatch.setattr(starfish.Frame, 'setup', Dummy())
+    monkeypatch.setattr(starfish.render, 'RenderSession', DummySession)
+    monkeypatch.setattr(starfish.render, 'configure_mask_scene', Dummy())
+    monkeypatch.setattr(starfish.render, 'read_mask', Dummy())
     monkeypatch.setattr(starfish.Frame, 'dumps', Dummy())
     with open('example.py', 'r') as f:
         example = f.read()
@@ -0,0 +1,34 @@
+import subprocess
+import sys
+
+
+def imported_modules(code):
+    """Runs ``code`` in a fresh interpreter and returns the set of modules that were imported afterwards."""
+    output = subprocess.run([sys.executable, '-c', code + '; import sys; print(" ".join(sys.modules))'],
+                            check=True, capture_output=True, text=True).stdout
+    return set(output.split())
+
+
+def test_import_starfish_is_lightweight():
+    modules = imported_modules('import starfish')
+    assert 'starfish.annotation' not in modules
+    assert 'cv2' not in modules
+
+
+def test_annotation_is_loaded_lazily():
+    modules = imported_modules('import starfish; starfish.annotation.get_bounding_boxes_from_mask')
+    assert 'starfish.annotation.mask' in modules
+    assert 'cv2' not in modules
+
+    modules = imported_modules('from starfish.annotation import normalize_mask_colors, generate_keypoints')
+    assert 'cv2' not in modules
+
+
+def test_lazy_attributes():
+    import starfish
+    import starfish.annotation
+    import starfish.annotation.generate_keypoints
+    assert callable(starfish.annotation.generate_keypoints)
+    assert 'annotation' in dir(starfish)
+    assert set(starfish.annotation.__all__) <= set(dir(starfish.annotation))
+    assert callable(starfish.annotation.normalize_mask_colors)
@@ -0,0 +1,49 @@
+import csv
+import json
+from types import SimpleNamespace
+
+import numpy as np
+from starfish import profiling, utils
+from starfish.annotation import get_bounding_boxes_from_mask
+
+
+def test_disabled_by_default():
+    assert profiling.active() is None
+    with profiling.stage('nothing'):
+        pass
+    profiling.count('nothing')
+
+
+def test_instrumented_entry_points(tmp_path):
+    mask = np.zeros((100, 100, 3), dtype=np.uint8)
+    mask[10:20, 10:20] = 255
+
+    with profiling.Profiler() as profiler:
+        for _ in range(10):
+            utils.jsonify(SimpleNamespace(a=1))
+            get_bounding_boxes_from_mask(mask, {'box': (255, 255, 255)})
+            with profiling.stage('render'):
+                profiling.count('renders')
+            profiler.next_frame()
+    assert profiling.active() is None
+
+    summary = profiler.summary()
+    assert set(summary) == {'jsonify', 'get_bounding_boxes_from_mask', 'render'}
+    for stats in summary.values():
+        assert stats['count'] == 10
+        assert 0 <= stats['p50'] <= stats['p95'] <= stats['p99'] <= stats['max']
+    assert profiler.counters == {'renders': 10}
+    assert sorted({r[0] for r in profiler.records}) == list(range(10))
+    assert 'render' in profiler.report()
+
+    profiler.to_json(str(tmp_path / 'trace.json'))
+    with open(tmp_path / 'trace.json') as f:
+        trace = json.load(f)
+    assert trace['summary'] == summary
+    assert len(trace['trace']) == 30
+
+    profiler.to_csv(str(tmp_path / 'trace.csv'))
+    with open(tmp_path / 'trace.csv') as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 30
+    assert rows[0].keys() == {'frame', 'stage', 'start', 'duration'}
@@ -0,0 +1,168 @@
+import numpy as np
+import pytest
+from mathutils import Euler
+from starfish import Frame, Sequence
+from starfish.annotation import get_bounding_boxes_from_mask
+from starfish.render import (RenderSession, _srgb_to_linear, configure_mask_scene, read_labels, read_mask,
+                             read_pixels)
+from starfish.testing import fake_blender, make_scene
+
+
+@pytest.fixture
+def blender():
+    with fake_blender() as bpy:
+        scene, obj, camera, sun = make_scene(bpy)
+        for name in ('Real', 'Mask'):
+            scene = bpy.data.scenes.new(name)
+            scene.node_tree.nodes.new('File Output', 'OUTPUT_FILE')
+        yield bpy
+
+
+def test_render_shared_objects(blender):
+    session = RenderSession(['Real', 'Mask'], 'Cube', 'Camera', 'Sun', outputs={
+        'Real': {'File Output': 'real_{index}'},
+        'Mask': {'File Output': '{name}/mask_{index}'},
+    })
+    sequence = Sequence.standard(distance=[10, 20, 30], pose=[Euler((0.1, 0.2, 0.3))])
+    for i, frame in session.run(sequence, start=5, name='seq'):
+        assert frame is sequence[i - 5]
+        assert frame.translation is not None
+        assert blender.data.scenes['Real'].node_tree.nodes['File Output'].file_slots[0].path == f'real_{i}'
+        assert blender.data.scenes['Mask'].node_tree.nodes['File Output'].file_slots[0].path == f'seq/mask_{i}'
+    assert blender.ops.render.calls == [{'scene': 'Real'}, {'scene': 'Mask'}] * 3
+
+    # setting up through the session is the same as setting up the frame directly
+    obj = blender.data.objects['Cube']
+    Frame(distance=30, pose=Euler((0.1, 0.2, 0.3))).setup(blender.data.scenes['Real'], obj,
+                                                          blender.data.objects['Camera'], blender.data.objects['Sun'])
+    assert obj.matrix_world == session.obj.matrix_world
+
+
+def test_render_mirrors(blender):
+    copies = [blender.data.objects.new(f'{name}.mask', blender.data.objects[name].data)
+              for name in ('Cube', 'Camera', 'Sun')]
+    session = RenderSession(['Real', 'Mask'], 'Cube', 'Camera', 'Sun', mirrors={'Mask': [c.name for c in copies]})
+    session.render(Frame(distance=15, pose=Euler((1, 2, 3)), offset=(0.3, 0.6)))
+    for original, copy in zip((session.obj, session.camera, session.sun), copies):
+        assert copy.matrix_world == original.matrix_world
+        assert copy.rotation_quaternion == original.rotation_quaternion
+
+
+def test_render_errors(blender):
+    with pytest.raises(ValueError):
+        RenderSession(['Real', 'Missing'], 'Cube', 'Camera', 'Sun')
+    with pytest.raises(ValueError):
+        RenderSession(['Real'], 'Missing', 'Camera', 'Sun')
+    with pytest.raises(ValueError):
+        RenderSession(['Real'], 'Cube', 'Camera', 'Sun', outputs={'Real': {'Missing': 'x'}})
+    with pytest.raises(ValueError):
+        RenderSession(['Real'], 'Cube', 'Camera', 'Sun', outputs={'Mask': {'File Output': 'x'}})
+    with pytest.raises(ValueError):
+        RenderSession(['Real'], 'Cube', 'Camera', 'Sun', outputs={'Real': {'File Output': ['a', 'b']}})
+    blender.data.scenes['Mask'].render.resolution_x = 1000
+    with pytest.raises(ValueError):
+        RenderSession(['Real', 'Mask'], 'Cube', 'Camera', 'Sun')
+
+
+@pytest.mark.parametrize('engine', ['BLENDER_WORKBENCH', 'CYCLES'])
+def test_configure_mask_scene(blender, engine):
+    scene = blender.data.scenes['Mask']
+    camera = blender.data.objects['Camera']
+    # an object that isn't labeled, with a pass index left over from elsewhere
+    other = blender.data.objects.new('Other', blender.data.objects['Cube'].data)
+    other.pass_index = 5
+    for obj in (blender.data.objects['Cube'], camera, other):
+        scene.collection.objects.link(obj)
+    indices = configure_mask_scene(scene, {'Cube': (255, 255, 255), camera: (255, 0, 128)}, background=(0, 0, 10),
+                                   engine=engine)
+    assert indices == {'Cube': 1, 'Camera': 2}
+    assert blender.data.objects['Cube'].pass_index == 1 and camera.pass_index == 2
+    assert np.allclose(blender.data.objects['Cube'].color, (1, 1, 1, 1))
+    # other objects are background with either engine: in the object colors, and in the index pass
+    assert other.pass_index == 0
+    assert other.color == _srgb_to_linear((0, 0, 10)) + (1.0,)
+    # the 'Standard' view transform maps the linear colors back to the requested sRGB colors
+    linear = np.array(camera.color[:3])
+    srgb = np.where(linear <= 0.0031308, linear * 12.92, 1.055 * linear ** (1 / 2.4) - 0.055)
+    assert np.round(srgb * 255).tolist() == [255, 0, 128]
+    assert scene.render.engine == engine
+    assert scene.render.dither_intensity == 0 and scene.view_settings.view_transform == 'Standard'
+    assert all(view_layer.use_pass_object_index for view_layer in scene.view_layers)
+    assert scene.world.color == _srgb_to_linear((0, 0, 10))
+    # the mask (or, with Cycles, the object index pass) goes to the Viewer node
+    link, = scene.node_tree.links
+    assert scene.use_nodes
+    assert link.from_node.type == 'R_LAYERS'
+    assert link.from_socket.name == ('IndexOB' if engine == 'CYCLES' else 'Image')
+    assert link.to_node.type == 'VIEWER' and link.to_socket.name == 'Image'
+    # existing nodes are reused
+    configure_mask_scene(scene, {'Cube': (255, 255, 255)}, engine=engine)
+    assert len(scene.node_tree.links) == 1 and len(scene.node_tree.nodes) == 3
+    if engine == 'CYCLES':
+        assert scene.cycles.samples == 1 and not scene.cycles.use_denoising and scene.cycles.max_bounces == 0
+    else:
+        assert scene.display.render_aa == 'OFF' and scene.display.shading.color_type == 'OBJECT'
+    # the real scene is untouched
+    assert blender.data.scenes['Real'].render.engine == 'BLENDER_EEVEE'
+
+    with pytest.raises(ValueError):
+        configure_mask_scene(scene, {'Cube': (256, 0, 0)})
+    with pytest.raises(ValueError):
+        configure_mask_scene(scene, {'Missing': (255, 0, 0)})
+    with pytest.raises(ValueError):
+        configure_mask_scene(scene, {'Cube': (255, 0, 0)}, engine='BLENDER_EEVEE')
+
+
+def test_read_mask(blender):
+    mask = np.zeros((90, 160, 3), dtype=np.uint8)
+    mask[10:30, 20:70] = (255, 0, 128)
+    mask[50:80, 100:150] = (3, 200, 77)
+    # Blender stores linear RGBA colors, bottom row first
+    linear = np.array([_srgb_to_linear(color) for color in mask.reshape(-1, 3)], dtype=np.float32).reshape(mask.shape)
+    pixels = np.concatenate([linear, np.ones((90, 160, 1), dtype=np.float32)], axis=2)[::-1]
+    image = blender.data.images.new('Viewer Node', 160, 90)
+    image.pixels.foreach_set(pixels.reshape(-1))
+
+    assert np.array_equal(read_pixels(), pixels[::-1])
+    assert np.array_equal(read_mask(), mask)
+    out, buffer = np.empty_like(mask), np.empty((90, 160, 4), dtype=np.float32)
+    assert read_mask(image, out=out, buffer=buffer) is out
+    assert np.array_equal(out, mask)
+    assert np.array_equal(read_mask(srgb=False), np.rint(linear * 255))
+
+    label_map = {'a': (255, 0, 128), 'b': (3, 200, 77)}
+    assert get_bounding_boxes_from_mask(read_mask(), label_map) == {
+        'a': {'ymin': 10, 'ymax': 29, 'xmin': 20, 'xmax': 69},
+        'b': {'ymin': 50, 'ymax': 79, 'xmin': 100, 'xmax': 149},
+    }
+
+    with pytest.raises(ValueError):
+        read_pixels('Missing')
+    with pytest.raises(ValueError):
+        read_pixels(out=np.empty((160, 90, 4), dtype=np.float32))
+    with pytest.raises(ValueError):
+        read_mask(out=np.empty((90, 160, 3), dtype=np.float32))
+
+
+def test_read_labels(blender):
+    labels = np.zeros((90, 160), dtype=np.int32)
+    labels[10:30, 20:70] = 1
+    labels[50:80, 100:150] = 2
+    labels[0, 0] = 7
+    # the index pass is a single value, which the Viewer node stores in every color channel, bottom row first
+    pixels = np.repeat(labels[..., None].astype(np.float32), 4, axis=2)
+    pixels[..., 3] = 1
+    image = blender.data.images.new('Viewer Node', 160, 90)
+    image.pixels.foreach_set(pixels[::-1].reshape(-1))
+
+    assert np.array_equal(read_labels(), labels)
+    colors = {'Cube': (255, 0, 128), 'Camera': (3, 200, 77)}
+    mask = read_labels(colors=colors, background=(9, 9, 9))
+    assert mask.dtype == np.uint8 and mask.shape == (90, 160, 3)
+    assert mask[20, 40].tolist() == [255, 0, 128] and mask[60, 120].tolist() == [3, 200, 77]
+    # indices of objects that aren't in colors are background
+    assert mask[0, 0].tolist() == mask[89, 0].tolist() == [9, 9, 9]
+    assert get_bounding_boxes_from_mask(mask, colors) == {
+        'Cube': {'ymin': 10, 'ymax': 29, 'xmin': 20, 'xmax': 69},
+        'Camera': {'ymin': 50, 'ymax': 79, 'xmin': 100, 'xmax': 149},
+    }
@@ -1,7 +1,7 @@
 import pytest
-from starfish.rotations import Spherical
+from starfish.rotations import QuaternionArray, Spherical
 import numpy as np
-from mathutils import Quaternion, Euler, Matrix
+from mathutils import Quaternion, Euler, Matrix, Vector
 
 
 class TestSpherical:
@@ -37,3 +37,70 @@ class TestSpherical:
         assert Spherical(-2 * np.pi, -2 * np.pi, -2 * np.pi) == Spherical(0, 0, 0)
         assert Spherical(7 * np.pi, 7 * np.pi, 7 * np.pi) == Spherical(np.pi, np.pi, np.pi)
         assert Spherical(-7 * np.pi, -7 * np.pi, -7 * np.pi) == Spherical(np.pi, np.pi, np.pi)
+
+
+class TestQuaternionArray:
+    ORDERS = ['XYZ', 'XZY', 'YXZ', 'YZX', 'ZXY', 'ZYX']
+
+    @pytest.fixture
+    def quaternions(self):
+        rng = np.random.default_rng(0)
+        return [Quaternion(q).normalized() for q in rng.normal(size=(200, 4))]
+
+    @staticmethod
+    def same_rotations(a, b):
+        # q and -q are the same rotation
+        return np.allclose(np.abs(np.sum(np.array(a) * np.array(b), axis=-1)), 1, atol=1e-6)
+
+    def test_container(self, quaternions):
+        array = QuaternionArray.from_quaternions(quaternions)
+        assert len(array) == 200 and np.asarray(array).shape == (200, 4)
+        assert isinstance(array[3], Quaternion) and array[3] == quaternions[3]
+        assert isinstance(array[2:5], QuaternionArray) and len(array[2:5]) == 3
+        assert list(array) == array.to_list() == quaternions
+        assert QuaternionArray.from_quaternions([Euler((0.1, 0.2, 0.3)), Spherical(1, 2, 3)]).data.shape == (2, 4)
+        assert np.array_equal(QuaternionArray.identity(3).data, [[1, 0, 0, 0]] * 3)
+
+    def test_matches_mathutils(self, quaternions):
+        array = QuaternionArray.from_quaternions(quaternions)
+        reverse = quaternions[::-1]
+        assert np.allclose(array @ reverse, [a @ b for a, b in zip(quaternions, reverse)], atol=1e-6)
+        assert np.allclose(array @ Quaternion((1, 0, 0), 1), [q @ Quaternion((1, 0, 0), 1) for q in quaternions],
+                           atol=1e-6)
+        assert np.allclose(array.inverted(), [q.inverted() for q in quaternions], atol=1e-6)
+        assert np.allclose(array.to_matrix(), [q.to_matrix() for q in quaternions], atol=1e-6)
+        assert np.allclose(array.rotate((1, 2, 3)), [q @ Vector((1, 2, 3)) for q in quaternions], atol=1e-5)
+        matrices = np.array([q.to_matrix() for q in quaternions])
+        assert self.same_rotations(QuaternionArray.from_matrix(matrices), quaternions)
+        assert self.same_rotations(QuaternionArray.from_axis_angle((0, 0, 1), [0, 4, 7]),
+                                   [Quaternion((0, 0, 1), angle) for angle in (0, 4, 7)])
+
+    def test_slerp(self, quaternions):
+        array = QuaternionArray.from_quaternions(quaternions)
+        reverse = quaternions[::-1]
+        assert np.allclose(array.slerp(reverse, 0.3), [a.slerp(b, 0.3) for a, b in zip(quaternions, reverse)],
+                           atol=1e-6)
+        # when the quaternions are more than 180 degrees apart, mathutils negates the first one
+        a, b = quaternions[0], -quaternions[0]
+        assert np.allclose(QuaternionArray(a).slerp(b, 0), a.slerp(b, 0))
+        factors = np.linspace(0, 1, 7)
+        assert np.allclose(array[0:1].slerp(array[1], factors), [a.slerp(reverse[-2], t) for t in factors], atol=1e-6)
+
+    @pytest.mark.parametrize('order', ORDERS)
+    def test_euler(self, quaternions, order):
+        array = QuaternionArray.from_quaternions(quaternions)
+        assert np.allclose(array.to_euler(order), [q.to_euler(order) for q in quaternions], atol=1e-5)
+        angles = np.random.default_rng(1).uniform(-np.pi, np.pi, (200, 3))
+        assert np.allclose(QuaternionArray.from_euler(angles, order),
+                           [Euler(e, order).to_quaternion() for e in angles], atol=1e-6)
+        # gimbal lock
+        locked = Euler((0.3, np.pi / 2, 0.2), order).to_quaternion()
+        assert self.same_rotations(Euler(QuaternionArray(locked).to_euler(order)[0], order).to_quaternion(), locked)
+
+    def test_spherical(self, quaternions):
+        array = QuaternionArray.from_quaternions(quaternions)
+        sphericals = [Spherical.from_other(q) for q in quaternions]
+        assert np.allclose(np.transpose(array.to_spherical()), [(s.theta, s.phi, s.roll) for s in sphericals],
+                           atol=1e-4)
+        assert np.allclose(QuaternionArray.from_spherical(*array.to_spherical()),
+                           [s.to_quaternion() for s in sphericals], atol=1e-5)
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+from mathutils import Quaternion
+from starfish import Sequence
+from starfish.coverage import coverage
+from starfish.sampling import (RANDOM_BLOCK_SIZE, SOBOL_MAX_DIMENSIONS, frame_parameters, halton, hopf_rotations,
+                               poisson_rotations, poisson_sphere, random_points, sobol, sobol_rotations)
+
+
+def test_halton():
+    points = halton(5, 2)
+    assert points[:, 0].tolist() == [0, 1 / 2, 1 / 4, 3 / 4, 1 / 8]
+    assert points[:, 1] == pytest.approx([0, 1 / 3, 2 / 3, 1 / 9, 4 / 9])
+    assert np.array_equal(halton(10, 4, skip=7), halton(17, 4)[7:])
+
+
+def test_sobol():
+    points = sobol(8, 3)
+    assert points[:, 0].tolist() == [0, 0.5, 0.75, 0.25, 0.375, 0.875, 0.625, 0.125]
+    assert points[:, 1].tolist() == [0, 0.5, 0.25, 0.75, 0.375, 0.875, 0.125, 0.625]
+    assert points[:, 2].tolist() == [0, 0.5, 0.25, 0.75, 0.625, 0.125, 0.875, 0.375]
+    assert np.array_equal(sobol(100, 10, skip=28), sobol(128, 10)[28:])
+
+    # every dimension of a power-of-2 run has exactly one point in each interval [i / n, (i + 1) / n)
+    points = sobol(256, SOBOL_MAX_DIMENSIONS)
+    assert all(np.array_equal(np.sort(np.floor(points[:, k] * 256)), np.arange(256)) for k in range(points.shape[1]))
+    with pytest.raises(ValueError):
+        sobol(10, SOBOL_MAX_DIMENSIONS + 1)
+
+
+@pytest.mark.parametrize('generate', [sobol_rotations, hopf_rotations])
+def test_rotations(generate):
+    rotations = generate(1000)
+    assert len(rotations) == 1000
+    assert all(isinstance(q, Quaternion) for q in rotations)
+    assert np.allclose([q.magnitude for q in rotations], 1)
+
+    # low-discrepancy rotations cover more of SO(3) than the same number of random ones
+    random = np.random.default_rng(0).normal(size=(1000, 4))
+    assert coverage(rotations, 0.4)['covered'] > coverage(random, 0.4)['covered']
+
+
+def test_hopf_rotations_sizes():
+    assert [len(hopf_rotations(n)) for n in (0, 1, 2, 7, 72)] == [0, 1, 2, 7, 72]
+
+
+def test_frame_parameters():
+    params = frame_parameters(64, rotations=('pose', 'lighting'), distance=(20, 60), offset=[(0.3, 0.7), (0.4, 0.6)])
+    assert sorted(params) == ['distance', 'lighting', 'offset', 'pose']
+    assert all(len(v) == 64 for v in params.values())
+    assert all(20 <= d < 60 for d in params['distance'])
+    offsets = np.array(params['offset'])
+    assert offsets.min(axis=0) == pytest.approx([0.3, 0.4])
+    assert np.all(offsets.max(axis=0) < [0.7, 0.6])
+    assert len(Sequence.standard(**params)) == 64
+
+    assert frame_parameters(8, rotations=(), method='halton', distance=(0, 8)) == {'distance': [0, 4, 2, 6, 1, 5, 3, 7]}
+    with pytest.raises(ValueError):
+        frame_parameters(8, method='unknown')
+
+
+def test_random_points():
+    points = random_points(10000, 3, seed=5)
+    assert points.shape == (10000, 3) and np.all((points >= 0) & (points < 1))
+    # any range of points is the same as that range of a serial run, across block boundaries
+    parts = [random_points(stop - start, 3, skip=start, seed=5) for start, stop in
+             [(0, 10), (10, RANDOM_BLOCK_SIZE + 7), (RANDOM_BLOCK_SIZE + 7, 10000)]]
+    assert np.array_equal(np.concatenate(parts), points)
+    # each block comes from a child spawned from the root seed
+    child = np.random.SeedSequence(5).spawn(2)[1]
+    assert np.array_equal(points[RANDOM_BLOCK_SIZE:2 * RANDOM_BLOCK_SIZE],
+                          np.random.default_rng(child).random((RANDOM_BLOCK_SIZE, 3)))
+    assert np.array_equal(random_points(100, 3, seed=np.random.SeedSequence(5)), points[:100])
+    assert not np.array_equal(random_points(100, 3, seed=6), points[:100])
+
+    params = frame_parameters(6000, rotations=('pose',), method='random', seed=1, distance=(20, 60))
+    part = frame_parameters(100, rotations=('pose',), method='random', skip=5000, seed=1, distance=(20, 60))
+    assert part['distance'] == params['distance'][5000:5100] and part['pose'] == params['pose'][5000:5100]
+    assert all(20 <= d < 60 for d in params['distance'])
+
+
+def min_rotation_distance(rotations):
+    q = np.array([tuple(r) for r in rotations])
+    distances = 2 * np.arccos(np.clip(np.abs(q @ q.T), 0, 1))
+    np.fill_diagonal(distances, np.inf)
+    return distances.min()
+
+
+def test_poisson_rotations():
+    rotations = poisson_rotations(200, oversample=5)
+    assert len(rotations) == 200
+    assert rotations == poisson_rotations(200, oversample=5)
+    random = [Quaternion(q).normalized() for q in np.random.default_rng(0).normal(size=(200, 4))]
+    # every prefix is spread out, much more so than random rotations
+    for k in (10, 50, 200):
+        assert min_rotation_distance(rotations[:k]) > 2 * min_rotation_distance(random[:k])
+
+    with pytest.raises(ValueError):
+        poisson_rotations(10, stop=11)
+    with pytest.raises(ValueError):
+        poisson_rotations(10, oversample=0.5)
+
+
+def test_poisson_sphere():
+    theta, phi = poisson_sphere(200, stop=20, oversample=5)
+    assert len(theta) == len(phi) == 200
+    assert np.all((theta >= 0) & (theta < 2 * np.pi)) and np.all((phi >= 0) & (phi <= np.pi))
+    v = np.column_stack((np.sin(phi) * np.cos(theta), np.sin(phi) * np.sin(theta), np.cos(phi)))
+    for k in (20, 200):
+        angles = np.arccos(np.clip(v[:k] @ v[:k].T, -1, 1))
+        np.fill_diagonal(angles, np.inf)
+        # Poisson disk radius of k points on the unit sphere
+        assert angles.min() > 0.5 * np.sqrt(4 * np.pi / (2 * np.sqrt(3) * k))
@@ -0,0 +1,119 @@
+import heapq
+
+import numpy as np
+import pytest
+from mathutils import Quaternion
+from starfish import Frame, Sequence
+from starfish.distributed import Coordinator, Worker
+from starfish.scheduling import FEATURES, CostModel, Scheduler, frame_features
+
+
+def true_cost(frame):
+    # close-ups and light from the side are expensive
+    return 0.5 + 400 / frame.distance ** 2 + 0.3 * frame_features([frame])[0, FEATURES.index('lighting_angle')]
+
+
+def random_sequence(n, seed=0):
+    rng = np.random.default_rng(seed)
+    lighting = [Quaternion((0, 1, 0), angle) for angle in rng.uniform(0, np.pi, n)]
+    return Sequence.standard(distance=list(rng.uniform(5, 60, n)), lighting=lighting)
+
+
+def simulate(coordinator, speeds):
+    """Simulates workers with the given speeds, which report synthetic render times instead of sleeping.
+
+    :returns: the time at which each worker finished
+    """
+    workers = [Worker(coordinator.address, name=f'worker_{i}') for i in range(len(speeds))]
+    leases = [worker.leases() for worker in workers]
+    finish = [0.0] * len(speeds)
+    events = [(0.0, i) for i in range(len(speeds))]
+    while events:
+        time, i = heapq.heappop(events)
+        lease = next(leases[i], None)
+        if lease is None:
+            finish[i] = time
+            continue
+        lease_id, _, frames = lease
+        for frame in frames:
+            duration = true_cost(frame) * speeds[i]
+            time += duration
+            workers[i].complete(lease_id, duration)
+        heapq.heappush(events, (time, i))
+    return np.array(finish)
+
+
+def test_frame_features():
+    frames = [
+        Frame(distance=10, offset=(0.5, 0.5)),
+        Frame(distance=2, offset=(0.2, 0.9), lighting=Quaternion((1, 0, 0), 1),
+              background=Quaternion((0, 1, 0), np.pi / 2)),
+    ]
+    features = frame_features(frames)
+    assert features.shape == (2, len(FEATURES))
+    assert np.allclose(features[:, 0], 1)
+    assert np.allclose(features[:, 1], [0.01, 0.25])
+    assert np.allclose(features[:, 2], [0, 0.5])
+    # with no background rotation the camera looks down -Z; rotated about Y by 90 degrees, it looks down -X
+    assert np.allclose(features[:, 3:6], [[0, 0, -1], [-1, 0, 0]], atol=1e-6)
+    assert np.allclose(features[:, 6], [0, 1])
+    assert frame_features([]).shape == (0, len(FEATURES))
+
+
+def test_cost_model():
+    model = CostModel(prior=2)
+    frames = list(random_sequence(200))
+    assert np.allclose(model.predict(frames[:3]), 2)
+    durations = np.array([true_cost(frame) for frame in frames])
+    durations[::10] = np.nan
+    model.update(frames[:5], durations[:5])
+    assert model.weights is None and np.allclose(model.predict(frames[:3]), np.nanmean(durations[:5]))
+    model.update(frames[5:], durations[5:])
+    assert model.count == 180
+
+    test = list(random_sequence(50, seed=1))
+    actual = [true_cost(frame) for frame in test]
+    report = CostModel.report(model.predict(test), actual)
+    assert report['count'] == 50 and report['relative_error'] < 0.05 and report['correlation'] > 0.99
+
+    with pytest.raises(ValueError):
+        model.update(frames[:3], durations[:2])
+
+
+def test_scheduler_chunks():
+    frames = list(Sequence.standard(distance=[10] * 1000))
+    scheduler = Scheduler(CostModel(prior=1), target=50, min_frames=2, max_frames=40)
+    assert scheduler.chunk(frames, 0, 1000, [(0, 1000)], 'a') == 40
+    # target time
+    scheduler.max_frames = 1000
+    assert scheduler.chunk(frames, 0, 1000, [(0, 1000)], 'a') == 50
+    # near the end, leases shrink
+    assert scheduler.chunk(frames, 980, 1000, [(980, 1000)], 'a') == 990
+    assert scheduler.chunk(frames, 999, 1000, [(999, 1000)], 'a') == 1000
+    assert scheduler.chunk(frames, 997, 1000, [(997, 1000)], 'a') == 999
+
+    # a worker that is twice as slow gets half as many frames
+    scheduler.record(frames[:20], [2.0] * 20, 'slow')
+    scheduler.record(frames[20:40], [1.0] * 20, 'fast')
+    assert scheduler.speeds['slow'] == pytest.approx(2 * scheduler.speeds['fast'], rel=0.2)
+    slow = scheduler.chunk(frames, 100, 1000, [(100, 1000)], 'slow') - 100
+    fast = scheduler.chunk(frames, 100, 1000, [(100, 1000)], 'fast') - 100
+    assert fast == pytest.approx(2 * slow, rel=0.2)
+
+    with pytest.raises(ValueError):
+        Scheduler(min_frames=5, max_frames=2)
+
+
+def test_balanced_finish_times():
+    sequence = random_sequence(1000)
+    speeds = [1, 1, 3, 0.5]
+    with Coordinator(sequence, chunk_size=50) as coordinator:
+        static = simulate(coordinator, speeds)
+    scheduler = Scheduler(target=20)
+    with Coordinator(sequence, scheduler=scheduler) as coordinator:
+        adaptive = simulate(coordinator, speeds)
+        assert coordinator.done.all()
+        report = CostModel.report(coordinator.predicted, coordinator.durations)
+    assert report['count'] == 1000 and report['correlation'] > 0.8
+    assert np.ptp(adaptive) < 0.1 * np.ptp(static)
+    assert np.ptp(adaptive) < 0.02 * adaptive.max()
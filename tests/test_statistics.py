@@ -0,0 +1,82 @@
+import json
+
+import numpy as np
+import pytest
+from mathutils import Euler, Quaternion
+from starfish import Frame, Sequence, statistics
+from starfish.rotations import Spherical
+from starfish.statistics import describe, frame_arrays
+
+
+def test_frame_arrays():
+    frames = [Frame(position=(1, 2, 3), distance=10, pose=Euler((0.1, 0.2, 0.3)), offset=(0.2, 0.7)), Frame()]
+    frames[1].lighting = Euler((0, 0, 1))
+    arrays = frame_arrays(Sequence(frames))
+    assert arrays['position'].tolist() == [[1, 2, 3], [0, 0, 0]]
+    assert arrays['distance'].tolist() == [10, 100]
+    assert arrays['offset'].tolist() == [[0.2, 0.7], [0.5, 0.5]]
+    assert np.allclose(arrays['pose'][0], Euler((0.1, 0.2, 0.3)).to_quaternion())
+    assert np.allclose(arrays['lighting'][1], Euler((0, 0, 1)).to_quaternion())
+    assert all(array.dtype == np.float64 and len(array) == 2 for array in arrays.values())
+
+
+def test_describe():
+    poses = [Euler((0, 0, 0)), Euler((0, np.pi / 2, 0))]
+    sequence = Sequence.exhaustive(distance=[10, 20, 30, 40], offset=[(0.5, 0.5), (0.95, 1.5)], pose=poses)
+    summary = describe(sequence, bins=4)
+    assert summary == json.loads(json.dumps(summary))
+    assert summary['num_frames'] == 16
+
+    distance = summary['distance']
+    assert (distance['min'], distance['max'], distance['mean']) == (10, 40, 25)
+    assert distance['histogram'] == {'counts': [4, 4, 4, 4], 'edges': [10, 17.5, 25, 32.5, 40]}
+
+    offset = summary['offset']
+    assert offset['unique'] == 2 and offset['in_frame'] == 0.5
+    assert np.array(offset['histogram']).sum() == 8 and offset['histogram'][2][2] == 8
+    assert offset['covered'] == 1 / 16
+    assert summary['position']['unique'] == 1
+
+    pose = summary['pose']
+    assert pose['unique'] == 2
+    assert pose['max_angle'] == pytest.approx(np.pi / 4) and pose['spread'] == pytest.approx(np.pi / 4)
+    assert sum(pose['angle_histogram']['counts']) == 16
+    # the two poses point the +Z axis in two different directions
+    assert sum(c > 0 for c in pose['phi_histogram']['counts']) == 2
+    assert summary['lighting']['unique'] == 1 and summary['lighting']['spread'] == 0
+    assert np.allclose(summary['lighting']['mean'], (1, 0, 0, 0))
+    assert summary['duplicates'] == {'exact': 0}
+
+
+def test_describe_directions():
+    rng = np.random.default_rng(0)
+    lighting = [Spherical(*angles) for angles in rng.random((200, 3)) * (2 * np.pi, np.pi, 2 * np.pi)]
+    summary = describe(Sequence.standard(lighting=lighting), bins=5)
+    spherical = [Spherical.from_other(Quaternion(q)) for q in frame_arrays(Sequence.standard(lighting=lighting))
+                 ['lighting']]
+    theta = np.array([s.theta for s in spherical])
+    phi = np.array([s.phi for s in spherical])
+    assert summary['lighting']['theta_histogram']['counts'] == np.histogram(theta, 5, (0, 2 * np.pi))[0].tolist()
+    assert summary['lighting']['phi_histogram']['counts'] == np.histogram(phi, 5, (0, np.pi))[0].tolist()
+    assert 0 < summary['lighting']['directions_covered'] <= 1
+
+
+def test_describe_duplicates(monkeypatch):
+    frames = [Frame(distance=d, pose=Euler((0, 0, a))) for d in (10, 20) for a in (0, 0.1, 0.101)]
+    frames += [Frame(distance=10, pose=Euler((0, 0, 0))), Frame(distance=20, pose=Quaternion((-1, 0, 0, 0)))]
+    sequence = Sequence(frames)
+    # q and -q are the same rotation
+    assert sequence.describe()['duplicates'] == {'exact': 2}
+    assert sequence.describe(threshold=np.radians(1))['duplicates'] == {'exact': 2, 'near': 4}
+
+    # rows whose hashes collide are still told apart
+    monkeypatch.setattr(statistics, '_HASH_MULTIPLIER', np.uint64(0))
+    assert sequence.describe()['duplicates'] == {'exact': 2}
+    assert sequence.describe()['pose']['unique'] == 3
+
+
+def test_describe_errors():
+    with pytest.raises(ValueError):
+        describe([])
+    with pytest.raises(ValueError):
+        describe([Frame()], bins=0)
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from mathutils import Euler, Vector
+from starfish import Frame, Sequence
+from starfish.annotation import generate_keypoints, project_keypoints_onto_image
+from starfish.testing import FakeBMesh, FakeMesh, fake_blender, make_scene
+
+
+@pytest.fixture
+def blender():
+    with fake_blender() as bpy:
+        yield bpy
+
+
+def test_modules_are_restored():
+    import sys
+    with fake_blender():
+        import bpy
+        assert hasattr(bpy, 'data')
+    assert 'bpy' not in sys.modules or not hasattr(sys.modules['bpy'], 'data')
+
+
+def test_view_frame(blender):
+    scene, _, camera, _ = make_scene(blender, resolution=(1920, 1080))
+    view_frame = camera.data.view_frame(scene=scene)
+    # horizontal field of view is determined by the sensor width
+    assert view_frame[0].x / -view_frame[0].z == pytest.approx(18 / 50)
+    assert view_frame[0].y / view_frame[0].x == pytest.approx(1080 / 1920)
+    assert [tuple(np.sign(v.xy)) for v in view_frame] == [(1, 1), (1, -1), (-1, -1), (-1, 1)]
+
+    # portrait resolutions fit the sensor vertically
+    scene.render.resolution_x, scene.render.resolution_y = 1080, 1920
+    view_frame = camera.data.view_frame(scene=scene)
+    assert view_frame[0].y / -view_frame[0].z == pytest.approx(18 / 50)
+
+
+@pytest.mark.parametrize('offset', [(0.5, 0.5), (0.25, 0.75), (0.9, 0.1)])
+def test_setup_and_projection(blender, offset):
+    scene, obj, camera, sun = make_scene(blender)
+    frame = Frame(position=(1, 2, 3), distance=20, offset=offset, pose=Euler((1, 2, 3)),
+                  background=Euler((0.3, 0.2, 1)))
+    frame.setup(scene, obj, camera, sun)
+
+    assert obj.matrix_world.translation == Vector((1, 2, 3))
+    assert (camera.location - obj.location).length == pytest.approx(20, rel=1e-5)
+    assert frame.translation.length == pytest.approx(20, rel=1e-5)
+
+    # the object's origin should appear at (approximately) the requested offset
+    (y, x), = project_keypoints_onto_image([(0, 0, 0)], scene, obj, camera)
+    assert y == pytest.approx(offset[0], abs=1e-2)
+    assert x == pytest.approx(offset[1], abs=1e-2)
+
+
+def test_bake(blender):
+    scene, obj, camera, sun = make_scene(blender)
+    Sequence.standard(distance=list(range(1, 11))).bake(scene, obj, camera, sun, num=5)
+    assert scene.frame_end == 5
+    assert sorted(camera.animation_data.keyframes['location']) == [1, 2, 3, 4, 5]
+    assert sorted(sun.animation_data.keyframes) == ['rotation_quaternion']
+
+
+def test_volume():
+    mesh = FakeBMesh()
+    mesh.from_mesh(FakeMesh.cube(size=3))
+    assert mesh.calc_volume() == pytest.approx(27)
+
+
+def test_generate_keypoints(blender):
+    _, obj, _, _ = make_scene(blender)
+    keypoints = generate_keypoints(obj, 20)
+    assert len(keypoints) == 20
+    # every keypoint lies on the surface of the default cube
+    assert np.allclose(np.abs(keypoints).max(axis=1), 1, atol=1e-5)
+    assert generate_keypoints(obj, 20) == keypoints
+    assert len(obj.modifiers) == 0 and obj not in blender.context.collection.objects
+
+
+def test_particle_system(blender):
+    _, obj, _, _ = make_scene(blender)
+    settings = obj.modifiers.new('Particles', 'PARTICLE_SYSTEM').particle_system.settings
+    psys = obj.particle_systems[-1]
+    settings.count = 50
+    settings.emit_from = 'VERT'
+    psys._distribute()
+    corners = {tuple(v.co) for v in obj.data.vertices}
+    assert len(psys.particles) == 50
+    assert all(tuple(obj.matrix_world.inverted() @ p.location) in corners for p in psys.particles.values())
+
+    with pytest.raises(ValueError):
+        settings.emit_from = 'VOLUME'
+    assert settings.emit_from == 'VERT'
@@ -3,6 +3,9 @@ from types import SimpleNamespace
 from mathutils import Vector, Quaternion, Euler, Matrix
 import json
 
+import numpy as np
+import pytest
+
 
 def depth_2_all_equal(a, b):
     return all(all(a1 == b1 for a1, b1 in zip(a2, b2)) for a2, b2 in zip(a, b))
@@ -26,6 +29,50 @@ def test_cartesian():
         [[Vector((1, 2, 3)), Vector((4, 5, 6))], [Vector((1, 2, 3)), Vector((7, 8, 9))]]
     )
 
+    # numeric inputs keep their dtype
+    assert utils.cartesian([0], [1, 2]).dtype == int
+    assert utils.cartesian(np.arange(3, dtype=np.float32), np.arange(2, dtype=np.int16)).dtype == np.float32
+    assert utils.cartesian([0], ['a']).dtype == object
+
+
+def test_cartesian_product():
+    distances, offsets, names = np.linspace(10, 50, 5), np.arange(7), ['a', 'b', 'c']
+    product = utils.CartesianProduct(distances, offsets)
+    expected = utils.cartesian(distances, offsets)
+    assert len(product) == 35 and product.shape == (5, 7) and product.dtype == np.float64
+    assert np.array_equal(product.values(), expected)
+    assert np.array_equal(product[10:20:3], expected[10:20:3])
+    assert np.array_equal(product[[3, -1, 34]], expected[[3, 34, 34]])
+    assert product[12] == (distances[1], offsets[5]) and product[-1] == (50, 6)
+    assert np.array_equal(product.indices(12, 14), [[1, 5], [1, 6]])
+    assert np.array_equal(np.concatenate(list(product.chunks(8))), expected)
+    assert [len(chunk) for chunk in product.chunks(8, indices=True)] == [8, 8, 8, 8, 3]
+    with pytest.raises(IndexError):
+        product[35]
+    with pytest.raises(ValueError):
+        next(product.chunks(0))
+
+    # integer indices and iteration give back the original objects
+    vectors = [Vector((1, 2, 3)), Vector((4, 5, 6))]
+    product = utils.CartesianProduct(names, vectors, [None])
+    assert product.dtype == object and list(product) == [(n, v, None) for n in names for v in vectors]
+    assert product[3][1] is vectors[1]
+
+    # products far too large to compute can still be indexed
+    product = utils.CartesianProduct(*[np.arange(1000)] * 3)
+    assert len(product) == 10 ** 9 and product[123456789] == (123, 456, 789)
+    assert len(utils.CartesianProduct([], [1, 2])) == 0
+
+
+def test_seeded_random():
+    assert utils.random_rotations(10, seed=1) == utils.random_rotations(10, seed=1)
+    assert utils.random_rotations(10, seed=1) != utils.random_rotations(10, seed=2)
+    theta, phi = utils.uniform_sphere(100)
+    sample = utils.uniform_sphere(100, random=20, seed=np.random.default_rng(4))
+    assert all(np.array_equal(a, b) for a, b in zip(sample, utils.uniform_sphere(100, random=20, seed=4)))
+    # each sampled point is one of the evenly spaced points
+    assert set(zip(*sample)) <= set(zip(theta, phi))
+
 
 def test_jsonify():
     attrs = {
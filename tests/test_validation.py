@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from mathutils import Euler, Vector
+from starfish import Frame, Sequence
+from starfish.rotations import QuaternionArray
+from starfish.scheduling import CostModel
+from starfish.testing import fake_blender, make_scene
+from starfish.validation import REASONS, find_degenerate, object_bounds, prefilter
+
+
+def brute_force(frame, scene, obj, camera, sun, min_visible, max_lighting_angle):
+    """Sets up the frame in the fake Blender scene and checks it with the objects' world matrices."""
+    frame.setup(scene, obj, camera, sun)
+    to_camera = camera.matrix_world.inverted()
+    points = [to_camera @ (obj.matrix_world @ Vector(corner)) for corner in obj.bound_box]
+    view = camera.data.view_frame(scene=scene)
+    lo = np.min([(v.x / -v.z, v.y / -v.z) for v in view], axis=0)
+    hi = np.max([(v.x / -v.z, v.y / -v.z) for v in view], axis=0)
+    local = obj.matrix_world.inverted() @ camera.matrix_world.translation
+    inside = all(-1 <= x <= 1 for x in local)
+    if all(p.z < 0 for p in points):
+        projected = np.array([(p.x / -p.z, p.y / -p.z) for p in points])
+        box_lo, box_hi = projected.min(axis=0), projected.max(axis=0)
+        overlap = np.prod(np.clip(np.minimum(box_hi, hi) - np.maximum(box_lo, lo), 0, None))
+        visible = overlap / np.prod(box_hi - box_lo)
+    else:
+        visible = 1.0 if any(p.z < 0 for p in points) else 0.0
+    light = sun.matrix_world.to_quaternion() @ Vector((0, 0, -1))
+    direction = (obj.matrix_world.translation - camera.matrix_world.translation).normalized()
+    return {
+        'out_of_frame': not inside and visible <= min_visible,
+        'camera_inside': inside,
+        'backlit': np.arccos(np.clip(light.dot(direction), -1, 1)) > max_lighting_angle,
+    }
+
+
+@pytest.mark.parametrize('min_visible', [0, 0.5])
+def test_find_degenerate(min_visible):
+    rng = np.random.default_rng(0)
+    n = 300
+    sequence = Sequence.standard(
+        distance=list(rng.uniform(0.5, 30, n)),
+        offset=[tuple(o) for o in rng.uniform(-0.25, 1.25, (n, 2))],
+        pose=QuaternionArray(rng.normal(size=(n, 4))),
+        lighting=QuaternionArray(rng.normal(size=(n, 4))),
+        background=QuaternionArray(rng.normal(size=(n, 4))),
+        position=[tuple(p) for p in rng.uniform(-10, 10, (n, 3))],
+    )
+    with fake_blender() as bpy:
+        scene, obj, camera, sun = make_scene(bpy)
+        flags = find_degenerate(sequence, object_bounds(obj), camera.data.view_frame(scene=scene),
+                                min_visible=min_visible)
+        expected = [brute_force(frame, scene, obj, camera, sun, min_visible, np.radians(150)) for frame in sequence]
+    for reason in REASONS:
+        assert flags[reason].tolist() == [e[reason] for e in expected]
+        # the random frames include every kind of degenerate frame, and good ones too
+        assert 0 < flags[reason].sum() < n
+
+
+def test_prefilter():
+    view = [Vector((0.5, 0.5, -1)), Vector((0.5, -0.5, -1)), Vector((-0.5, -0.5, -1)), Vector((-0.5, 0.5, -1))]
+    bounds = [(x, y, z) for x in (-1, 1) for y in (-1, 1) for z in (-1, 1)]
+    frames = [
+        Frame(distance=20),
+        Frame(distance=20, offset=(0.5, 5)),
+        Frame(distance=0.5),
+        Frame(distance=20, lighting=Euler((np.pi, 0, 0))),
+        Frame(distance=20, lighting=Euler((np.pi / 2, 0, 0))),
+    ]
+    sequence, report = prefilter(frames, bounds, view, cost=1800)
+    assert list(sequence) == [frames[0], frames[4]]
+    assert report == {'num_frames': 5, 'degenerate': 3, 'out_of_frame': 1, 'camera_inside': 1, 'backlit': 1,
+                      'render_hours_saved': 1.5}
+
+    sequence, report = prefilter(frames, bounds, view, drop=False, cost=[1, 2, 3, 4, 5], max_lighting_angle=1.5)
+    assert list(sequence) == frames and report['degenerate'] == 4
+    assert report['render_hours_saved'] == pytest.approx(14 / 3600)
+    assert [getattr(frame, 'degenerate', None) for frame in frames] == \
+        [None, ['out_of_frame'], ['camera_inside'], ['backlit'], ['backlit']]
+
+    model = CostModel(prior=3600)
+    assert prefilter(frames, bounds, view, cost=model)[1]['render_hours_saved'] == 3
+    assert prefilter([], bounds, view)[1]['degenerate'] == 0
+    with pytest.raises(ValueError):
+        find_degenerate(frames, [], view)
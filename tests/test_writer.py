@@ -0,0 +1,69 @@
+import json
+import threading
+import time
+
+import cv2
+import numpy as np
+import pytest
+from starfish import Frame
+from starfish.writer import AsyncWriter
+
+
+def test_write_text_and_image(tmp_path):
+    image = np.zeros((10, 20, 3), dtype=np.uint8)
+    image[:, :, 0] = 255
+    with AsyncWriter() as writer:
+        writer.write_text(str(tmp_path / 'a.txt'), 'hello')
+        writer.write_image(str(tmp_path / 'a.png'), image)
+        # the buffer can be reused as soon as write_image returns
+        image[:] = 0
+
+    assert (tmp_path / 'a.txt').read_text() == 'hello'
+    written = cv2.cvtColor(cv2.imread(str(tmp_path / 'a.png')), cv2.COLOR_BGR2RGB)
+    assert np.all(written[:, :, 0] == 255) and np.all(written[:, :, 1:] == 0)
+
+
+def test_write_metadata_snapshot(tmp_path):
+    frame = Frame(distance=10)
+    frame.tag = 'first'
+    with AsyncWriter() as writer:
+        writer.write_metadata(str(tmp_path / 'meta.json'), frame)
+        frame.tag = 'second'
+
+    meta = json.loads((tmp_path / 'meta.json').read_text())
+    assert meta['tag'] == 'first'
+    assert meta['distance'] == 10
+
+
+def test_back_pressure():
+    release = threading.Event()
+    writer = AsyncWriter(max_pending=2, num_threads=1)
+    writer.submit(release.wait)
+    writer.submit(release.wait)
+
+    submitted = threading.Event()
+    thread = threading.Thread(target=lambda: (writer.submit(lambda: None), submitted.set()))
+    thread.start()
+    time.sleep(0.1)
+    assert not submitted.is_set()
+
+    release.set()
+    thread.join(1)
+    assert submitted.is_set()
+    writer.close()
+
+
+def test_errors_are_reraised():
+    def fail():
+        raise IOError('disk full')
+
+    writer = AsyncWriter()
+    writer.submit(fail)
+    with pytest.raises(IOError):
+        writer.flush()
+    # the error is only reported once
+    writer.flush()
+    writer.close()
+
+    with pytest.raises(RuntimeError):
+        writer.submit(lambda: None)